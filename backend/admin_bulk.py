@@ -0,0 +1,189 @@
+"""
+Operações em massa do admin (moderação de ondas de spam)
+- Ativar/pausar usuários, trocar plano e excluir imóveis a partir de listas de ids
+- Cada lote de BULK_BATCH_SIZE ids faz poucas idas ao banco, independente do tamanho:
+  usuários: leitura com $in, bulk_write (ordered=False) e releitura para o resultado
+  de cada id; imóveis: reserva com update_many, leitura do que foi reservado e
+  delete_many do que esta operação reservou
+- O resultado é por id (updated/unchanged/deleted/not_found/skipped/error) mais um
+  resumo por resultado
+- Contadores de usuário e imagens são ajustados em lote, só para os imóveis que esta
+  operação removeu: as outras exclusões de imóvel respeitam a reserva (`deleting_until`),
+  então o mesmo imóvel não conta duas vezes; falhas nos contadores voltam em
+  `counter_errors`
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List
+import os
+import uuid
+import logging
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from current_user import invalidate_user, revoke_users_tokens
+from database import db
+from media_store import release_images
+from user_deletion import DELETING_STATUS
+
+logger = logging.getLogger(__name__)
+
+BULK_MAX_IDS = int(os.environ.get("BULK_MAX_IDS", 5000))
+BULK_BATCH_SIZE = 1000
+# Prazo da reserva de um lote de imóveis; vencido (worker morto), o imóvel volta a poder ser excluído
+BULK_DELETE_CLAIM_TTL = timedelta(minutes=1)
+
+BULK_USER_STATUSES = ("active", "pending", "paused")
+PLAN_TYPES = ("free", "mensal", "trimestral", "anual", "lifetime")
+# Contas administrativas nunca entram em operações em massa
+PROTECTED_USER_TYPES = ("admin", "admin_senior")
+
+
+def _unique(ids: List[str]) -> List[str]:
+    """Remove repetidos mantendo a ordem enviada"""
+    return list(dict.fromkeys(ids))
+
+
+def _batches(ids: List[str]):
+    for start in range(0, len(ids), BULK_BATCH_SIZE):
+        yield ids[start:start + BULK_BATCH_SIZE]
+
+
+async def _bulk_write(collection, operations: list) -> Dict[int, str]:
+    """bulk_write ordered=False; retorna índice da operação -> mensagem de erro"""
+    if not operations:
+        return {}
+    try:
+        await collection.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        return {error["index"]: error.get("errmsg", "write error") for error in e.details.get("writeErrors", [])}
+    return {}
+
+
+def _summary(results: List[dict]) -> dict:
+    summary = {}
+    for item in results:
+        summary[item["result"]] = summary.get(item["result"], 0) + 1
+    return {"requested": len(results), "summary": summary, "results": results}
+
+
+async def _update_users(user_ids: List[str], changes: dict, revoke: bool) -> dict:
+    """Aplica `changes` aos usuários; revoke=True revoga os tokens dos alterados"""
+    results = []
+    for batch in _batches(_unique(user_ids)):
+        projection = {"_id": 0, "id": 1, "email": 1, "user_type": 1, "status": 1, **{f: 1 for f in changes}}
+        users = {
+            user["id"]: user
+            async for user in db.users.find({"id": {"$in": batch}}, projection)
+        }
+
+        targets, batch_results = [], {}
+        for user_id in batch:
+            user = users.get(user_id)
+            if not user:
+                batch_results[user_id] = {"id": user_id, "result": "not_found"}
+            elif user.get("user_type") in PROTECTED_USER_TYPES:
+                batch_results[user_id] = {"id": user_id, "result": "skipped", "detail": "Usuário administrador"}
+            elif user.get("status") == DELETING_STATUS:
+                batch_results[user_id] = {"id": user_id, "result": "skipped", "detail": "Usuário em exclusão"}
+            elif all(user.get(field) == value for field, value in changes.items()):
+                batch_results[user_id] = {"id": user_id, "result": "unchanged"}
+            else:
+                targets.append(user)
+
+        # O status no filtro evita sobrescrever um usuário que entrou em exclusão
+        now = datetime.utcnow()
+        errors = await _bulk_write(db.users, [
+            UpdateOne({"id": user["id"], "status": {"$ne": DELETING_STATUS}}, {"$set": {**changes, "updated_at": now}})
+            for user in targets
+        ])
+        # bulk_write só devolve totais: o resultado de cada id vem da releitura
+        current = {
+            user["id"]: user
+            async for user in db.users.find({"id": {"$in": [user["id"] for user in targets]}}, projection)
+        } if targets else {}
+
+        changed = []
+        for index, user in enumerate(targets):
+            after = current.get(user["id"])
+            if index in errors:
+                batch_results[user["id"]] = {"id": user["id"], "result": "error", "detail": errors[index]}
+            elif after is None or after.get("status") == DELETING_STATUS:
+                # Entrou em exclusão (ou foi removido) entre a leitura e a escrita
+                batch_results[user["id"]] = {"id": user["id"], "result": "skipped", "detail": "Usuário em exclusão"}
+            else:
+                batch_results[user["id"]] = {"id": user["id"], "result": "updated"}
+                changed.append(after)
+
+        if revoke and changed:
+            await revoke_users_tokens(changed)
+        else:
+            for user in changed:
+                invalidate_user(user_id=user["id"])
+        results.extend(batch_results[user_id] for user_id in batch)
+
+    logger.info(f"Bulk user update {changes}: {len(results)} ids")
+    return _summary(results)
+
+
+async def bulk_set_user_status(user_ids: List[str], new_status: str) -> dict:
+    # status faz parte das claims do token: os tokens dos alterados são revogados
+    return await _update_users(user_ids, {"status": new_status}, revoke=True)
+
+
+async def bulk_set_plan(user_ids: List[str], plan_type: str) -> dict:
+    changes = {"plan_type": plan_type}
+    # Plano vitalício não expira (mesma regra do full-edit)
+    if plan_type == "lifetime":
+        changes["plan_expires_at"] = None
+    return await _update_users(user_ids, changes, revoke=False)
+
+
+async def bulk_delete_properties(property_ids: List[str]) -> dict:
+    """Exclui imóveis; contadores dos donos e imagens ajustados por lote"""
+    results = []
+    counter_errors = []
+    projection = {"_id": 0, "id": 1, "images": 1, "owner_id": 1, "is_featured": 1}
+    for batch in _batches(_unique(property_ids)):
+        # Reserva os imóveis do lote: só o que esta operação reservou é removido por ela
+        token = uuid.uuid4().hex
+        now = datetime.utcnow()
+        await db.properties.update_many(
+            {"id": {"$in": batch}, "deleting_until": {"$not": {"$gt": now}}},
+            {"$set": {"deleting": token, "deleting_until": now + BULK_DELETE_CLAIM_TTL}}
+        )
+        claimed = [
+            prop async for prop in db.properties.find({"id": {"$in": batch}, "deleting": token}, projection)
+        ]
+        deleted = await db.properties.delete_many({"id": {"$in": batch}, "deleting": token})
+        if deleted.deleted_count != len(claimed):
+            # Reserva vencida no meio do lote (operação travada por mais de BULK_DELETE_CLAIM_TTL)
+            logger.warning(
+                f"Bulk property delete: claimed {len(claimed)} but deleted {deleted.deleted_count}"
+            )
+
+        # Não reservados: inexistentes ou reservados por outra exclusão em massa
+        batch_results = {property_id: {"id": property_id, "result": "not_found"} for property_id in batch}
+        deltas: Dict[str, Dict[str, int]] = {}
+        images = []
+        for prop in claimed:
+            batch_results[prop["id"]] = {"id": prop["id"], "result": "deleted"}
+            owner = deltas.setdefault(prop.get("owner_id"), {"properties_count": 0, "featured_count": 0})
+            owner["properties_count"] -= 1
+            owner["featured_count"] -= int(bool(prop.get("is_featured")))
+            images.extend(prop.get("images") or [])
+
+        counter_updates = [
+            (owner_id, UpdateOne({"id": owner_id}, {"$inc": {f: d for f, d in counts.items() if d}}))
+            for owner_id, counts in deltas.items() if owner_id
+        ]
+        errors = await _bulk_write(db.users, [operation for _, operation in counter_updates])
+        for index, detail in errors.items():
+            owner_id = counter_updates[index][0]
+            logger.error(f"Bulk property delete: counters of owner {owner_id} not updated: {detail}")
+            counter_errors.append({"owner_id": owner_id, "detail": detail})
+        await release_images(images)
+        results.extend(batch_results[property_id] for property_id in batch)
+
+    logger.info(f"Bulk property delete: {len(results)} ids")
+    return {**_summary(results), "counter_errors": counter_errors}
@@ -0,0 +1,124 @@
+"""
+Estatísticas do painel admin (GET /api/admin/dashboard)
+- Calculadas por duas agregações $facet (usuários e imóveis) em paralelo
+- Guardadas como snapshot em `stats_snapshots` e renovadas em segundo plano a cada
+  DASHBOARD_STATS_REFRESH_SECONDS; o endpoint só lê o documento (?fresh=1 recalcula)
+"""
+from datetime import datetime, timedelta
+import asyncio
+import os
+import logging
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+stats_snapshots_collection = db.stats_snapshots
+
+DASHBOARD_SNAPSHOT_ID = "admin_dashboard"
+DASHBOARD_STATS_REFRESH_SECONDS = float(os.environ.get("DASHBOARD_STATS_REFRESH_SECONDS", 60))
+PURPOSES = ("VENDA", "ALUGUEL", "ALUGUEL_TEMPORADA")
+
+
+async def _user_facets(seven_days_ago: datetime) -> dict:
+    pipeline = [{"$facet": {
+        "by_status": [
+            {"$group": {
+                "_id": {"status": "$status", "admin": {"$eq": ["$user_type", "admin"]}},
+                "count": {"$sum": 1}
+            }}
+        ],
+        "recent": [
+            {"$match": {"created_at": {"$gte": seven_days_ago}, "user_type": {"$ne": "admin"}}},
+            {"$sort": {"created_at": -1}},
+            {"$limit": 5},
+            {"$project": {"_id": 0, "name": 1, "email": 1, "user_type": 1, "created_at": 1}}
+        ]
+    }}]
+    result = await db.users.aggregate(pipeline).to_list(1)
+    return result[0]
+
+
+async def _property_facets() -> dict:
+    pipeline = [{"$facet": {
+        "total": [{"$count": "count"}],
+        "by_purpose": [{"$group": {"_id": "$purpose", "count": {"$sum": 1}}}],
+        "by_city": [
+            {"$group": {"_id": "$city", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1}},
+            {"$limit": 5}
+        ]
+    }}]
+    result = await db.properties.aggregate(pipeline).to_list(1)
+    return result[0]
+
+
+async def compute_dashboard_stats() -> dict:
+    """Mesmos números do painel, em duas agregações concorrentes"""
+    seven_days_ago = datetime.utcnow() - timedelta(days=7)
+    users, properties, total_services = await asyncio.gather(
+        _user_facets(seven_days_ago),
+        _property_facets(),
+        db.service_providers.estimated_document_count()
+    )
+
+    def users_where(status=None, include_admin=True):
+        return sum(
+            group["count"] for group in users["by_status"]
+            if (status is None or group["_id"].get("status") == status)
+            and (include_admin or not group["_id"].get("admin"))
+        )
+
+    purposes = {group["_id"]: group["count"] for group in properties["by_purpose"]}
+    return {
+        "total_properties": properties["total"][0]["count"] if properties["total"] else 0,
+        "total_users": users_where(include_admin=False),
+        "total_services": total_services,
+        "pending_users": users_where("pending"),
+        "active_users": users_where("active", include_admin=False),
+        "paused_users": users_where("paused"),
+        "properties_by_purpose": {purpose: purposes.get(purpose, 0) for purpose in PURPOSES},
+        "recent_registrations": [
+            {
+                "name": user['name'],
+                "email": user['email'],
+                "type": user['user_type'],
+                "date": user['created_at'].strftime("%d/%m/%Y")
+            }
+            for user in users["recent"]
+        ],
+        "properties_by_city": {city['_id']: city['count'] for city in properties["by_city"]},
+    }
+
+
+async def refresh_dashboard_snapshot() -> dict:
+    stats = await compute_dashboard_stats()
+    stats["as_of"] = datetime.utcnow()
+    await stats_snapshots_collection.replace_one(
+        {"_id": DASHBOARD_SNAPSHOT_ID}, {"_id": DASHBOARD_SNAPSHOT_ID, **stats}, upsert=True
+    )
+    return stats
+
+
+async def get_dashboard_snapshot(fresh: bool = False) -> dict:
+    """Snapshot salvo (um documento); calcula na hora se pedido ou se ainda não existe"""
+    if not fresh:
+        snapshot = await stats_snapshots_collection.find_one({"_id": DASHBOARD_SNAPSHOT_ID})
+        if snapshot:
+            snapshot.pop("_id")
+            return snapshot
+    return await refresh_dashboard_snapshot()
+
+
+async def run_refresh_loop():
+    """Tarefa de fundo do worker (iniciada no startup do server.py)"""
+    interval = timedelta(seconds=DASHBOARD_STATS_REFRESH_SECONDS)
+    while True:
+        try:
+            # Com vários workers, só recalcula quem encontrar o snapshot vencido
+            snapshot = await stats_snapshots_collection.find_one({"_id": DASHBOARD_SNAPSHOT_ID}, {"as_of": 1})
+            if not snapshot or datetime.utcnow() - snapshot["as_of"] >= interval:
+                await refresh_dashboard_snapshot()
+        except Exception as e:
+            logger.warning(f"Dashboard stats refresh failed: {e}")
+        await asyncio.sleep(DASHBOARD_STATS_REFRESH_SECONDS)
@@ -0,0 +1,251 @@
+"""
+Séries diárias para o painel admin (GET /api/admin/analytics/timeseries)
+- Coleção `daily_rollups`: um documento por métrica, dia, cidade, tipo de usuário e
+  finalidade, com a contagem de documentos criados naquele dia
+- Preenchida por um job incremental (a cada ANALYTICS_ROLLUP_INTERVAL_SECONDS) que
+  recalcula só os dias desde a última execução; a primeira execução (ou
+  rollup_analytics.py --full) recalcula todo o histórico
+- A consulta agrega só os rollups do período: um ano inteiro são poucos milhares de
+  documentos pequenos, sem tocar em users/properties/visits
+- Os números são de criação: exclusões posteriores não alteram dias já fechados
+- Uma execução por vez: quem roda reserva o documento de estado (`running_until`,
+  renovado a cada métrica); os outros workers (e o script) esperam a próxima vez
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+import asyncio
+import os
+import uuid
+import logging
+
+from pymongo import DeleteMany, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+daily_rollups_collection = db.daily_rollups
+stats_snapshots_collection = db.stats_snapshots
+
+ROLLUP_STATE_ID = "analytics_rollup"
+WRITE_BATCH_SIZE = 1000
+ANALYTICS_ROLLUP_INTERVAL_SECONDS = float(os.environ.get("ANALYTICS_ROLLUP_INTERVAL_SECONDS", 3600))
+MAX_RANGE_DAYS = 3 * 366
+# Prazo da reserva de uma execução; vencido (worker morto), outro worker assume
+ROLLUP_LEASE = timedelta(minutes=30)
+GROUP_BY_FIELDS = ("city", "user_type", "purpose")
+
+_DAY = {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}}
+
+
+def _owner_stages(local_field: str) -> List[dict]:
+    """Tipo do dono (users.user_type) por $lookup no id"""
+    return [
+        {"$lookup": {"from": "users", "localField": local_field, "foreignField": "id", "as": "owner"}},
+        {"$addFields": {"owner_type": {"$arrayElemAt": ["$owner.user_type", 0]}}},
+    ]
+
+
+# métrica -> (coleção de origem, filtro extra, estágios antes do $group, dimensões)
+METRICS: Dict[str, dict] = {
+    "signups": {
+        "collection": "users",
+        "match": {"user_type": {"$ne": "admin"}},
+        "stages": [],
+        "dimensions": {"city": "$city", "user_type": "$user_type", "purpose": None},
+    },
+    "listings": {
+        "collection": "properties",
+        "match": {},
+        "stages": _owner_stages("owner_id"),
+        "dimensions": {"city": "$city", "user_type": "$owner_type", "purpose": "$purpose"},
+    },
+    "visits": {
+        "collection": "visits",
+        # Cidade e finalidade vêm do imóvel visitado
+        "match": {},
+        "stages": [
+            {"$lookup": {"from": "properties", "localField": "property_id", "foreignField": "id", "as": "property"}},
+            {"$addFields": {
+                "city": {"$arrayElemAt": ["$property.city", 0]},
+                "purpose": {"$arrayElemAt": ["$property.purpose", 0]},
+            }},
+            *_owner_stages("owner_id"),
+        ],
+        "dimensions": {"city": "$city", "user_type": "$owner_type", "purpose": "$purpose"},
+    },
+    # Solicitações de imóveis (formulário público)
+    "leads": {
+        "collection": "property_requests",
+        "match": {},
+        "stages": [],
+        "dimensions": {"city": "$city", "user_type": None, "purpose": "$purpose"},
+    },
+}
+
+
+def _rollup_id(metric: str, day: str, key: dict) -> str:
+    return "|".join([metric, day] + [str(key.get(field) or "") for field in GROUP_BY_FIELDS])
+
+
+async def rollup_metric(metric: str, since: Optional[datetime], computed_at: datetime) -> int:
+    """Recalcula os dias de `since` (meia-noite) até agora; retorna quantos buckets gravou"""
+    spec = METRICS[metric]
+    match = dict(spec["match"])
+    first_day = None
+    if since is not None:
+        day_start = datetime(since.year, since.month, since.day)
+        match["created_at"] = {"$gte": day_start}
+        first_day = day_start.strftime("%Y-%m-%d")
+    else:
+        match["created_at"] = {"$type": "date"}
+
+    dimensions = {field: value for field, value in spec["dimensions"].items() if value}
+    pipeline = [
+        {"$match": match},
+        *spec["stages"],
+        {"$group": {"_id": {"day": _DAY, **dimensions}, "count": {"$sum": 1}}},
+    ]
+    written = 0
+    operations = []
+    async for bucket in db[spec["collection"]].aggregate(pipeline, allowDiskUse=True):
+        key = bucket["_id"]
+        fields = {field: key.get(field) for field in GROUP_BY_FIELDS}
+        operations.append(UpdateOne(
+            {"_id": _rollup_id(metric, key["day"], fields)},
+            {"$set": {"metric": metric, "day": key["day"], **fields, "count": bucket["count"], "computed_at": computed_at}},
+            upsert=True
+        ))
+        if len(operations) >= WRITE_BATCH_SIZE:
+            await daily_rollups_collection.bulk_write(operations, ordered=False)
+            written += len(operations)
+            operations = []
+
+    # Buckets do período que não apareceram nesta execução (dados excluídos/alterados)
+    stale = {"metric": metric, "computed_at": {"$lt": computed_at}}
+    if first_day:
+        stale["day"] = {"$gte": first_day}
+    operations.append(DeleteMany(stale))
+    await daily_rollups_collection.bulk_write(operations, ordered=True)
+    return written + len(operations) - 1
+
+
+async def _claim_run(token: str, interval: timedelta) -> Optional[dict]:
+    """
+    Reserva a execução se não há outra em andamento e a última tem mais de `interval`
+    Retorna o estado anterior ({} na primeira execução) ou None se não conseguiu.
+    """
+    now = datetime.utcnow()
+    try:
+        previous = await stats_snapshots_collection.find_one_and_update(
+            {"_id": ROLLUP_STATE_ID, "$and": [
+                {"$or": [{"running_until": None}, {"running_until": {"$lt": now}}]},
+                {"$or": [{"last_run": None}, {"last_run": {"$lte": now - interval}}]},
+            ]},
+            {"$set": {"running_until": now + ROLLUP_LEASE, "run_token": token}},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+    except DuplicateKeyError:
+        # O estado existe mas não casou: outra execução em andamento ou ainda no prazo
+        return None
+    return previous or {}
+
+
+async def _renew_run(token: str) -> bool:
+    result = await stats_snapshots_collection.update_one(
+        {"_id": ROLLUP_STATE_ID, "run_token": token},
+        {"$set": {"running_until": datetime.utcnow() + ROLLUP_LEASE}}
+    )
+    return result.matched_count == 1
+
+
+async def run_rollups(full: bool = False, interval: timedelta = timedelta(0)) -> Optional[Dict[str, int]]:
+    """
+    Execução incremental (ou completa) de todas as métricas
+    Retorna None sem fazer nada se outra execução tem a reserva (ou a última tem menos
+    de `interval`): duas execuções ao mesmo tempo apagariam os buckets uma da outra.
+    """
+    token = uuid.uuid4().hex
+    state = await _claim_run(token, interval)
+    if state is None:
+        return None
+
+    started = datetime.utcnow()
+    # Folga de uma hora: documentos gravados com created_at um pouco antes da última execução
+    since = state["last_run"] - timedelta(hours=1) if state.get("last_run") and not full else None
+
+    written = {}
+    try:
+        for metric in METRICS:
+            if not await _renew_run(token):
+                logger.warning("Analytics rollup lease lost; another worker took over")
+                return None
+            written[metric] = await rollup_metric(metric, since, started)
+    finally:
+        if len(written) < len(METRICS):
+            # Falhou no meio: libera a reserva sem avançar last_run
+            await stats_snapshots_collection.update_one(
+                {"_id": ROLLUP_STATE_ID, "run_token": token},
+                {"$unset": {"running_until": "", "run_token": ""}}
+            )
+    result = await stats_snapshots_collection.update_one(
+        {"_id": ROLLUP_STATE_ID, "run_token": token},
+        {"$set": {"last_run": started, "buckets": written}, "$unset": {"running_until": "", "run_token": ""}}
+    )
+    if not result.matched_count:
+        logger.warning("Analytics rollup lease lost before saving the state")
+        return None
+    logger.info(f"Analytics rollups updated since {since or 'the beginning'}: {written}")
+    return written
+
+
+async def run_rollup_loop():
+    """Tarefa de fundo do worker (iniciada no startup do server.py)"""
+    interval = timedelta(seconds=ANALYTICS_ROLLUP_INTERVAL_SECONDS)
+    while True:
+        try:
+            # Com vários workers, só roda quem reservar a execução vencida
+            await run_rollups(interval=interval)
+        except Exception as e:
+            logger.warning(f"Analytics rollup failed: {e}")
+        await asyncio.sleep(min(ANALYTICS_ROLLUP_INTERVAL_SECONDS, 300))
+
+
+async def timeseries(metric: str, start: date, end: date, group_by: Optional[str] = None) -> dict:
+    """Contagem diária (dias sem registro = 0), opcionalmente separada por uma dimensão"""
+    match = {"metric": metric, "day": {"$gte": start.isoformat(), "$lte": end.isoformat()}}
+    group_key = {"day": "$day"}
+    if group_by:
+        group_key["key"] = f"${group_by}"
+    pipeline = [
+        {"$match": match},
+        {"$group": {"_id": group_key, "count": {"$sum": "$count"}}},
+    ]
+
+    days = [(start + timedelta(days=offset)).isoformat() for offset in range((end - start).days + 1)]
+    series: Dict[Optional[str], Dict[str, int]] = {}
+    async for bucket in daily_rollups_collection.aggregate(pipeline):
+        key = bucket["_id"].get("key")
+        series.setdefault(key, {})[bucket["_id"]["day"]] = bucket["count"]
+    if not group_by:
+        series.setdefault(None, {})
+
+    state = await stats_snapshots_collection.find_one({"_id": ROLLUP_STATE_ID}, {"last_run": 1})
+    ordered = sorted(series.items(), key=lambda item: -sum(item[1].values()))
+    return {
+        "metric": metric,
+        "from": start,
+        "to": end,
+        "group_by": group_by,
+        "series": [
+            {
+                "key": key,
+                "total": sum(counts.values()),
+                "points": [{"date": day, "count": counts.get(day, 0)} for day in days],
+            }
+            for key, counts in ordered
+        ],
+        "as_of": state["last_run"] if state else None,
+    }
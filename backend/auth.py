@@ -1,12 +1,20 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
 import os
+import time
 import logging
 
+from token_versions import token_versions
+from auth_sessions import ACCESS_TOKEN_EXPIRE_MINUTES, revoked_sessions
+
 logger = logging.getLogger(__name__)
 
 # Configuration
@@ -15,7 +23,6 @@ if not SECRET_KEY:
     logger.warning("SECRET_KEY not found in environment. Using default for development only!")
     SECRET_KEY = "dev-only-secret-key-change-in-production"
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
@@ -34,9 +41,88 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
-    """Create a JWT access token"""
-    to_encode = data.copy()
+# ==========================================
+# POOL DE HASH DE SENHAS (bcrypt fora do event loop)
+# ==========================================
+
+# bcrypt libera o GIL: threads dedicadas rodam em paralelo sem travar o event loop
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+# Operações aguardando + em execução; acima disso a requisição é recusada com 503
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", PASSWORD_HASH_WORKERS * 8))
+
+
+class PasswordHashPool:
+    """Executa bcrypt em um pool limitado e descarta o excesso em vez de enfileirar sem fim"""
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed_total = 0
+        self.shed_total = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+
+    async def run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.shed_total += 1
+            logger.warning(f"Password hash pool saturated ({self.pending} pending), shedding request")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servidor ocupado. Tente novamente em instantes.",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        loop = asyncio.get_running_loop()
+        future = self._executor.submit(func, *args)
+        # A vaga só é liberada quando a thread termina (um await cancelado não para o bcrypt)
+        future.add_done_callback(lambda f: loop.call_soon_threadsafe(self._release, f))
+        return await asyncio.wrap_future(future)
+
+    def _release(self, future):
+        self.pending -= 1
+        if not future.cancelled() and future.exception() is None:
+            self.completed_total += 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "in_flight": min(self.pending, self.workers),
+            "queue_depth": max(0, self.pending - self.workers),
+            "max_pending": self.max_pending,
+            "completed_total": self.completed_total,
+            "shed_total": self.shed_total,
+        }
+
+
+password_hash_pool = PasswordHashPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password no pool de bcrypt (use nas rotas async)"""
+    return await password_hash_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash no pool de bcrypt (use nas rotas async)"""
+    return await password_hash_pool.run(get_password_hash, password)
+
+
+def create_access_token(
+    user: dict, session_id: Optional[str] = None, expires_delta: Optional[timedelta] = None
+) -> str:
+    """
+    Create a short-lived JWT access token for a user document
+    As claims (uid, user_type, status, ver, sid) permitem checar papel e revogação sem ir ao banco.
+    """
+    to_encode = {
+        "sub": user["email"],
+        "uid": user["id"],
+        "user_type": user.get("user_type"),
+        "status": user.get("status"),
+        "ver": token_versions.current(user["id"]),
+    }
+    if session_id:
+        to_encode["sid"] = session_id
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
@@ -46,27 +132,103 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# ==========================================
+# CACHE DE TOKENS VERIFICADOS
+# ==========================================
+
+# O mesmo token é reenviado em todas as requisições da sessão: a assinatura só é
+# verificada na primeira vez. A revogação (versão do usuário) é checada sempre,
+# fora do cache, em get_token_claims.
+TOKEN_CACHE_MAX_SIZE = int(os.environ.get("TOKEN_CACHE_MAX_SIZE", 10000))
+
+
+class VerifiedTokenCache:
+    """LRU sha256(token) -> (exp, payload); a entrada vale até o exp do próprio token"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, Tuple[float, dict]]" = OrderedDict()
+
+    def get(self, key: bytes) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, payload = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return payload
+
+    def put(self, key: bytes, payload: dict):
+        if self.max_size <= 0 or "exp" not in payload:
+            return
+        self._entries[key] = (float(payload["exp"]), payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+token_cache = VerifiedTokenCache(TOKEN_CACHE_MAX_SIZE)
+
+
 def decode_token(token: str) -> dict:
-    """Decode and verify a JWT token"""
+    """Decode and verify a JWT token (cached until it expires)"""
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is not None:
+        return payload
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    token_cache.put(key, payload)
+    return payload
 
-def get_current_user_email(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
-    """Get current user email from token"""
-    token = credentials.credentials
-    payload = decode_token(token)
-    email: str = payload.get("sub")
-    if email is None:
+def get_token_claims(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """Claims do token validado (assinatura, expiração e versão do usuário)"""
+    payload = decode_token(credentials.credentials)
+    if payload.get("sub") is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return email
+    # Tokens antigos (sem uid) seguem válidos até expirar; as rotas consultam o usuário
+    revoked = (
+        ("uid" in payload and not token_versions.is_current(payload["uid"], payload.get("ver", 0)))
+        or ("sid" in payload and revoked_sessions.is_revoked(payload["sid"]))
+    )
+    if revoked:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Sessão expirada. Faça login novamente.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
+
+def get_current_user_email(claims: dict = Depends(get_token_claims)) -> str:
+    """Get current user email from token"""
+    return claims["sub"]
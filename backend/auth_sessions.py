@@ -0,0 +1,227 @@
+"""
+Sessões de login e refresh tokens
+- Access token curto (ACCESS_TOKEN_EXPIRE_MINUTES) com a claim `sid` da sessão
+- Refresh token opaco "<sid>.<segredo>", trocado a cada uso (POST /api/auth/refresh);
+  só o SHA-256 do segredo fica no banco (coleção `sessions`)
+- Reapresentar um refresh token já trocado revoga a sessão (token vazado); dentro de
+  REFRESH_REUSE_GRACE responde 409 e o cliente usa os tokens que a outra aba gravou
+- Sessões revogadas nos últimos minutos ficam em memória (filtro de Bloom + conjunto
+  exato), relidas a cada REVOKED_SESSIONS_SYNC_SECONDS: a verificação do access token
+  continua sem banco e a revogação vale em segundos em todos os workers
+"""
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+import asyncio
+import hashlib
+import math
+import os
+import secrets
+import uuid
+import logging
+
+from fastapi import HTTPException, status
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+sessions_collection = db.sessions
+
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES", 15))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.environ.get("REFRESH_TOKEN_EXPIRE_DAYS", 30))
+REVOKED_SESSIONS_SYNC_SECONDS = float(os.environ.get("REVOKED_SESSIONS_SYNC_SECONDS", 30))
+REVOKED_FILTER_CAPACITY = int(os.environ.get("REVOKED_FILTER_CAPACITY", 10000))
+# Duas abas renovando ao mesmo tempo: a segunda apresenta o token anterior
+REFRESH_REUSE_GRACE = timedelta(seconds=30)
+
+
+def _hash_secret(secret: str) -> str:
+    return hashlib.sha256(secret.encode()).hexdigest()
+
+
+def _invalid_refresh() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Sessão expirada. Faça login novamente."
+    )
+
+
+# ==========================================
+# SESSÕES REVOGADAS EM MEMÓRIA
+# ==========================================
+
+class BloomFilter:
+    """Filtro de Bloom simples (bits em bytearray, k posições do blake2b)"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, min(8, round(self.size / capacity * math.log(2))))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=32).digest()
+        for i in range(self.hashes):
+            yield int.from_bytes(digest[i * 4:(i + 1) * 4], "little") % self.size
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevokedSessions:
+    """
+    Ids de sessões revogadas cujos access tokens ainda podem estar no prazo
+    O filtro descarta quase todas as consultas; o conjunto exato elimina os falsos positivos.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._bloom = BloomFilter(capacity)
+        self._exact = set()
+        self._local = {}        # revogadas neste worker -> quando (cobre a corrida com sync)
+        self.last_sync = None
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def add(self, session_id: str):
+        self._exact.add(session_id)
+        self._bloom.add(session_id)
+        self._local[session_id] = datetime.utcnow()
+
+    def is_revoked(self, session_id: str) -> bool:
+        return session_id in self._bloom and session_id in self._exact
+
+    async def sync(self):
+        """Reconstrói a partir das revogações ainda relevantes (o resto já expirou sozinho)"""
+        started = datetime.utcnow()
+        window = started - timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES + 1)
+        cursor = sessions_collection.find({"revoked_at": {"$gte": window}}, {"_id": 0, "id": 1})
+        ids = [doc["id"] async for doc in cursor]
+
+        # Revogações locais feitas durante a consulta continuam valendo
+        self._local = {sid: at for sid, at in self._local.items() if at >= started}
+        exact = set(ids) | set(self._local)
+
+        bloom = BloomFilter(max(self.capacity, len(exact)))
+        for session_id in exact:
+            bloom.add(session_id)
+        self._exact = exact
+        self._bloom = bloom
+        self.last_sync = started
+
+    def stats(self) -> dict:
+        return {
+            "revoked_in_memory": len(self._exact),
+            "filter_bits": self._bloom.size,
+            "filter_hashes": self._bloom.hashes,
+            "last_sync": self.last_sync,
+            "sync_interval_seconds": REVOKED_SESSIONS_SYNC_SECONDS,
+        }
+
+
+revoked_sessions = RevokedSessions(REVOKED_FILTER_CAPACITY)
+
+
+async def run_sync_loop():
+    """Tarefa de fundo do worker (iniciada no startup do server.py)"""
+    while True:
+        await asyncio.sleep(REVOKED_SESSIONS_SYNC_SECONDS)
+        try:
+            await revoked_sessions.sync()
+        except Exception as e:
+            logger.warning(f"Revoked sessions sync failed: {e}")
+
+
+# ==========================================
+# SESSÕES
+# ==========================================
+
+async def create_session(user_id: str, user_agent: Optional[str] = None) -> Tuple[dict, str]:
+    """Abre uma sessão e retorna (sessão, refresh token)"""
+    now = datetime.utcnow()
+    secret = secrets.token_urlsafe(32)
+    session = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "refresh_hash": _hash_secret(secret),
+        "previous_hash": None,
+        "user_agent": (user_agent or "")[:200],
+        "created_at": now,
+        "last_used_at": now,
+        "rotated_at": None,
+        "expires_at": now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        "revoked_at": None,
+    }
+    await sessions_collection.insert_one(session)
+    session.pop("_id", None)
+    return session, f"{session['id']}.{secret}"
+
+
+async def rotate_session(refresh_token: str) -> Tuple[dict, str]:
+    """Troca o refresh token (uso único) e retorna (sessão, novo refresh token)"""
+    session_id, _, secret = refresh_token.partition(".")
+    if not session_id or not secret:
+        raise _invalid_refresh()
+
+    now = datetime.utcnow()
+    presented = _hash_secret(secret)
+    new_secret = secrets.token_urlsafe(32)
+    result = await sessions_collection.update_one(
+        {"id": session_id, "refresh_hash": presented, "revoked_at": None, "expires_at": {"$gt": now}},
+        {"$set": {
+            "refresh_hash": _hash_secret(new_secret),
+            "previous_hash": presented,
+            "rotated_at": now,
+            "last_used_at": now,
+            "expires_at": now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        }}
+    )
+    if result.modified_count == 0:
+        session = await sessions_collection.find_one({"id": session_id}, {"_id": 0})
+        if session and session["revoked_at"] is None and session["previous_hash"] == presented and session["rotated_at"]:
+            if now - session["rotated_at"] <= REFRESH_REUSE_GRACE:
+                # Corrida entre abas: outra aba acabou de trocar o token e grava os novos no
+                # localStorage; o cliente relê de lá em vez de encerrar a sessão
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Sessão renovada em outra aba"
+                )
+            # Token antigo reaparecendo fora da janela de corrida: provável vazamento
+            logger.warning(f"Refresh token reuse detected, revoking session {session_id}")
+            await revoke_session(session_id)
+        raise _invalid_refresh()
+
+    session = await sessions_collection.find_one({"id": session_id}, {"_id": 0})
+    return session, f"{session_id}.{new_secret}"
+
+
+async def revoke_session(session_id: str):
+    await sessions_collection.update_one(
+        {"id": session_id, "revoked_at": None},
+        {"$set": {"revoked_at": datetime.utcnow()}}
+    )
+    revoked_sessions.add(session_id)
+
+
+async def revoke_user_sessions(user_id: str) -> int:
+    """Revoga todas as sessões abertas do usuário (pausa, troca de senha, exclusão)"""
+    return await revoke_users_sessions([user_id])
+
+
+async def revoke_users_sessions(user_ids: List[str]) -> int:
+    """Mesma revogação para vários usuários em duas consultas (operações em massa)"""
+    cursor = sessions_collection.find({"user_id": {"$in": user_ids}, "revoked_at": None}, {"_id": 0, "id": 1})
+    ids = [doc["id"] async for doc in cursor]
+    if ids:
+        await sessions_collection.update_many(
+            {"id": {"$in": ids}},
+            {"$set": {"revoked_at": datetime.utcnow()}}
+        )
+        for session_id in ids:
+            revoked_sessions.add(session_id)
+    return len(ids)
+
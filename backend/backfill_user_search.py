@@ -0,0 +1,48 @@
+"""
+Backfill dos campos de busca do admin (user_search.py)
+Grava search_keys e search_name em todos os usuários. Necessário uma vez na
+implantação da busca e depois de edições feitas direto no banco (scripts de seed,
+ajustes manuais); as rotas de cadastro e edição já mantêm os campos.
+
+Uso: python backfill_user_search.py
+"""
+import asyncio
+import time
+
+from pymongo import UpdateOne
+
+from database import client, db
+from user_search import search_fields
+
+BATCH_SIZE = 1000
+SOURCE_FIELDS = ("id", "email", "name", "phone", "cpf", "cnpj", "creci", "company", "razao_social",
+                 "search_keys", "search_name")
+
+
+async def main():
+    start = time.perf_counter()
+    scanned = updated = 0
+    operations = []
+    cursor = db.users.find({}, {"_id": 0, **{field: 1 for field in SOURCE_FIELDS}})
+    async for user in cursor:
+        scanned += 1
+        fields = search_fields(user)
+        if all(user.get(field) == value for field, value in fields.items()):
+            continue
+        operations.append(UpdateOne({"id": user["id"]}, {"$set": fields}))
+        if len(operations) >= BATCH_SIZE:
+            await db.users.bulk_write(operations, ordered=False)
+            updated += len(operations)
+            operations = []
+    if operations:
+        await db.users.bulk_write(operations, ordered=False)
+        updated += len(operations)
+
+    print("=" * 60)
+    print(f"{scanned} usuário(s) lidos, {updated} atualizado(s) em {time.perf_counter() - start:.1f}s")
+    print("=" * 60)
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
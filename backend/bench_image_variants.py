@@ -0,0 +1,53 @@
+"""
+Benchmark do pipeline de variantes de imagem
+Mede imagens processadas por segundo (total e por core) usando o pool de processos.
+Uso: python bench_image_variants.py [quantidade_de_imagens] [workers]
+"""
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+from images import process_image
+
+
+def make_sample(directory: Path, index: int) -> str:
+    """Foto sintética no tamanho típico de celular (4000x3000 JPEG)"""
+    from PIL import Image
+
+    path = directory / f"sample_{index}.jpg"
+    noise = Image.effect_noise((4000, 3000), 64).convert("RGB")
+    noise.save(path, "JPEG", quality=90)
+    return str(path)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        print(f"Gerando {count} imagens 4000x3000...")
+        sources = [make_sample(tmp_dir, i) for i in range(count)]
+        output = str(tmp_dir / "variants")
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+            # Aquecer os processos (import do Pillow) fora da medição
+            list(pool.map(int, range(workers)))
+
+            start = time.perf_counter()
+            list(pool.map(process_image, sources, [output] * count))
+            elapsed = time.perf_counter() - start
+
+    rate = count / elapsed
+    print("=" * 60)
+    print(f"Imagens: {count} | Workers: {workers} | Tempo: {elapsed:.2f}s")
+    print(f"Throughput: {rate:.2f} imagens/s ({rate / workers:.2f} imagens/s por core)")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
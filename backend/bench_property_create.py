@@ -0,0 +1,106 @@
+"""
+Benchmark do cadastro de imóvel com imagens
+Compara o fluxo antigo (grava cada imagem em sequência e só então geocodifica)
+com o pipeline concorrente de routes/property_routes.py.
+
+A latência do Nominatim é simulada (--geocode-ms) para não violar a política de
+uso do serviço; as imagens são gravadas de verdade no armazenamento local,
+em um diretório temporário.
+
+Uso: python bench_property_create.py [quantidade_de_imagens] [--geocode-ms N] [--runs N]
+"""
+from pathlib import Path
+import asyncio
+import io
+import statistics
+import sys
+import tempfile
+import time
+
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+import media_store
+import storage
+from database import client
+from routes import property_routes
+
+
+def make_upload(index: int, seed: int) -> UploadFile:
+    """Foto sintética de celular reduzida (2000x1500 JPEG, ~1-2MB), bytes únicos por execução"""
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    noise = Image.effect_noise((2000, 1500), 40 + (seed * 31 + index) % 50).convert("RGB")
+    noise.putpixel((0, 0), (seed % 256, index % 256, 0))
+    noise.save(buffer, "JPEG", quality=90)
+    buffer.seek(0)
+    return UploadFile(file=buffer, filename=f"foto_{index}.jpg", headers=Headers({"content-type": "image/jpeg"}))
+
+
+async def fake_geocode(delay: float) -> dict:
+    await asyncio.sleep(delay)
+    return {"latitude": -20.4697, "longitude": -54.6201}
+
+
+async def sequential(uploads, delay: float):
+    """Fluxo anterior: for + await em cada imagem, depois a geocodificação"""
+    urls = []
+    for upload in uploads:
+        urls.append(await property_routes.save_upload_file(upload, "bench"))
+    await fake_geocode(delay)
+    return urls
+
+
+async def concurrent(uploads, delay: float):
+    """Fluxo atual: gravação limitada em paralelo junto com a geocodificação"""
+    (urls, _errors), _geo = await asyncio.gather(
+        property_routes.save_upload_files(uploads, "bench"),
+        fake_geocode(delay)
+    )
+    return urls
+
+
+async def main():
+    args = sys.argv[1:]
+    count = int(args[0]) if args and args[0].isdigit() else 10
+    delay = float(args[args.index("--geocode-ms") + 1]) / 1000 if "--geocode-ms" in args else 0.4
+    runs = int(args[args.index("--runs") + 1]) if "--runs" in args else 5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Armazenamento isolado: nada é gravado em backend/uploads
+        storage._storage = storage.LocalStorage(root=Path(tmp))
+        media_store.UPLOAD_ROOT = Path(tmp)
+
+        print(f"Gerando {count * runs * 2} imagens...")
+        batches = [[make_upload(i, seed) for i in range(count)] for seed in range(runs * 2)]
+
+        timings = {"sequencial": [], "concorrente": []}
+        shas = []
+        for run in range(runs):
+            for name, flow, batch in (
+                ("sequencial", sequential, batches[run * 2]),
+                ("concorrente", concurrent, batches[run * 2 + 1]),
+            ):
+                start = time.perf_counter()
+                urls = await flow(batch, delay)
+                timings[name].append(time.perf_counter() - start)
+                shas.extend(media_store.blob_sha256(url) for url in urls)
+
+        await media_store.media_blobs_collection.delete_many({"sha256": {"$in": shas}})
+
+    print("=" * 60)
+    print(f"Imagens: {count} | Geocodificação simulada: {delay * 1000:.0f}ms | "
+          f"Concorrência: {property_routes.IMAGE_SAVE_CONCURRENCY} | Execuções: {runs}")
+    for name, values in timings.items():
+        print(f"   {name:<12} mediana {statistics.median(values) * 1000:7.1f}ms | "
+              f"mín {min(values) * 1000:7.1f}ms | máx {max(values) * 1000:7.1f}ms")
+    speedup = statistics.median(timings["sequencial"]) / statistics.median(timings["concorrente"])
+    print(f"   Ganho: {speedup:.2f}x")
+    print("=" * 60)
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+"""
+Microbenchmark da autenticação por requisição
+Mede get_token_claims (decodificação do JWT + checagem de versão) com o mesmo
+token reutilizado, como acontece durante uma sessão: sem cache cada chamada
+verifica a assinatura HMAC e faz o parse das claims; com cache só a primeira.
+
+Não acessa o banco.
+
+Uso: python bench_token_auth.py [iterações] [--tokens N]
+"""
+import statistics
+import sys
+import time
+import uuid
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+import auth
+
+
+def make_tokens(count: int) -> list:
+    return [
+        auth.create_access_token({
+            "id": str(uuid.uuid4()),
+            "email": f"usuario{i}@imovlocal.com",
+            "user_type": "corretor",
+            "status": "active",
+        })
+        for i in range(count)
+    ]
+
+
+def run(credentials: list, iterations: int) -> float:
+    """Microssegundos por chamada"""
+    start = time.perf_counter()
+    for i in range(iterations):
+        auth.get_token_claims(credentials[i % len(credentials)])
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def main():
+    args = sys.argv[1:]
+    iterations = int(args[0]) if args and args[0].isdigit() else 20000
+    token_count = int(args[args.index("--tokens") + 1]) if "--tokens" in args else 50
+
+    credentials = [
+        HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+        for token in make_tokens(token_count)
+    ]
+
+    results = {"sem cache": [], "com cache": []}
+    for _ in range(5):
+        auth.token_cache.max_size = 0
+        auth.token_cache.clear()
+        results["sem cache"].append(run(credentials, iterations))
+
+        auth.token_cache.max_size = auth.TOKEN_CACHE_MAX_SIZE
+        auth.token_cache.clear()
+        auth.token_cache.hits = auth.token_cache.misses = 0
+        results["com cache"].append(run(credentials, iterations))
+
+    print("=" * 60)
+    print(f"Iterações: {iterations} | Tokens distintos: {token_count}")
+    for name, values in results.items():
+        print(f"   {name:<10} mediana {statistics.median(values):7.2f}µs/req | "
+              f"mín {min(values):7.2f}µs | máx {max(values):7.2f}µs")
+    speedup = statistics.median(results["sem cache"]) / statistics.median(results["com cache"])
+    print(f"   Ganho: {speedup:.1f}x | cache: {auth.token_cache.stats()}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+Estatísticas do Mural de Oportunidades (GET /api/admin/opportunities-board)
+- Um documento materializado na coleção `board_stats`, atualizado com $inc pelas rotas
+  de demandas e propostas (criação, troca de status, exclusão)
+- Listas curtas (demandas/propostas recentes, parcerias, usuários mais ativos) ficam
+  pré-calculadas como arrays limitados ($push com $sort/$slice)
+- O endpoint lê só esse documento; rebuild_board_stats.py (ou ?fresh=1) recalcula tudo
+  a partir das coleções — use na implantação e para corrigir desvios
+"""
+from datetime import datetime
+from typing import Dict, Optional
+import logging
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+board_stats_collection = db.board_stats
+
+BOARD_STATS_ID = "opportunities_board"
+RECENT_LIMIT = 10
+PARTNERSHIPS_LIMIT = 10
+TOP_USERS_SHOWN = 5
+# Guarda mais que o exibido: exclusões não derrubam quem está logo abaixo do top 5
+TOP_USERS_KEPT = 20
+NONE_KEY = "-"
+
+
+def _key(value: Optional[str]) -> str:
+    """Valor como chave de campo do Mongo (sem '.', '$' inicial ou vazio)"""
+    if not value:
+        return NONE_KEY
+    value = getattr(value, "value", value)  # enums dos modelos
+    return value.replace(".", "．").replace("$", "＄")
+
+
+def _unkey(key: str) -> Optional[str]:
+    if key == NONE_KEY:
+        return None
+    return key.replace("．", ".").replace("＄", "$")
+
+
+def _counts(doc: dict, field: str) -> Dict[Optional[str], int]:
+    return {_unkey(key): count for key, count in (doc.get(field) or {}).items() if count > 0}
+
+
+async def _inc(deltas: dict):
+    """$inc no documento; sem documento ainda (antes do rebuild) não faz nada"""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if deltas:
+        await board_stats_collection.update_one({"_id": BOARD_STATS_ID}, {"$inc": deltas})
+
+
+def _demand_entry(demand: dict, email: Optional[str]) -> dict:
+    return {
+        "id": demand.get("id"),
+        "title": demand.get("titulo"),
+        "property_type": demand.get("tipo_imovel"),
+        "city": demand.get("cidade"),
+        "status": demand.get("status"),
+        "created_at": demand.get("created_at"),
+        "corretor_email": email,
+    }
+
+
+def _proposal_entry(proposal: dict, email: Optional[str]) -> dict:
+    return {
+        "id": proposal.get("id"),
+        "demand_id": proposal.get("demand_id"),
+        "status": proposal.get("status"),
+        "created_at": proposal.get("created_at"),
+        "corretor_email": email,
+    }
+
+
+def _partnership_entry(proposal: dict, demand: dict, proposer: dict, demander: dict) -> dict:
+    return {
+        "proposal_id": proposal.get("id"),
+        "demand_id": demand.get("id"),
+        "demand_title": demand.get("titulo"),
+        "property_type": demand.get("tipo_imovel"),
+        "proposer_name": proposer.get("name"),
+        "proposer_email": proposer.get("email"),
+        "demander_name": demander.get("name"),
+        "demander_email": demander.get("email"),
+        "created_at": proposal.get("created_at"),
+        "message": proposal.get("message"),
+    }
+
+
+async def _push_capped(field: str, entry: dict, limit: int, sort_field: str = "created_at"):
+    await board_stats_collection.update_one(
+        {"_id": BOARD_STATS_ID},
+        {"$push": {field: {"$each": [entry], "$sort": {sort_field: -1}, "$slice": limit}}}
+    )
+
+
+# ==========================================
+# EVENTOS (chamados por routes/demand_routes.py)
+# ==========================================
+
+async def demand_created(demand: dict, user: dict):
+    await _inc({
+        "demands.total": 1,
+        f"demands.by_status.{_key(demand['status'])}": 1,
+        f"demands_by_type.{_key(demand.get('tipo_imovel'))}": 1,
+        f"demands_by_city.{_key(demand.get('cidade'))}": 1,
+    })
+    await _push_capped("recent_demands", _demand_entry(demand, user.get("email")), RECENT_LIMIT)
+
+    # Usuários mais ativos: reposiciona o autor com o total atual de demandas
+    demand_count = await db.demands.count_documents({"corretor_id": user["id"]})
+    await board_stats_collection.update_one(
+        {"_id": BOARD_STATS_ID},
+        {"$pull": {"top_users": {"user_id": user["id"]}}}
+    )
+    await board_stats_collection.update_one(
+        {"_id": BOARD_STATS_ID, "top_users.user_id": {"$ne": user["id"]}},
+        {"$push": {"top_users": {
+            "$each": [{"user_id": user["id"], "name": user.get("name"), "email": user.get("email"), "demand_count": demand_count}],
+            "$sort": {"demand_count": -1},
+            "$slice": TOP_USERS_KEPT,
+        }}}
+    )
+
+
+async def demand_updated(demand_id: str, previous: dict, changes: dict):
+    """previous: documento antes da atualização (status e cidade)"""
+    deltas = {}
+    if "status" in changes and changes["status"] != previous.get("status"):
+        deltas[f"demands.by_status.{_key(previous.get('status'))}"] = -1
+        deltas[f"demands.by_status.{_key(changes['status'])}"] = 1
+    if "cidade" in changes and changes["cidade"] != previous.get("cidade"):
+        deltas[f"demands_by_city.{_key(previous.get('cidade'))}"] = -1
+        deltas[f"demands_by_city.{_key(changes['cidade'])}"] = 1
+    if not deltas:
+        return
+    await _inc(deltas)
+    recent = {}
+    if "status" in changes:
+        recent["recent_demands.$.status"] = changes["status"]
+    if "cidade" in changes:
+        recent["recent_demands.$.city"] = changes["cidade"]
+    await board_stats_collection.update_one(
+        {"_id": BOARD_STATS_ID, "recent_demands.id": demand_id},
+        {"$set": recent}
+    )
+
+
+async def demand_deleted(demand: dict, proposal_statuses: Dict[str, int]):
+    """proposal_statuses: status -> quantidade das propostas excluídas junto com a demanda"""
+    deltas = {
+        "demands.total": -1,
+        f"demands.by_status.{_key(demand.get('status'))}": -1,
+        f"demands_by_type.{_key(demand.get('tipo_imovel'))}": -1,
+        f"demands_by_city.{_key(demand.get('cidade'))}": -1,
+        "proposals.total": -sum(proposal_statuses.values()),
+    }
+    for proposal_status, count in proposal_statuses.items():
+        deltas[f"proposals.by_status.{_key(proposal_status)}"] = -count
+    await _inc(deltas)
+    await board_stats_collection.update_one(
+        {"_id": BOARD_STATS_ID},
+        {"$pull": {
+            "recent_demands": {"id": demand["id"]},
+            "recent_proposals": {"demand_id": demand["id"]},
+            "partnerships": {"demand_id": demand["id"]},
+        }}
+    )
+    # Quem estava abaixo da lista guardada só volta a ela no próximo rebuild
+    await board_stats_collection.update_one(
+        {"_id": BOARD_STATS_ID, "top_users.user_id": demand.get("corretor_id")},
+        {"$inc": {"top_users.$.demand_count": -1}}
+    )
+
+
+async def proposal_created(proposal: dict, user: dict):
+    await _inc({
+        "proposals.total": 1,
+        f"proposals.by_status.{_key(proposal['status'])}": 1,
+    })
+    await _push_capped("recent_proposals", _proposal_entry(proposal, user.get("email")), RECENT_LIMIT)
+
+
+async def proposal_status_changed(proposal_id: str, old_status: Optional[str], new_status: str):
+    if old_status == new_status:
+        return
+    await _inc({
+        f"proposals.by_status.{_key(old_status)}": -1,
+        f"proposals.by_status.{_key(new_status)}": 1,
+    })
+    await board_stats_collection.update_one(
+        {"_id": BOARD_STATS_ID, "recent_proposals.id": proposal_id},
+        {"$set": {"recent_proposals.$.status": new_status}}
+    )
+
+
+async def partnership_recorded(proposal: dict, demand: dict, proposer: dict, demander: dict):
+    """Proposta aceita entra nas últimas parcerias"""
+    await _push_capped(
+        "partnerships", _partnership_entry(proposal, demand, proposer, demander), PARTNERSHIPS_LIMIT
+    )
+
+
+# ==========================================
+# REBUILD E LEITURA
+# ==========================================
+
+async def _grouped(collection, key: str) -> Dict[str, int]:
+    pipeline = [{"$group": {"_id": f"${key}", "count": {"$sum": 1}}}]
+    return {_key(doc["_id"]): doc["count"] async for doc in collection.aggregate(pipeline)}
+
+
+async def _emails(user_ids) -> Dict[str, dict]:
+    cursor = db.users.find({"id": {"$in": list(set(user_ids))}}, {"_id": 0, "id": 1, "name": 1, "email": 1})
+    return {user["id"]: user async for user in cursor}
+
+
+async def compute_board_stats() -> dict:
+    """Documento completo a partir das coleções de demandas e propostas"""
+    demands_by_status = await _grouped(db.demands, "status")
+    proposals_by_status = await _grouped(db.proposals, "status")
+
+    recent_demands = await db.demands.find({}, {"_id": 0}).sort("created_at", -1).limit(RECENT_LIMIT).to_list(RECENT_LIMIT)
+    recent_proposals = await db.proposals.find({}, {"_id": 0}).sort("created_at", -1).limit(RECENT_LIMIT).to_list(RECENT_LIMIT)
+
+    top_pipeline = [
+        {"$group": {"_id": "$corretor_id", "demand_count": {"$sum": 1}}},
+        {"$sort": {"demand_count": -1}},
+        {"$limit": TOP_USERS_KEPT},
+    ]
+    top = await db.demands.aggregate(top_pipeline).to_list(TOP_USERS_KEPT)
+
+    accepted = await db.proposals.find({"status": "accepted"}, {"_id": 0}).sort("created_at", -1).to_list(None)
+    demand_ids = list({proposal["demand_id"] for proposal in accepted})
+    demands = {d["id"]: d async for d in db.demands.find({"id": {"$in": demand_ids}}, {"_id": 0})}
+
+    users = await _emails(
+        [d.get("corretor_id") for d in recent_demands]
+        + [p.get("ofertante_id") for p in recent_proposals + accepted]
+        + [entry["_id"] for entry in top]
+        + [d.get("corretor_id") for d in demands.values()]
+    )
+
+    partnerships = []
+    for proposal in accepted:
+        demand = demands.get(proposal["demand_id"])
+        proposer = users.get(proposal.get("ofertante_id"))
+        demander = users.get(demand.get("corretor_id")) if demand else None
+        if demand and proposer and demander:
+            partnerships.append(_partnership_entry(proposal, demand, proposer, demander))
+            if len(partnerships) == PARTNERSHIPS_LIMIT:
+                break
+
+    return {
+        "demands": {"total": sum(demands_by_status.values()), "by_status": demands_by_status},
+        "proposals": {"total": sum(proposals_by_status.values()), "by_status": proposals_by_status},
+        "demands_by_type": await _grouped(db.demands, "tipo_imovel"),
+        "demands_by_city": await _grouped(db.demands, "cidade"),
+        "recent_demands": [
+            _demand_entry(d, users.get(d.get("corretor_id"), {}).get("email")) for d in recent_demands
+        ],
+        "recent_proposals": [
+            _proposal_entry(p, users.get(p.get("ofertante_id"), {}).get("email")) for p in recent_proposals
+        ],
+        "top_users": [
+            {"user_id": entry["_id"], "name": users[entry["_id"]].get("name"),
+             "email": users[entry["_id"]].get("email"), "demand_count": entry["demand_count"]}
+            for entry in top if entry["_id"] in users
+        ],
+        "partnerships": partnerships,
+    }
+
+
+async def rebuild_board_stats() -> dict:
+    """Recalcula e substitui o documento (escritas concorrentes podem deixar desvio mínimo)"""
+    stats = await compute_board_stats()
+    stats["rebuilt_at"] = datetime.utcnow()
+    await board_stats_collection.replace_one(
+        {"_id": BOARD_STATS_ID}, {"_id": BOARD_STATS_ID, **stats}, upsert=True
+    )
+    logger.info("Opportunities board stats rebuilt")
+    return stats
+
+
+def board_response(doc: dict) -> dict:
+    """Formato da resposta do endpoint a partir do documento materializado"""
+    demands = _counts(doc.get("demands") or {}, "by_status")
+    proposals = _counts(doc.get("proposals") or {}, "by_status")
+    total_proposals = max(0, (doc.get("proposals") or {}).get("total", 0))
+    accepted = proposals.get("accepted", 0)
+
+    by_type = sorted(_counts(doc, "demands_by_type").items(), key=lambda item: -item[1])
+    by_city = sorted(_counts(doc, "demands_by_city").items(), key=lambda item: -item[1])[:5]
+    top_users = sorted(doc.get("top_users") or [], key=lambda user: -user["demand_count"])
+
+    return {
+        "statistics": {
+            "demands": {
+                "total": max(0, (doc.get("demands") or {}).get("total", 0)),
+                "active": demands.get("active", 0),
+                "fulfilled": demands.get("closed", 0),
+                "cancelled": demands.get("cancelled", 0)
+            },
+            "proposals": {
+                "total": total_proposals,
+                "pending": proposals.get("pending", 0),
+                "accepted": accepted,
+                "rejected": proposals.get("rejected", 0)
+            },
+            "conversion_rate": round(accepted / total_proposals * 100, 2) if total_proposals > 0 else 0
+        },
+        "recent_demands": doc.get("recent_demands") or [],
+        "recent_proposals": doc.get("recent_proposals") or [],
+        "active_users": [
+            {"email": user["email"], "name": user["name"], "demand_count": user["demand_count"]}
+            for user in top_users[:TOP_USERS_SHOWN] if user["demand_count"] > 0
+        ],
+        "partnerships": doc.get("partnerships") or [],
+        "demands_by_type": [{"type": key, "count": count} for key, count in by_type],
+        "demands_by_city": [{"city": key, "count": count} for key, count in by_city],
+        "rebuilt_at": doc.get("rebuilt_at"),
+    }
+
+
+async def get_board_stats(fresh: bool = False) -> dict:
+    """Uma leitura de documento; recalcula se pedido ou se ainda não existe"""
+    doc = None if fresh else await board_stats_collection.find_one({"_id": BOARD_STATS_ID})
+    if doc is None:
+        doc = await rebuild_board_stats()
+    return board_response(doc)
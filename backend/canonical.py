@@ -0,0 +1,212 @@
+"""
+Canonicalização de bairros
+"Jd. dos Estados", "Jardim dos Estados" e "jardim dos estados " -> "jardim-dos-estados"
+
+- Expansão de abreviações (Jd. -> Jardim, Vl. -> Vila, ...)
+- Remoção de acentos e pontuação para a chave de comparação
+- Índice de trigramas sobre os bairros conhecidos para corrigir erros de digitação
+"""
+from typing import Dict, List, Optional, Set, Tuple
+import re
+import unicodedata
+import logging
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+neighborhoods_collection = db.neighborhoods
+
+# Abreviações comuns em nomes de bairros (chave sem acento, valor para exibição)
+ABBREVIATIONS = {
+    "jd": "Jardim",
+    "jdm": "Jardim",
+    "vl": "Vila",
+    "pq": "Parque",
+    "res": "Residencial",
+    "resid": "Residencial",
+    "cj": "Conjunto",
+    "conj": "Conjunto",
+    "chac": "Chácara",
+    "cond": "Condomínio",
+    "lot": "Loteamento",
+    "nuc": "Núcleo",
+    "hab": "Habitacional",
+    "sta": "Santa",
+    "sto": "Santo",
+    "nsa": "Nossa",
+    "sra": "Senhora",
+    "dr": "Doutor",
+    "prof": "Professor",
+    "pres": "Presidente",
+    "gov": "Governador",
+    "cel": "Coronel",
+    "ten": "Tenente",
+    "mal": "Marechal",
+    "gal": "General",
+}
+
+# Palavras que ficam em minúsculo no nome de exibição
+LOWERCASE_WORDS = {"de", "da", "do", "das", "dos", "e"}
+
+# Similaridade mínima (coeficiente de Dice sobre trigramas) para considerar o mesmo bairro
+MATCH_THRESHOLD = 0.9
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+# Numerais romanos usados em nomes de bairro ("Jardim Aeroporto II", "Conjunto XV")
+_ROMAN_RE = re.compile(r"^(x{0,3})(ix|iv|v?i{0,3})$")
+
+
+def fold(text: str) -> str:
+    """Minúsculas, sem acentos"""
+    normalized = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in normalized if not unicodedata.combining(c)).lower()
+
+
+def _expanded_tokens(text: str) -> List[str]:
+    """Tokens do texto com abreviações expandidas (preserva acentos do original)"""
+    tokens = []
+    for token in _TOKEN_RE.findall(text or ""):
+        tokens.append(ABBREVIATIONS.get(fold(token), token))
+    return tokens
+
+
+def canonical_key(text: str) -> str:
+    """Chave de comparação: 'Jd. São Bento ' -> 'jardim sao bento'"""
+    return " ".join(fold(token) for token in _expanded_tokens(text))
+
+
+def canonical_id(text: str) -> str:
+    """Identificador canônico: 'Jd. São Bento' -> 'jardim-sao-bento'"""
+    return canonical_key(text).replace(" ", "-")
+
+
+def display_name(text: str) -> str:
+    """
+    Nome de exibição: 'jd. são bento' -> 'Jardim São Bento'
+    Siglas ('BNH') e numerais romanos ('II') mantêm as maiúsculas; texto todo em
+    maiúsculas é tratado como digitação em caixa alta e capitalizado normalmente
+    """
+    shouting = (text or "").isupper()
+    words = []
+    for i, token in enumerate(_expanded_tokens(text)):
+        lower = token.lower()
+        if lower and _ROMAN_RE.match(lower):
+            words.append(token.upper())
+        elif len(token) > 1 and token.isupper() and not shouting:
+            words.append(token)
+        elif i > 0 and lower in LOWERCASE_WORDS:
+            words.append(lower)
+        else:
+            words.append(lower[:1].upper() + lower[1:])
+    return " ".join(words)
+
+
+def trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NeighborhoodIndex:
+    """Índice de trigramas dos bairros conhecidos (em memória, por worker)"""
+
+    def __init__(self):
+        self.names: Dict[str, str] = {}            # id -> nome de exibição
+        self.cities: Dict[str, Set[str]] = {}      # id -> chaves das cidades onde aparece
+        self._trigrams: Dict[str, Set[str]] = {}   # id -> trigramas
+        self._postings: Dict[str, Set[str]] = {}   # trigrama -> ids
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, neighborhood_id: str, name: str, city: Optional[str] = None):
+        if neighborhood_id not in self.names:
+            self.names[neighborhood_id] = name
+            grams = trigrams(neighborhood_id.replace("-", " "))
+            self._trigrams[neighborhood_id] = grams
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(neighborhood_id)
+        if city:
+            self.cities.setdefault(neighborhood_id, set()).add(canonical_key(city))
+
+    def match(self, key: str, city: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """Retorna (id, similaridade) do bairro conhecido mais parecido, ou None"""
+        neighborhood_id = key.replace(" ", "-")
+        if neighborhood_id in self.names:
+            return neighborhood_id, 1.0
+
+        grams = trigrams(key)
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self._postings.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+
+        city_key = canonical_key(city) if city else None
+        best = None
+        for candidate, common in shared.items():
+            if city_key and city_key not in self.cities.get(candidate, {city_key}):
+                continue
+            score = 2 * common / (len(grams) + len(self._trigrams[candidate]))
+            if score >= MATCH_THRESHOLD and (best is None or score > best[1]):
+                best = (candidate, score)
+        return best
+
+
+neighborhood_index = NeighborhoodIndex()
+
+
+async def load_neighborhood_index():
+    """Carrega os bairros canônicos do banco para o índice em memória"""
+    async for doc in neighborhoods_collection.find({}, {"_id": 0, "id": 1, "name": 1, "cities": 1}):
+        for city in doc.get("cities") or [None]:
+            neighborhood_index.add(doc["id"], doc["name"], city)
+    logger.info(f"Neighborhood index loaded: {len(neighborhood_index)} neighborhoods")
+
+
+def resolve_neighborhood_id(text: str, city: Optional[str] = None) -> Optional[str]:
+    """Id canônico para filtros de busca (somente leitura, não registra bairros novos)"""
+    key = canonical_key(text)
+    if not key:
+        return None
+    match = neighborhood_index.match(key, city)
+    return match[0] if match else key.replace(" ", "-")
+
+
+async def canonicalize_neighborhood(text: str, city: Optional[str] = None) -> Optional[dict]:
+    """
+    Mapeia texto livre para o bairro canônico: {"id": ..., "name": ...}
+    Bairros novos são registrados na coleção 'neighborhoods'
+    """
+    key = canonical_key(text)
+    if not key:
+        return None
+
+    match = neighborhood_index.match(key, city)
+    if match:
+        neighborhood_id = match[0]
+        name = neighborhood_index.names[neighborhood_id]
+    else:
+        neighborhood_id = key.replace(" ", "-")
+        name = display_name(text)
+
+    city_known = city and canonical_key(city) in neighborhood_index.cities.get(neighborhood_id, set())
+    if not match or (city and not city_known):
+        update = {"$setOnInsert": {"id": neighborhood_id, "name": name}}
+        if city:
+            update["$addToSet"] = {"cities": canonical_key(city)}
+        await neighborhoods_collection.update_one({"id": neighborhood_id}, update, upsert=True)
+        neighborhood_index.add(neighborhood_id, name, city)
+
+    return {"id": neighborhood_id, "name": name}
+
+
+async def canonicalize_neighborhoods(texts: List[str], city: Optional[str] = None) -> List[dict]:
+    """Canonicaliza uma lista de bairros removendo duplicatas (mantém a ordem)"""
+    result = []
+    seen = set()
+    for text in texts or []:
+        canonical = await canonicalize_neighborhood(text, city)
+        if canonical and canonical["id"] not in seen:
+            seen.add(canonical["id"])
+            result.append(canonical)
+    return result
@@ -0,0 +1,84 @@
+"""
+Script para canonicalizar os bairros já cadastrados
+Unifica grafias diferentes ("Jd. dos Estados", "Jardim dos Estados", ...) em
+imóveis, demandas e solicitações de imóveis.
+Pode ser executado várias vezes (idempotente).
+"""
+import asyncio
+
+from database import client, db, ensure_indexes
+from canonical import canonicalize_neighborhood, canonicalize_neighborhoods, display_name, load_neighborhood_index
+
+
+async def repair_neighborhood_names():
+    """Corrige nomes gravados com a capitalização antiga ('Jardim Aeroporto Ii' -> 'II')"""
+    updated = 0
+    async for doc in db.neighborhoods.find({}, {"_id": 0, "id": 1, "name": 1}):
+        name = display_name(doc["name"])
+        if name != doc["name"]:
+            await db.neighborhoods.update_one({"id": doc["id"]}, {"$set": {"name": name}})
+            updated += 1
+    print(f"   ✅ Bairros: {updated} nomes corrigidos")
+
+
+async def canonicalize_collection(collection, label: str):
+    """Canonicaliza o campo 'neighborhood' de imóveis/solicitações"""
+    updated = 0
+    cursor = collection.find(
+        {"neighborhood": {"$nin": [None, ""]}},
+        {"_id": 0, "id": 1, "neighborhood": 1, "neighborhood_id": 1, "city": 1}
+    )
+    async for doc in cursor:
+        canonical = await canonicalize_neighborhood(doc["neighborhood"], doc.get("city"))
+        if not canonical:
+            continue
+        if doc.get("neighborhood_id") == canonical["id"] and doc["neighborhood"] == canonical["name"]:
+            continue
+        await collection.update_one(
+            {"id": doc["id"]},
+            {"$set": {"neighborhood": canonical["name"], "neighborhood_id": canonical["id"]}}
+        )
+        updated += 1
+    print(f"   ✅ {label}: {updated} documentos atualizados")
+
+
+async def canonicalize_demands():
+    """Canonicaliza a lista 'bairros_interesse' das demandas"""
+    updated = 0
+    cursor = db.demands.find(
+        {},
+        {"_id": 0, "id": 1, "bairros_interesse": 1, "bairros_interesse_ids": 1, "cidade": 1}
+    )
+    async for doc in cursor:
+        bairros = await canonicalize_neighborhoods(doc.get("bairros_interesse") or [], doc.get("cidade"))
+        names = [b["name"] for b in bairros]
+        ids = [b["id"] for b in bairros]
+        if doc.get("bairros_interesse") == names and doc.get("bairros_interesse_ids") == ids:
+            continue
+        await db.demands.update_one(
+            {"id": doc["id"]},
+            {"$set": {"bairros_interesse": names, "bairros_interesse_ids": ids}}
+        )
+        updated += 1
+    print(f"   ✅ Demandas: {updated} documentos atualizados")
+
+
+async def main():
+    print("=" * 60)
+    print("🏘️  CANONICALIZANDO BAIRROS")
+    print("=" * 60)
+
+    await ensure_indexes()
+    await repair_neighborhood_names()
+    await load_neighborhood_index()
+
+    await canonicalize_collection(db.properties, "Imóveis")
+    await canonicalize_demands()
+    await canonicalize_collection(db.property_requests, "Solicitações")
+
+    print("=" * 60)
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,144 @@
+"""
+Índice offline de CEP
+Tabela ordenada em arrays compactos com busca binária - sem API externa
+
+Os dados ficam em backend/data/cep/*.csv (um arquivo por UF) com as colunas:
+cep_start,cep_end,street,neighborhood,city,state,latitude,longitude
+
+- Linhas com logradouro (street) são CEPs de rua e têm prioridade na busca
+- Linhas sem logradouro são faixas de CEP da cidade (centroide da cidade)
+"""
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+from typing import Iterable, Optional
+import csv
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+CEP_DATA_DIR = Path(os.environ.get("CEP_DATA_DIR", Path(__file__).parent / "data" / "cep"))
+
+CEP_FIELDS = ["cep_start", "cep_end", "street", "neighborhood", "city", "state", "latitude", "longitude"]
+
+
+def normalize_cep(cep: str) -> Optional[int]:
+    """Converte '79002-000' / '79002000' para inteiro. Retorna None se inválido."""
+    digits = "".join(c for c in str(cep) if c.isdigit())
+    if len(digits) != 8:
+        return None
+    return int(digits)
+
+
+def format_cep(cep: int) -> str:
+    """Formata um CEP inteiro como '79002-000'"""
+    digits = f"{cep:08d}"
+    return f"{digits[:5]}-{digits[5:]}"
+
+
+class _CepTable:
+    """Faixas de CEP não sobrepostas, ordenadas pelo início da faixa"""
+
+    def __init__(self, rows: list):
+        rows.sort(key=lambda row: row[0])
+        # Arrays de inteiros sem sinal (4 bytes por CEP) em vez de listas de objetos
+        self.starts = array("I", (row[0] for row in rows))
+        self.ends = array("I", (row[1] for row in rows))
+        self.records = [row[2] for row in rows]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def find(self, cep: int) -> Optional[tuple]:
+        i = bisect_right(self.starts, cep) - 1
+        if i >= 0 and cep <= self.ends[i]:
+            return self.records[i]
+        return None
+
+
+class CepIndex:
+    """Índice de CEP em memória: busca O(log n) por CEP de rua e depois por faixa da cidade"""
+
+    def __init__(self, rows: Iterable[dict]):
+        street_rows = []
+        range_rows = []
+        strings = {}  # Deduplica cidade/UF/bairro repetidos em milhares de linhas
+
+        def intern(value: Optional[str]) -> Optional[str]:
+            value = (value or "").strip()
+            if not value:
+                return None
+            return strings.setdefault(value, value)
+
+        for row in rows:
+            start = normalize_cep(row.get("cep_start", ""))
+            end = normalize_cep(row.get("cep_end") or row.get("cep_start", ""))
+            if start is None or end is None or end < start:
+                logger.warning(f"Linha de CEP inválida ignorada: {row}")
+                continue
+
+            latitude = row.get("latitude")
+            longitude = row.get("longitude")
+            record = (
+                intern(row.get("street")),
+                intern(row.get("neighborhood")),
+                intern(row.get("city")),
+                intern((row.get("state") or "").upper()),
+                float(latitude) if latitude else None,
+                float(longitude) if longitude else None,
+            )
+
+            if record[0]:
+                street_rows.append((start, end, record))
+            else:
+                range_rows.append((start, end, record))
+
+        self._streets = _CepTable(street_rows)
+        self._ranges = _CepTable(range_rows)
+
+    @classmethod
+    def from_directory(cls, directory: Path = CEP_DATA_DIR) -> "CepIndex":
+        """Carrega todos os CSVs de CEP de um diretório"""
+        rows = []
+        for path in sorted(Path(directory).glob("*.csv")):
+            with open(path, newline="", encoding="utf-8") as f:
+                rows.extend(csv.DictReader(f))
+        index = cls(rows)
+        logger.info(f"CEP index loaded: {len(index._streets)} streets, {len(index._ranges)} ranges")
+        return index
+
+    def __len__(self) -> int:
+        return len(self._streets) + len(self._ranges)
+
+    def lookup(self, cep: str) -> Optional[dict]:
+        """Retorna logradouro, bairro, cidade, UF e centroide do CEP, ou None"""
+        number = normalize_cep(cep)
+        if number is None:
+            return None
+
+        record = self._streets.find(number) or self._ranges.find(number)
+        if record is None:
+            return None
+
+        street, neighborhood, city, state, latitude, longitude = record
+        return {
+            "cep": format_cep(number),
+            "street": street,
+            "neighborhood": neighborhood,
+            "city": city,
+            "state": state,
+            "latitude": latitude,
+            "longitude": longitude,
+        }
+
+
+_cep_index: Optional[CepIndex] = None
+
+
+def get_cep_index() -> CepIndex:
+    """Índice compartilhado do worker (carregado uma única vez)"""
+    global _cep_index
+    if _cep_index is None:
+        _cep_index = CepIndex.from_directory()
+    return _cep_index
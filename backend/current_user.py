@@ -0,0 +1,201 @@
+"""
+Usuário autenticado da requisição
+- `get_current_user`: dependência que devolve o documento do usuário. O FastAPI
+  resolve a dependência uma vez por requisição, mesmo usada em vários lugares
+  (middleware de admin + rota)
+- Cache TTL curto por worker (email -> documento), invalidado nas edições de
+  perfil, status e pelo admin; outros workers enxergam a mudança em até USER_CACHE_TTL
+- O documento cacheado não traz hashed_password nem os contadores (user_counters.py,
+  alterados por $inc sem invalidar o cache): quem precisa deles lê do banco
+- `get_token_user`: id, email, tipo e status direto das claims do JWT, sem banco
+  (checagens de papel); a revogação vem da tabela de versões (token_versions.py)
+- Métricas de consultas ao Mongo por requisição (GET /api/admin/metrics)
+"""
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+import os
+import time
+import logging
+
+from fastapi import Depends, HTTPException, status
+
+from auth import get_current_user_email, get_token_claims
+from database import users_collection
+from user_counters import COUNTER_FIELDS
+from token_versions import token_versions
+from auth_sessions import revoke_user_sessions, revoke_users_sessions
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL_SECONDS", 30))
+USER_CACHE_MAX_SIZE = int(os.environ.get("USER_CACHE_MAX_SIZE", 10000))
+
+USER_PROJECTION = {"_id": 0, "hashed_password": 0, **{field: 0 for field in COUNTER_FIELDS}}
+
+
+class UserCache:
+    """LRU com expiração: email -> (expira_em, documento)"""
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._email_by_id = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, email: str) -> Optional[dict]:
+        entry = self._entries.get(email)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            self.invalidate(email=email)
+            return None
+        self._entries.move_to_end(email)
+        return user
+
+    def put(self, user: dict):
+        email = user["email"]
+        self._entries[email] = (time.monotonic() + self.ttl, user)
+        self._entries.move_to_end(email)
+        self._email_by_id[user.get("id")] = email
+        while len(self._entries) > self.max_size:
+            old_email, (_, old_user) = self._entries.popitem(last=False)
+            self._email_by_id.pop(old_user.get("id"), None)
+
+    def invalidate(self, email: Optional[str] = None, user_id: Optional[str] = None):
+        if email is None and user_id is not None:
+            email = self._email_by_id.get(user_id)
+        if email is None:
+            return
+        entry = self._entries.pop(email, None)
+        if entry:
+            self._email_by_id.pop(entry[1].get("id"), None)
+
+    def clear(self):
+        self._entries.clear()
+        self._email_by_id.clear()
+
+
+user_cache = UserCache(USER_CACHE_TTL, USER_CACHE_MAX_SIZE)
+
+
+# ==========================================
+# MÉTRICAS
+# ==========================================
+
+_request_lookups: ContextVar[Optional[list]] = ContextVar("user_lookups", default=None)
+
+lookup_stats = {
+    "requests": 0,              # requisições HTTP observadas
+    "resolved": 0,              # chamadas a get_current_user (após o memo do FastAPI)
+    "cache_hits": 0,
+    "db_lookups": 0,
+    "requests_by_db_lookups": {"0": 0, "1": 0, "2+": 0},
+}
+
+
+def user_lookup_stats() -> dict:
+    requests = lookup_stats["requests"] or 1
+    return {
+        **lookup_stats,
+        "cache_size": len(user_cache),
+        "cache_ttl_seconds": USER_CACHE_TTL,
+        "db_lookups_per_request": round(lookup_stats["db_lookups"] / requests, 3),
+    }
+
+
+class UserLookupMetricsMiddleware:
+    """Conta as consultas de usuário ao Mongo feitas em cada requisição"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        counter = [0]
+        token = _request_lookups.set(counter)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_lookups.reset(token)
+            lookup_stats["requests"] += 1
+            bucket = "2+" if counter[0] >= 2 else str(counter[0])
+            lookup_stats["requests_by_db_lookups"][bucket] += 1
+
+
+# ==========================================
+# DEPENDÊNCIA
+# ==========================================
+
+async def fetch_user(email: str) -> Optional[dict]:
+    """Documento do usuário pelo email (cache TTL, depois Mongo)"""
+    lookup_stats["resolved"] += 1
+    user = user_cache.get(email)
+    if user is not None:
+        lookup_stats["cache_hits"] += 1
+        return dict(user)
+
+    lookup_stats["db_lookups"] += 1
+    counter = _request_lookups.get()
+    if counter is not None:
+        counter[0] += 1
+
+    user = await users_collection.find_one({"email": email}, USER_PROJECTION)
+    if user is None:
+        return None
+    user_cache.put(user)
+    return dict(user)
+
+
+async def get_current_user(email: str = Depends(get_current_user_email)) -> dict:
+    """Usuário autenticado (uma consulta no máximo por requisição)"""
+    user = await fetch_user(email)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return user
+
+
+async def get_token_user(claims: dict = Depends(get_token_claims)) -> dict:
+    """
+    Usuário a partir das claims (id, email, user_type, status) - zero consultas
+    Use quando a rota só precisa de identidade e papel; para nome/telefone etc. use get_current_user.
+    """
+    if "uid" not in claims:
+        # Token emitido antes das claims ricas
+        return await get_current_user(claims["sub"])
+    return {
+        "id": claims["uid"],
+        "email": claims["sub"],
+        "user_type": claims.get("user_type"),
+        "status": claims.get("status"),
+    }
+
+
+def invalidate_user(email: Optional[str] = None, user_id: Optional[str] = None):
+    """Descarta o usuário do cache deste worker (chamar após editar o documento)"""
+    user_cache.invalidate(email=email, user_id=user_id)
+
+
+async def revoke_user_tokens(user_id: str, email: Optional[str] = None) -> int:
+    """Invalida os tokens emitidos (pausa, mudança de papel/email, troca de senha, exclusão)"""
+    invalidate_user(email=email, user_id=user_id)
+    await revoke_user_sessions(user_id)
+    return await token_versions.bump(user_id)
+
+
+async def revoke_users_tokens(users: List[dict]):
+    """revoke_user_tokens para vários usuários ({id, email}) com escritas em lote"""
+    for user in users:
+        invalidate_user(email=user.get("email"), user_id=user["id"])
+    user_ids = [user["id"] for user in users]
+    await revoke_users_sessions(user_ids)
+    await token_versions.bump_many(user_ids)
@@ -1,8 +1,14 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from typing import Optional
 import os
+import re
+import logging
 from dotenv import load_dotenv
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -20,3 +26,70 @@ properties_collection = db.properties
 
 async def get_database():
     return db
+
+# Unicidade de usuários garantida pelo banco (vale também para cadastros simultâneos).
+# CPF/CNPJ vazios ou ausentes ficam fora do índice.
+USER_UNIQUE_INDEXES = {
+    "id": {},
+    "email": {},
+    "cpf": {"partialFilterExpression": {"cpf": {"$type": "string", "$gt": ""}}},
+    "cnpj": {"partialFilterExpression": {"cnpj": {"$type": "string", "$gt": ""}}},
+}
+
+
+def duplicate_key_field(error: DuplicateKeyError) -> Optional[str]:
+    """Campo que violou um índice único (keyPattern no MongoDB >= 4.4, senão o nome do índice)"""
+    pattern = (error.details or {}).get("keyPattern")
+    if pattern:
+        return next(iter(pattern))
+    match = re.search(r"index: (\w+?)_-?1\b", str(error))
+    return match.group(1) if match else None
+
+
+async def ensure_indexes():
+    """Create the indexes the application relies on (idempotent)"""
+    for field, options in USER_UNIQUE_INDEXES.items():
+        try:
+            await db.users.create_index(field, unique=True, **options)
+        except OperationFailure as e:
+            # Base com duplicados antigos: a API sobe, mas o campo fica sem garantia até a limpeza
+            logger.error(f"Could not create unique index on users.{field}: {e}")
+    await db.neighborhoods.create_index("id", unique=True)
+    await db.properties.create_index("neighborhood_id")
+    # Matchmaking: imóveis ainda sem neighborhood_id casam pelo nome
+    await db.properties.create_index("neighborhood")
+    await db.demands.create_index("bairros_interesse_ids")
+    await db.demands.create_index("corretor_id")
+    await db.media_blobs.create_index("sha256", unique=True)
+    await db.media_aliases.create_index("path", unique=True)
+    await db.media_deletion_log.create_index("logged_at")
+    await db.properties.create_index("images")
+    await db.users.create_index("profile_photo", sparse=True)
+    await db.upload_sessions.create_index("id", unique=True)
+    await db.upload_sessions.create_index("expires_at")
+    await db.token_versions.create_index("user_id", unique=True)
+    await db.token_versions.create_index("updated_at")
+    await db.sessions.create_index("id", unique=True)
+    await db.sessions.create_index("user_id")
+    await db.sessions.create_index("revoked_at")
+    await db.user_deletion_jobs.create_index("user_id", unique=True)
+    await db.user_deletion_jobs.create_index([("status", 1), ("created_at", 1)])
+    # Dono de cada documento (rotas "meus ..." e limpeza da exclusão de usuário)
+    await db.properties.create_index("owner_id")
+    await db.service_providers.create_index("owner_id")
+    await db.visits.create_index("owner_id")
+    await db.notifications.create_index("user_id")
+    await db.proposals.create_index("demand_id")
+    await db.proposals.create_index("ofertante_id")
+    await db.upload_sessions.create_index("owner_id")
+    # Janela incremental dos rollups diários (analytics_rollups.py)
+    await db.users.create_index("created_at")
+    await db.properties.create_index("created_at")
+    await db.visits.create_index("created_at")
+    await db.property_requests.create_index("created_at")
+    await db.properties.create_index("id")
+    await db.daily_rollups.create_index([("metric", 1), ("day", 1)])
+    # Busca do admin por prefixo das chaves normalizadas (user_search.py)
+    await db.users.create_index([("search_keys", 1), ("search_name", 1), ("id", 1)])
+    # Sessões expiradas somem sozinhas um dia depois
+    await db.sessions.create_index("expires_at", expireAfterSeconds=24 * 3600)
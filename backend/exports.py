@@ -0,0 +1,288 @@
+"""
+Exportação de planilhas do painel admin (GET /api/admin/export/{entidade}.csv|.xlsx)
+- Lê direto de um cursor do Mongo (projeção só com as colunas, ordem por _id, sem
+  sort em memória) e escreve linha a linha: memória constante com qualquer volume
+- O envio acompanha o cliente: o próximo lote só é lido depois que o anterior saiu
+- XLSX sem dependência extra: o zip é gerado em fluxo (zipfile em stream não
+  pesquisável) com células inline, sem tabela de strings compartilhadas
+"""
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+import csv
+import io
+import re
+import zipfile
+
+from database import db
+
+CURSOR_BATCH_SIZE = 1000
+# Agrupa linhas antes de enviar (menos chamadas de send por arquivo)
+FLUSH_BYTES = 64 * 1024
+# Limite de linhas de uma planilha do Excel (uma linha fica para o cabeçalho)
+XLSX_MAX_ROWS = 1_048_575
+
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+@dataclass
+class ExportSpec:
+    collection: str
+    columns: List[Tuple[str, str]]          # (cabeçalho, campo)
+    filters: Tuple[str, ...] = ()           # query params aceitos, mesmo nome do campo
+    base_query: dict = field(default_factory=dict)
+    # Estágios extras de agregação (ex.: $lookup do dono); sem eles usa find()
+    pipeline: Optional[Callable[[], List[dict]]] = None
+
+    def query(self, filters: Dict[str, str]) -> dict:
+        return {**self.base_query, **{name: value for name, value in filters.items() if name in self.filters}}
+
+    def projection(self) -> dict:
+        return {"_id": 0, **{path: 1 for _, path in self.columns}}
+
+
+def _property_owner_stages() -> List[dict]:
+    return [
+        {"$lookup": {
+            "from": "users",
+            "localField": "owner_id",
+            "foreignField": "id",
+            "as": "owner"
+        }},
+        {"$addFields": {
+            "owner_name": {"$arrayElemAt": ["$owner.name", 0]},
+            "owner_email": {"$arrayElemAt": ["$owner.email", 0]},
+        }},
+    ]
+
+
+EXPORTS: Dict[str, ExportSpec] = {
+    "users": ExportSpec(
+        collection="users",
+        columns=[
+            ("ID", "id"), ("Nome", "name"), ("Email", "email"), ("Telefone", "phone"),
+            ("CPF", "cpf"), ("Cidade", "city"), ("Estado", "state"), ("Tipo", "user_type"),
+            ("Status", "status"), ("Plano", "plan_type"), ("CRECI", "creci"), ("Empresa", "company"),
+            ("CNPJ", "cnpj"), ("Imóveis", "properties_count"), ("Cadastro", "created_at"),
+        ],
+        filters=("status", "user_type"),
+        base_query={"user_type": {"$ne": "admin"}},
+    ),
+    "properties": ExportSpec(
+        collection="properties",
+        columns=[
+            ("ID", "id"), ("Título", "title"), ("Tipo", "property_type"), ("Finalidade", "purpose"),
+            ("Preço", "price"), ("Endereço", "address"), ("Bairro", "neighborhood"), ("Cidade", "city"),
+            ("Estado", "state"), ("Quartos", "bedrooms"), ("Banheiros", "bathrooms"), ("Área", "area"),
+            ("Vagas", "garage"), ("Destaque", "is_featured"), ("Lançamento", "is_launch"),
+            ("ID do dono", "owner_id"), ("Dono", "owner_name"), ("Email do dono", "owner_email"),
+            ("Cadastro", "created_at"),
+        ],
+        filters=("purpose", "city", "owner_id"),
+        pipeline=_property_owner_stages,
+    ),
+    "visits": ExportSpec(
+        collection="visits",
+        columns=[
+            ("ID", "id"), ("ID do imóvel", "property_id"), ("Imóvel", "property_title"),
+            ("Endereço", "property_address"), ("Dono", "owner_name"), ("Email do dono", "owner_email"),
+            ("Visitante", "visitor_name"), ("Telefone", "visitor_phone"), ("Email", "visitor_email"),
+            ("Data", "visit_date"), ("Horário", "visit_time"), ("Status", "status"),
+            ("Mensagem", "message"), ("Criada em", "created_at"),
+        ],
+        filters=("status", "owner_id"),
+    ),
+    # Solicitações de imóveis (formulário público "Solicitar imóvel")
+    "leads": ExportSpec(
+        collection="property_requests",
+        columns=[
+            ("ID", "id"), ("Nome", "name"), ("Email", "email"), ("Telefone", "phone"),
+            ("Tipo", "property_type"), ("Finalidade", "purpose"), ("Cidade", "city"),
+            ("Bairro", "neighborhood"), ("Preço mínimo", "min_price"), ("Preço máximo", "max_price"),
+            ("Quartos", "bedrooms"), ("Descrição", "description"), ("Status", "status"),
+            ("Criada em", "created_at"),
+        ],
+        filters=("status", "city"),
+    ),
+}
+
+
+async def iter_rows(spec: ExportSpec, filters: Dict[str, str]) -> AsyncIterator[list]:
+    """Linhas (valores na ordem das colunas), lidas em lotes de CURSOR_BATCH_SIZE"""
+    collection = db[spec.collection]
+    query = spec.query(filters)
+    if spec.pipeline:
+        stages = [{"$match": query}, {"$sort": {"_id": 1}}, *spec.pipeline(), {"$project": spec.projection()}]
+        cursor = collection.aggregate(stages, batchSize=CURSOR_BATCH_SIZE)
+    else:
+        cursor = collection.find(query, spec.projection()).sort("_id", 1).batch_size(CURSOR_BATCH_SIZE)
+    fields = [path for _, path in spec.columns]
+    async for doc in cursor:
+        yield [doc.get(path) for path in fields]
+
+
+# ==========================================
+# CSV
+# ==========================================
+
+class _Passthrough:
+    """'Arquivo' do csv.writer que devolve a linha em vez de guardá-la"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+# Fórmulas em dados digitados por terceiros (ex.: "=HYPERLINK(...)") viram texto
+_FORMULA_START = ("=", "+", "-", "@", "\t", "\r")
+_SIGNED_NUMBER = re.compile(r"^[+-][\d\s().,-]*$")
+
+
+def _csv_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "Sim" if value else "Não"
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, list):
+        value = ", ".join(str(item) for item in value)
+    value = str(value)
+    if value.startswith(_FORMULA_START) and not _SIGNED_NUMBER.match(value):
+        return "'" + value
+    return value
+
+
+async def csv_stream(spec: ExportSpec, filters: Dict[str, str]) -> AsyncIterator[bytes]:
+    writer = csv.writer(_Passthrough())
+    # BOM: o Excel abre o UTF-8 com acentos corretos
+    buffer = ["\ufeff", writer.writerow([header for header, _ in spec.columns])]
+    size = 0
+    async for row in iter_rows(spec, filters):
+        line = writer.writerow([_csv_value(value) for value in row])
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+# ==========================================
+# XLSX
+# ==========================================
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_END = '</sheetData></worksheet>'
+
+# Caracteres de controle não são permitidos em XML
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _xlsx_cell(value) -> str:
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f"<c><v>{value}</v></c>"
+    if isinstance(value, (datetime, date)):
+        value = value.isoformat()
+    elif isinstance(value, list):
+        value = ", ".join(str(item) for item in value)
+    text = escape(_XML_INVALID.sub("", str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values) -> str:
+    return "<row>" + "".join(_xlsx_cell(value) for value in values) + "</row>"
+
+
+class _ZipSink(io.RawIOBase):
+    """Destino do zipfile que só acumula bytes até serem enviados (sem seek)"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def xlsx_stream(spec: ExportSpec, filters: Dict[str, str], sheet_name: str) -> AsyncIterator[bytes]:
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _ROOT_RELS)
+        archive.writestr("xl/workbook.xml", _WORKBOOK.format(name=escape(sheet_name[:31])))
+        archive.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        yield sink.drain()
+
+        # Tamanho final desconhecido: zip64 evita o limite de 2 GiB por arquivo interno
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            buffer = [_SHEET_START, _xlsx_row(header for header, _ in spec.columns)]
+            size = 0
+            rows = 0
+            async for row in iter_rows(spec, filters):
+                if rows == XLSX_MAX_ROWS:
+                    break
+                line = _xlsx_row(row)
+                buffer.append(line)
+                size += len(line)
+                rows += 1
+                if size >= FLUSH_BYTES:
+                    sheet.write("".join(buffer).encode("utf-8"))
+                    buffer, size = [], 0
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+            buffer.append(_SHEET_END)
+            sheet.write("".join(buffer).encode("utf-8"))
+    yield sink.drain()
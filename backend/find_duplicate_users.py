@@ -0,0 +1,40 @@
+"""
+Lista usuários com email, CPF ou CNPJ repetidos
+Enquanto houver duplicados, ensure_indexes não consegue criar o índice único do
+campo (o erro aparece no log do startup) e a unicidade não é garantida.
+Resolva os casos listados (editar ou excluir pelo painel admin) e reinicie a API.
+
+Uso: python find_duplicate_users.py
+"""
+import asyncio
+
+from database import client, db, USER_UNIQUE_INDEXES
+
+
+async def duplicates(field: str) -> list:
+    pipeline = [
+        {"$match": {field: {"$type": "string", "$gt": ""}}},
+        {"$group": {"_id": f"${field}", "count": {"$sum": 1}, "users": {"$push": {"id": "$id", "name": "$name"}}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$sort": {"count": -1}},
+    ]
+    return await db.users.aggregate(pipeline).to_list(length=None)
+
+
+async def main():
+    print("=" * 60)
+    total = 0
+    for field in USER_UNIQUE_INDEXES:
+        groups = await duplicates(field)
+        total += len(groups)
+        print(f"{field}: {len(groups)} valor(es) repetido(s)")
+        for group in groups:
+            users = ", ".join(f"{user['name']} ({user['id']})" for user in group["users"])
+            print(f"   {group['_id']} x{group['count']}: {users}")
+    print("=" * 60)
+    print("Nenhum duplicado." if total == 0 else f"{total} grupo(s) para corrigir.")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,48 @@
+"""
+Script para gerar miniaturas/WebP das imagens já existentes no armazenamento
+Processa apenas imagens de imóveis que ainda não têm variantes; --force reprocessa
+todas (gera também o WebP na resolução original das imagens processadas antes dele).
+Uso: python generate_image_variants.py [--force]
+"""
+import asyncio
+import sys
+
+from database import client, properties_collection
+from images import generate_property_variants, shutdown_pool, variant_key
+from storage import get_storage
+
+
+async def backfill(force: bool = False):
+    print("=" * 60)
+    print("🖼️  GERANDO VARIANTES DAS IMAGENS DOS IMÓVEIS")
+    print("=" * 60)
+
+    storage = get_storage()
+    processed = 0
+    cursor = properties_collection.find(
+        {"images.0": {"$exists": True}},
+        {"_id": 0, "id": 1, "title": 1, "images": 1, "image_variants": 1}
+    )
+    async for prop in cursor:
+        existing = prop.get("image_variants") or {}
+        pending = [
+            url for url in prop["images"]
+            if storage.key_for_url(url) and (force or variant_key(url) not in existing)
+        ]
+        if not pending:
+            continue
+
+        print(f"   📷 {prop.get('title', '')[:40]}... ({len(pending)} imagens)")
+        await generate_property_variants(prop["id"], pending)
+        processed += len(pending)
+
+    print("=" * 60)
+    print(f"✅ {processed} imagens processadas")
+    print("=" * 60)
+
+    shutdown_pool()
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill(force="--force" in sys.argv))
@@ -0,0 +1,179 @@
+"""
+Pipeline de derivados de imagem
+Para cada foto enviada: corrige a orientação EXIF, remove metadados e gera
+variantes por largura (320/640/1280) em WebP e JPEG para uso em `srcset`, mais
+um WebP na resolução original (`<nome>_full.webp`) servido no lugar do .jpg/.png
+quando o navegador aceita WebP (media_files.py).
+
+O processamento roda em um ProcessPoolExecutor para não ocupar o event loop
+(nem o GIL) dos workers da API.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+import asyncio
+import multiprocessing
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_ROOT = Path(__file__).parent / "uploads"
+UPLOAD_URL_PREFIX = "/api/uploads/"
+
+VARIANT_WIDTHS = (320, 640, 1280)
+VARIANTS_DIRNAME = "variants"
+FULL_WEBP_SUFFIX = "full"
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def full_webp_name(stem: str) -> str:
+    """Nome do WebP na resolução original de uma imagem"""
+    return f"{stem}_{FULL_WEBP_SUFFIX}.webp"
+
+
+def process_image(source_path: str, output_dir: str, widths: tuple = VARIANT_WIDTHS) -> List[dict]:
+    """
+    Gera as variantes de uma imagem (executado no processo do pool)
+    Retorna [{"width": 320, "webp": "<arquivo>.webp", "jpeg": "<arquivo>.jpg"}, ...]
+    O WebP na resolução original (full_webp_name) só é gerado quando a imagem foi
+    decodificada inteira e sem transparência; senão o original continua sendo servido.
+    """
+    from PIL import Image, ImageOps
+
+    source = Path(source_path)
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+
+    with Image.open(source) as original:
+        width, height = original.size
+        if original.getexif().get(0x0112) in (5, 6, 7, 8):
+            # Orientações EXIF que giram 90°: a imagem exibida tem os lados trocados
+            width, height = height, width
+        original_size = (width, height)
+
+        # JPEG: decodificar direto em escala reduzida (>= maior variante em qualquer orientação)
+        largest = max(widths)
+        original.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(original)
+
+        # JPEG não suporta transparência: compor sobre fundo branco
+        transparent = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        if transparent:
+            rgba = image.convert("RGBA")
+            image = Image.new("RGB", rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel("A"))
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+
+        # Não ampliar: imagens menores que a menor largura geram uma única variante
+        targets = sorted({min(width, image.width) for width in widths})
+
+        variants = []
+        for width in targets:
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+
+            webp_name = f"{source.stem}_{width}.webp"
+            jpeg_name = f"{source.stem}_{width}.jpg"
+            # Salvar sem o parâmetro exif descarta todos os metadados
+            resized.save(output / webp_name, "WEBP", quality=WEBP_QUALITY, method=4)
+            resized.save(output / jpeg_name, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+
+            variants.append({"width": width, "webp": webp_name, "jpeg": jpeg_name})
+
+        if image.size == original_size and not transparent:
+            image.save(output / full_webp_name(source.stem), "WEBP", quality=WEBP_QUALITY, method=4)
+
+    return variants
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: o worker da API tem threads (Motor) e um event loop rodando, fork não é seguro
+        _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def generate_variants(source_path: Path) -> List[dict]:
+    """Gera as variantes de uma imagem no pool de processos"""
+    output_dir = source_path.parent / VARIANTS_DIRNAME
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_pool(), process_image, str(source_path), str(output_dir))
+
+
+def variant_key(image_url: str) -> str:
+    """Chave da imagem em `image_variants` (nome do arquivo sem extensão, sem '.')"""
+    return Path(image_url).stem.replace(".", "_")
+
+
+def variant_urls(image_url: str, variants: List[dict]) -> List[dict]:
+    """Converte nomes de arquivo das variantes em URLs públicas ao lado da original"""
+    base = image_url.rsplit("/", 1)[0]
+    return [
+        {
+            "width": v["width"],
+            "webp": f"{base}/{VARIANTS_DIRNAME}/{v['webp']}",
+            "jpeg": f"{base}/{VARIANTS_DIRNAME}/{v['jpeg']}",
+        }
+        for v in variants
+    ]
+
+
+def local_upload_path(image_url: str) -> Optional[Path]:
+    """Caminho em disco de uma imagem servida em /api/uploads (None se externa)"""
+    if not image_url or not image_url.startswith(UPLOAD_URL_PREFIX):
+        return None
+    return UPLOAD_ROOT / image_url[len(UPLOAD_URL_PREFIX):]
+
+
+async def generate_property_variants(property_id: str, image_urls: List[str]):
+    """
+    Gera as variantes das imagens de um imóvel e grava em `image_variants`
+    Executado em background após o cadastro/edição do imóvel.
+    """
+    from database import properties_collection
+    from storage import get_storage
+
+    storage = get_storage()
+
+    async def process(image_url: str):
+        key = storage.key_for_url(image_url)
+        if key is None or await storage.size(key) is None:
+            return None
+        key_dir = key.rsplit("/", 1)[0] if "/" in key else ""
+        try:
+            # Backend local: processa no lugar; S3: baixa para um diretório temporário e envia as variantes
+            async with storage.local_copy(key) as source:
+                variants = await generate_variants(source)
+                names = [variant[fmt] for variant in variants for fmt in ("webp", "jpeg")]
+                if (source.parent / VARIANTS_DIRNAME / full_webp_name(source.stem)).exists():
+                    names.append(full_webp_name(source.stem))
+                for name in names:
+                    await storage.put_file(
+                        source.parent / VARIANTS_DIRNAME / name,
+                        f"{key_dir}/{VARIANTS_DIRNAME}/{name}".lstrip("/")
+                    )
+        except Exception as e:
+            logger.error(f"Error generating variants for {image_url}: {e}")
+            return None
+        return variant_key(image_url), variant_urls(image_url, variants)
+
+    results = await asyncio.gather(*(process(url) for url in image_urls))
+    update = {f"image_variants.{key}": urls for key, urls in filter(None, results)}
+    if update:
+        await properties_collection.update_one({"id": property_id}, {"$set": update})
+        logger.info(f"Generated variants for {len(update)} images of property {property_id}")
@@ -0,0 +1,74 @@
+"""
+Script para importar uma base de CEPs (nível de logradouro) para o índice offline
+Uso: python import_cep_data.py <arquivo.csv> [UF]
+
+O CSV de origem deve ter as colunas: cep,logradouro,bairro,cidade,uf[,latitude,longitude]
+As faixas por cidade já existentes em data/cep/<uf>.csv são preservadas.
+"""
+import csv
+import sys
+from pathlib import Path
+
+from cep_index import CEP_DATA_DIR, CEP_FIELDS, normalize_cep, format_cep
+
+
+def import_ceps(source: Path, only_state: str = None):
+    print("=" * 60)
+    print("📮 IMPORTANDO BASE DE CEPS")
+    print("=" * 60)
+
+    rows_by_state = {}
+    skipped = 0
+
+    with open(source, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            cep = normalize_cep(row.get("cep", ""))
+            state = (row.get("uf") or "").strip().upper()
+            if cep is None or not state or not (row.get("logradouro") or "").strip():
+                skipped += 1
+                continue
+            if only_state and state != only_state:
+                continue
+
+            rows_by_state.setdefault(state, {})[cep] = {
+                "cep_start": format_cep(cep),
+                "cep_end": format_cep(cep),
+                "street": row["logradouro"].strip(),
+                "neighborhood": (row.get("bairro") or "").strip(),
+                "city": (row.get("cidade") or "").strip(),
+                "state": state,
+                "latitude": row.get("latitude") or "",
+                "longitude": row.get("longitude") or "",
+            }
+
+    CEP_DATA_DIR.mkdir(parents=True, exist_ok=True)
+
+    for state, streets in rows_by_state.items():
+        target = CEP_DATA_DIR / f"{state.lower()}.csv"
+
+        # Manter as faixas de cidade (linhas sem logradouro) do arquivo atual
+        ranges = []
+        if target.exists():
+            with open(target, newline="", encoding="utf-8") as f:
+                ranges = [r for r in csv.DictReader(f) if not (r.get("street") or "").strip()]
+
+        rows = ranges + list(streets.values())
+        rows.sort(key=lambda r: normalize_cep(r["cep_start"]))
+
+        with open(target, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=CEP_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+
+        print(f"   ✅ {state}: {len(streets)} logradouros + {len(ranges)} faixas -> {target.name}")
+
+    print(f"\n⚠️  {skipped} linhas ignoradas (CEP/UF/logradouro ausente)")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    import_ceps(Path(sys.argv[1]), sys.argv[2].upper() if len(sys.argv) > 2 else None)
@@ -0,0 +1,100 @@
+"""
+Teste de carga: latência de leituras públicas durante uma rajada de logins
+1. Mede GET público (listagem de imóveis) sem carga de login
+2. Repete a medição enquanto dispara logins concorrentes (bcrypt)
+Com o bcrypt fora do event loop as leituras devem manter a mesma latência;
+logins acima da capacidade recebem 503 (Retry-After) em vez de travar o worker.
+
+Uso: python load_test_login.py [URL_BASE] [--email E] [--password S]
+                               [--logins N] [--login-concurrency N] [--seconds N]
+"""
+from collections import Counter
+import asyncio
+import sys
+import time
+
+import httpx
+
+
+def arg(name: str, default):
+    if name in sys.argv:
+        return type(default)(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+
+BASE_URL = sys.argv[1] if len(sys.argv) > 1 and not sys.argv[1].startswith("--") else "http://localhost:8001"
+EMAIL = arg("--email", "teste@imovlocal.com")
+PASSWORD = arg("--password", "Teste@123")
+LOGINS = arg("--logins", 200)
+LOGIN_CONCURRENCY = arg("--login-concurrency", 50)
+SECONDS = arg("--seconds", 5.0)
+READ_PATH = "/api/properties/?limit=20"
+READ_CONCURRENCY = 4
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+async def read_loop(client: httpx.AsyncClient, stop: asyncio.Event, latencies: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get(READ_PATH)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def measure_reads(client: httpx.AsyncClient, seconds: float, background=None) -> list:
+    latencies = []
+    stop = asyncio.Event()
+    readers = [asyncio.create_task(read_loop(client, stop, latencies)) for _ in range(READ_CONCURRENCY)]
+    if background is not None:
+        await background
+    else:
+        await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*readers)
+    return latencies
+
+
+async def login_burst(client: httpx.AsyncClient, results: Counter):
+    semaphore = asyncio.Semaphore(LOGIN_CONCURRENCY)
+
+    async def login():
+        async with semaphore:
+            response = await client.post("/api/auth/login", json={"email": EMAIL, "password": PASSWORD})
+            results[response.status_code] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(LOGINS)))
+    return time.perf_counter() - start
+
+
+def report(name: str, latencies: list):
+    print(f"   {name:<22} n={len(latencies):5d} | p50 {percentile(latencies, 50):7.1f}ms | "
+          f"p95 {percentile(latencies, 95):7.1f}ms | p99 {percentile(latencies, 99):7.1f}ms | "
+          f"máx {max(latencies):7.1f}ms")
+
+
+async def main():
+    limits = httpx.Limits(max_connections=LOGIN_CONCURRENCY + READ_CONCURRENCY + 10)
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=60, limits=limits) as client:
+        print(f"Alvo: {BASE_URL} | leitura: {READ_PATH} | {LOGINS} logins ({LOGIN_CONCURRENCY} simultâneos)")
+
+        baseline = await measure_reads(client, SECONDS)
+        results = Counter()
+        burst = asyncio.create_task(login_burst(client, results))
+        during = await measure_reads(client, SECONDS, background=burst)
+
+    print("=" * 60)
+    report("leitura sem logins", baseline)
+    report("leitura com logins", during)
+    statuses = ", ".join(f"HTTP {code}: {count}" for code, count in sorted(results.items()))
+    print(f"   Logins em {burst.result():.2f}s -> {statuses}")
+    print(f"   Variação p95: {percentile(during, 95) / percentile(baseline, 95):.2f}x")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
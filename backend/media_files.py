@@ -0,0 +1,169 @@
+"""
+Servidor de mídia para /api/uploads
+- Cache-Control immutable para nomes endereçados por conteúdo (cas/...)
+- ETag forte (SHA-256 do nome no CAS, tamanho+mtime nos demais) e 304
+- Range de um intervalo (bytes=a-b, a-, -n), If-Range e 416
+- Negociação de WebP: pedidos de .jpg/.png recebem o .webp irmão se o Accept permitir;
+  originais sem .webp irmão (cas/...) recebem o WebP na resolução original gerado pelo
+  pipeline de variantes (images.py). Nunca uma variante menor: sem WebP do mesmo
+  tamanho, o original é servido
+- Zero-copy: `http.response.pathsend` quando o servidor ASGI suporta, ou
+  X-Accel-Redirect para o nginx (MEDIA_ACCEL_REDIRECT=/prefixo-interno/)
+"""
+from email.utils import formatdate
+from typing import Optional, Tuple
+import mimetypes
+import os
+import re
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from images import VARIANTS_DIRNAME, full_webp_name
+from media_store import AliasedStaticFiles, CAS_DIRNAME
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "public, no-cache"
+
+# Prefixo de uma location `internal` do nginx apontando para backend/uploads
+ACCEL_REDIRECT_PREFIX = os.environ.get("MEDIA_ACCEL_REDIRECT")
+
+_CAS_SHA_RE = re.compile(r"^([0-9a-f]{64})\.[a-z0-9]+$")
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_WEBP_SOURCES = {".jpg", ".jpeg", ".png"}
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Intervalo (início, fim inclusivo) de um cabeçalho Range de um único intervalo
+    Retorna None para cabeçalhos não suportados ou inválidos, como bytes=5-3
+    (resposta completa, RFC 9110 14.2), e levanta ValueError se o intervalo não for
+    satisfazível.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        length = int(last)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError("range not satisfiable")
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+class PartialFileResponse(Response):
+    """206 com um trecho do arquivo (lido em blocos, sem carregar tudo na memória)"""
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, path: str, start: int, end: int, size: int, headers: dict, media_type: str):
+        super().__init__(status_code=206, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.end = end
+        self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        remaining = self.end - self.start + 1
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class MediaStaticFiles(AliasedStaticFiles):
+    """StaticFiles com cache de longa duração, ETag forte, Range e negociação de WebP"""
+
+    @staticmethod
+    def _webp_candidates(full_path: str):
+        """.webp irmão; para originais, o WebP na resolução original (images.full_webp_name)"""
+        base, _ = os.path.splitext(full_path)
+        yield f"{base}.webp"
+        directory, stem = os.path.split(base)
+        if os.path.basename(directory) != VARIANTS_DIRNAME:
+            yield os.path.join(directory, VARIANTS_DIRNAME, full_webp_name(stem))
+
+    def _negotiate_webp(self, full_path: str, stat_result: os.stat_result, request_headers: Headers):
+        """(caminho, stat, negociável): troca .jpg/.png pelo WebP pré-gerado"""
+        if os.path.splitext(full_path)[1].lower() not in _WEBP_SOURCES:
+            return full_path, stat_result, False
+        for candidate in self._webp_candidates(full_path):
+            try:
+                webp_stat = os.stat(candidate)
+            except OSError:
+                continue
+            if "image/webp" in request_headers.get("accept", ""):
+                return candidate, webp_stat, True
+            return full_path, stat_result, True
+        return full_path, stat_result, False
+
+    def _relative(self, full_path: str) -> str:
+        for directory in self.all_directories:
+            directory = os.path.realpath(directory)
+            if full_path.startswith(directory + os.sep):
+                return full_path[len(directory) + 1:].replace(os.sep, "/")
+        return os.path.basename(full_path)
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path, stat_result, negotiable = self._negotiate_webp(str(full_path), stat_result, request_headers)
+        relative = self._relative(full_path)
+        content_addressed = relative.startswith(f"{CAS_DIRNAME}/")
+
+        # Representações negociadas não podem compartilhar a ETag do original
+        sha_match = _CAS_SHA_RE.match(os.path.basename(full_path)) if content_addressed and not negotiable else None
+        etag = f'"{sha_match.group(1)}"' if sha_match else f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+        media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+        headers = {
+            "etag": etag,
+            "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+            "cache-control": IMMUTABLE_CACHE if content_addressed else REVALIDATE_CACHE,
+            "accept-ranges": "bytes",
+        }
+        if negotiable:
+            headers["vary"] = "Accept"
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+            return Response(status_code=304, headers=headers)
+
+        if ACCEL_REDIRECT_PREFIX:
+            # O nginx envia o arquivo com sendfile (e trata Range); aqui só os cabeçalhos
+            headers["x-accel-redirect"] = f"{ACCEL_REDIRECT_PREFIX.rstrip('/')}/{relative}"
+            return Response(headers=headers, media_type=media_type)
+
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and (not if_range or if_range.strip() == etag):
+            size = stat_result.st_size
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                headers["content-range"] = f"bytes */{size}"
+                return Response(status_code=416, headers=headers)
+            if byte_range:
+                return PartialFileResponse(full_path, *byte_range, size, headers, media_type)
+
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, media_type=media_type)
+        response.headers.update(headers)
+        return response
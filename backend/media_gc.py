@@ -0,0 +1,265 @@
+"""
+Coletor de arquivos órfãos no armazenamento de mídia (storage.py: disco local ou S3)
+Apaga imagens que nenhum imóvel, foto de perfil ou banner referencia mais.
+
+- Incremental (padrão): processa apenas os arquivos registrados em
+  'media_deletion_log' por exclusões/edições (não varre o diretório inteiro)
+- Completo (--full): lê todas as URLs referenciadas para um conjunto em memória
+  e percorre todos os objetos do armazenamento
+
+Blobs registrados ou liberados há menos de GRACE_PERIOD nunca são apagados (uploads
+em andamento, edições que ainda vão salvar a URL, etc); o prazo vale pelas datas do
+blob (registered_at/released_at), renovadas quando os mesmos bytes são enviados de
+novo. Arquivos sem blob (URLs antigas, uploads diretos não confirmados) usam a data
+de modificação.
+
+Antes de apagar um arquivo do armazenamento por conteúdo o coletor reserva o blob
+(refs <= 0, campo `deleting` com prazo GC_CLAIM_TTL); um upload dos mesmos bytes
+durante a reserva espera e regrava o arquivo (media_store.register_blob).
+
+Uso: python media_gc.py [--full] [--dry-run] [--grace-hours N]
+"""
+from datetime import datetime, timedelta
+from pathlib import PurePosixPath
+from typing import Optional, Set
+import asyncio
+import sys
+import uuid
+import logging
+
+from pymongo.errors import DuplicateKeyError
+
+from database import client, db
+from images import UPLOAD_URL_PREFIX, VARIANTS_DIRNAME
+from storage import get_storage
+from resumable_uploads import delete_expired_sessions
+from media_store import (
+    cas_sha256, media_aliases_collection, media_blobs_collection, media_deletion_log_collection
+)
+
+logger = logging.getLogger(__name__)
+
+GRACE_PERIOD = timedelta(hours=24)
+# Prazo da reserva de um blob; vencida, um novo upload dos mesmos bytes assume
+GC_CLAIM_TTL = timedelta(minutes=1)
+
+
+def _source_stem(variant_name: str) -> str:
+    """'<stem>_640.webp' -> '<stem>'"""
+    return PurePosixPath(variant_name).stem.rsplit("_", 1)[0]
+
+
+async def _referenced_paths() -> Set[str]:
+    """Todas as chaves do armazenamento referenciadas no banco"""
+    storage = get_storage()
+    referenced = set()
+
+    def add(url: Optional[str]):
+        key = storage.key_for_url(url)
+        if key is None and url and url.startswith(UPLOAD_URL_PREFIX):
+            # URL antiga do disco local (ainda pode ter alias para o arquivo migrado)
+            key = url[len(UPLOAD_URL_PREFIX):]
+        if key is not None:
+            referenced.add(key)
+
+    async for prop in db.properties.find({"images.0": {"$exists": True}}, {"_id": 0, "images": 1}):
+        for url in prop["images"]:
+            add(url)
+    async for user in db.users.find({"profile_photo": {"$nin": [None, ""]}}, {"_id": 0, "profile_photo": 1}):
+        add(user["profile_photo"])
+    async for banner in db.banners.find({}, {"_id": 0, "image_url": 1}):
+        add(banner.get("image_url"))
+
+    # URLs antigas ainda referenciadas mantêm o arquivo migrado
+    async for alias in media_aliases_collection.find({}, {"_id": 0, "path": 1, "target": 1}):
+        if alias["path"] in referenced:
+            referenced.add(alias["target"])
+
+    return referenced
+
+
+async def _is_referenced(path: str) -> bool:
+    """Verificação pontual (consultas indexadas) usada no modo incremental"""
+    url = get_storage().public_url(path)
+    sha256 = cas_sha256(path)
+    if sha256:
+        blob = await media_blobs_collection.find_one({"sha256": sha256}, {"_id": 0, "refs": 1})
+        if blob and blob.get("refs", 0) > 0:
+            return True
+
+    urls = [url]
+    async for alias in media_aliases_collection.find({"target": path}, {"_id": 0, "path": 1}):
+        urls.append(f"{UPLOAD_URL_PREFIX}{alias['path']}")
+
+    return bool(
+        await db.properties.find_one({"images": {"$in": urls}}, {"_id": 1})
+        or await db.users.find_one({"profile_photo": {"$in": urls}}, {"_id": 1})
+        or await db.banners.find_one({"image_url": {"$in": urls}}, {"_id": 1})
+    )
+
+
+async def _claim_blob(sha256: str, cutoff: datetime, dry_run: bool) -> Optional[str]:
+    """
+    Reserva o blob para exclusão se ninguém o usa e ele passou do prazo de carência
+    Retorna o token da reserva (None: manter o arquivo). Sem documento (arquivo órfão)
+    a reserva cria um registro provisório, que bloqueia uploads dos mesmos bytes.
+    """
+    now = datetime.utcnow()
+    old = {"$not": {"$gte": cutoff}}
+    query = {
+        "sha256": sha256,
+        "$or": [{"deleting": None}, {"deleting_until": {"$lt": now}}],
+        "registered_at": old,
+        "released_at": old,
+        "created_at": old,
+        "refs": {"$not": {"$gt": 0}},
+    }
+    if dry_run:
+        blob = await media_blobs_collection.find_one({"sha256": sha256}, {"_id": 1})
+        return "dry-run" if blob is None or await media_blobs_collection.find_one(query, {"_id": 1}) else None
+
+    token = str(uuid.uuid4())
+    try:
+        await media_blobs_collection.update_one(
+            query,
+            {"$set": {"deleting": token, "deleting_until": now + GC_CLAIM_TTL}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # O blob existe mas está em uso, é recente ou já está reservado
+        return None
+    return token
+
+
+async def _finish_blob(sha256: str, token: str, dry_run: bool):
+    """Remove o registro do blob reservado (arquivos já apagados)"""
+    if dry_run:
+        return
+    result = await media_blobs_collection.delete_one(
+        {"sha256": sha256, "deleting": token, "refs": {"$not": {"$gt": 0}}}
+    )
+    if not result.deleted_count:
+        logger.warning(f"Blob {sha256} was reused while being deleted; the next upload restores it")
+
+
+async def _delete_object(key: str, stats: dict, dry_run: bool):
+    info = await get_storage().stat(key)
+    if info is None:
+        return
+    if not dry_run:
+        await get_storage().delete(key)
+    stats["deleted_files"] += 1
+    stats["reclaimed_bytes"] += info.size
+
+
+async def _delete_with_variants(key: str, stats: dict, dry_run: bool):
+    """Apaga o objeto e suas variantes (images.py)"""
+    await _delete_object(key, stats, dry_run)
+
+    path = PurePosixPath(key)
+    variants_dir = path.parent / VARIANTS_DIRNAME if path.parent.name else PurePosixPath(VARIANTS_DIRNAME)
+    variants = [item.key async for item in get_storage().list_objects(f"{variants_dir}/{path.stem}_")]
+    for variant in variants:
+        await _delete_object(variant, stats, dry_run)
+
+
+async def _old_enough(key: str, cutoff: datetime) -> bool:
+    info = await get_storage().stat(key)
+    return info is not None and info.modified_at < cutoff
+
+
+async def collect_incremental(grace: timedelta = GRACE_PERIOD, dry_run: bool = False) -> dict:
+    """Processa o log de exclusão: só os arquivos liberados desde a última execução"""
+    stats = {"mode": "incremental", "checked": 0, "deleted_files": 0, "reclaimed_bytes": 0, "kept": 0}
+    cutoff = datetime.utcnow() - grace
+
+    done_ids = []
+    cursor = media_deletion_log_collection.find({"logged_at": {"$lt": cutoff}}).sort("logged_at", 1)
+    async for entry in cursor:
+        stats["checked"] += 1
+        key = entry["path"]
+        sha256 = cas_sha256(key)
+        if await _is_referenced(key):
+            stats["kept"] += 1
+        elif sha256:
+            token = await _claim_blob(sha256, cutoff, dry_run)
+            if token:
+                await _delete_with_variants(key, stats, dry_run)
+                await _finish_blob(sha256, token, dry_run)
+            else:
+                stats["kept"] += 1
+        elif await _old_enough(key, cutoff):
+            await _delete_with_variants(key, stats, dry_run)
+        else:
+            stats["kept"] += 1
+        done_ids.append(entry["_id"])
+
+    if done_ids and not dry_run:
+        await media_deletion_log_collection.delete_many({"_id": {"$in": done_ids}})
+
+    return stats
+
+
+async def collect_full(grace: timedelta = GRACE_PERIOD, dry_run: bool = False) -> dict:
+    """Varredura completa: compara todos os objetos do armazenamento com as URLs referenciadas"""
+    stats = {"mode": "full", "checked": 0, "deleted_files": 0, "reclaimed_bytes": 0, "kept": 0}
+    referenced = await _referenced_paths()
+    referenced_stems = {PurePosixPath(p).stem for p in referenced}
+    cutoff = datetime.utcnow() - grace
+
+    async for item in get_storage().list_objects():
+        stats["checked"] += 1
+        path = PurePosixPath(item.key)
+        if path.parent.name == VARIANTS_DIRNAME:
+            in_use = _source_stem(path.name) in referenced_stems
+        else:
+            in_use = item.key in referenced
+
+        if in_use or item.modified_at >= cutoff:
+            stats["kept"] += 1
+            continue
+
+        sha256 = cas_sha256(item.key)
+        if not sha256:
+            await _delete_object(item.key, stats, dry_run)
+            continue
+        token = await _claim_blob(sha256, cutoff, dry_run)
+        if not token:
+            stats["kept"] += 1
+            continue
+        await _delete_object(item.key, stats, dry_run)
+        await _finish_blob(sha256, token, dry_run)
+
+    # O log fica redundante depois de uma varredura completa
+    if not dry_run:
+        await media_deletion_log_collection.delete_many({"logged_at": {"$lt": cutoff}})
+
+    return stats
+
+
+async def main():
+    full = "--full" in sys.argv
+    dry_run = "--dry-run" in sys.argv
+    grace = GRACE_PERIOD
+    if "--grace-hours" in sys.argv:
+        grace = timedelta(hours=float(sys.argv[sys.argv.index("--grace-hours") + 1]))
+
+    print("=" * 60)
+    print(f"🧹 COLETANDO UPLOADS ÓRFÃOS ({'completo' if full else 'incremental'}{', simulação' if dry_run else ''})")
+    print(f"   Armazenamento: {get_storage().name}")
+    print("=" * 60)
+
+    stats = await (collect_full if full else collect_incremental)(grace, dry_run)
+    if not dry_run:
+        expired = await delete_expired_sessions()
+        print(f"   Uploads retomáveis expirados removidos: {expired}")
+
+    print(f"   Verificados: {stats['checked']} | Mantidos: {stats['kept']} | Apagados: {stats['deleted_files']}")
+    print(f"   Espaço liberado: {stats['reclaimed_bytes'] / (1024 * 1024):.2f} MB")
+    print("=" * 60)
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,196 @@
+"""
+Armazenamento de imagens endereçado por conteúdo (SHA-256)
+- Objetos em cas/ab/cd/<sha256>.<ext> no backend configurado (storage.py)
+- Coleção 'media_blobs' com contador de referências: bytes idênticos são gravados uma vez
+- Coleção 'media_aliases' mapeia URLs antigas (uploads/<arquivo>) para o novo caminho
+- Coleção 'media_deletion_log' registra arquivos liberados para o coletor (media_gc.py)
+- O coletor reserva o blob (campo `deleting` com prazo) antes de apagar o arquivo; quem
+  registra os mesmos bytes nesse meio-tempo espera a reserva terminar e grava de novo
+"""
+from fastapi import UploadFile
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.responses import RedirectResponse
+from starlette.staticfiles import StaticFiles
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+import asyncio
+import re
+import uuid
+import logging
+
+import aiofiles.os
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from database import db
+from uploads import save_image_upload, MAX_IMAGE_SIZE, ALLOWED_IMAGE_TYPES
+from images import UPLOAD_ROOT, UPLOAD_URL_PREFIX
+from storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+media_blobs_collection = db.media_blobs
+media_aliases_collection = db.media_aliases
+media_deletion_log_collection = db.media_deletion_log
+
+CAS_DIRNAME = "cas"
+INCOMING_DIRNAME = ".incoming"
+
+_CAS_PATH_RE = re.compile(r"^cas/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.[a-z0-9]+$")
+
+
+def cas_relative_path(sha256: str, extension: str) -> str:
+    """'cas/ab/cd/abcd....jpg' - dois níveis de 256 diretórios"""
+    return f"{CAS_DIRNAME}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}"
+
+
+def cas_sha256(key: Optional[str]) -> Optional[str]:
+    """SHA-256 de uma chave 'cas/ab/cd/<sha256>.<ext>' (None para outras chaves)"""
+    match = _CAS_PATH_RE.match(key) if key else None
+    return match.group(1) if match else None
+
+
+def blob_sha256(image_url: str) -> Optional[str]:
+    """SHA-256 de uma URL do armazenamento por conteúdo (None para URLs antigas/externas)"""
+    return cas_sha256(get_storage().key_for_url(image_url))
+
+
+async def store_image(upload_file: UploadFile, max_size: int = MAX_IMAGE_SIZE) -> str:
+    """
+    Salva uma imagem no armazenamento por conteúdo e retorna a URL pública
+    Se os mesmos bytes já existem, o arquivo novo é descartado e apenas a referência é contada.
+    """
+    stored = await save_image_upload(
+        upload_file, UPLOAD_ROOT / CAS_DIRNAME / INCOMING_DIRNAME, uuid.uuid4().hex, max_size=max_size
+    )
+    relative_path = cas_relative_path(stored.sha256, ALLOWED_IMAGE_TYPES[stored.content_type])
+    await commit_blob(stored.path, relative_path, stored.sha256, stored.size, stored.content_type)
+    return get_storage().public_url(relative_path)
+
+
+async def commit_blob(temp_path: Path, relative_path: str, sha256: str, size: int, content_type: str, refs: int = 1):
+    """Conta a referência e envia o arquivo para o armazenamento (se ainda não existir)"""
+    storage = get_storage()
+    # Registrar antes: com o blob registrado o coletor não apaga mais o arquivo
+    rewrite = await register_blob(relative_path, sha256, size, content_type, refs)
+    if rewrite or await storage.size(relative_path) is None:
+        await storage.put_file(temp_path, relative_path, content_type)
+    else:
+        await aiofiles.os.remove(temp_path)
+
+
+async def register_blob(relative_path: str, sha256: str, size: int, content_type: str, refs: int = 0) -> bool:
+    """
+    Registra um objeto no armazenamento (upload direto) somando `refs` referências
+    Retorna True se o blob é novo ou o coletor estava apagando o arquivo: quem tem os
+    bytes precisa gravá-los de novo.
+    """
+    while True:
+        now = datetime.utcnow()
+        try:
+            previous = await media_blobs_collection.find_one_and_update(
+                # Blob reservado pelo coletor não casa: o upsert esbarra no índice único
+                {"sha256": sha256, "$or": [{"deleting": None}, {"deleting_until": {"$lt": now}}]},
+                {
+                    "$inc": {"refs": refs},
+                    "$set": {"registered_at": now},
+                    "$unset": {"deleting": "", "deleting_until": ""},
+                    "$setOnInsert": {
+                        "path": relative_path,
+                        "size": size,
+                        "content_type": content_type,
+                        "created_at": now
+                    }
+                },
+                projection={"_id": 0, "deleting": 1},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            # O coletor está apagando este blob: espera a reserva terminar
+            await asyncio.sleep(0.1)
+            continue
+        return previous is None or previous.get("deleting") is not None
+
+
+async def retain_images(image_urls: Iterable[str]) -> List[str]:
+    """
+    Conta uma referência para cada imagem anexada a um documento (uploads diretos)
+    Blobs reservados pelo coletor (ou já apagados) não são contados: retorna essas URLs
+    e desfaz as referências contadas na chamada, para o documento não ser gravado
+    apontando para um arquivo que vai sumir.
+    """
+    retained, missing = [], []
+    for image_url in image_urls or []:
+        sha256 = blob_sha256(image_url)
+        if not sha256:
+            continue
+        result = await media_blobs_collection.update_one(
+            {"sha256": sha256, "deleting": None}, {"$inc": {"refs": 1}}
+        )
+        (retained if result.modified_count else missing).append(image_url)
+    if missing:
+        await release_images(retained)
+    return missing
+
+
+async def release_images(image_urls: Iterable[str]):
+    """
+    Decrementa as referências das imagens removidas de um documento e registra
+    os arquivos no log de exclusão (o coletor apaga os que ficarem sem uso)
+    """
+    storage = get_storage()
+    now = datetime.utcnow()
+    log_entries = []
+    releases = []
+    for image_url in image_urls or []:
+        key = storage.key_for_url(image_url)
+        if not key:
+            continue
+        sha256 = blob_sha256(image_url)
+        if sha256:
+            releases.append(UpdateOne(
+                {"sha256": sha256, "refs": {"$gt": 0}},
+                {"$inc": {"refs": -1}, "$set": {"released_at": now}}
+            ))
+        log_entries.append({"path": key, "logged_at": now})
+
+    # Uma ida ao banco para todas as imagens (exclusões em massa liberam milhares)
+    if releases:
+        await media_blobs_collection.bulk_write(releases, ordered=False)
+    if log_entries:
+        await media_deletion_log_collection.insert_many(log_entries)
+
+
+# ==========================================
+# URLs ANTIGAS (uploads/<arquivo>)
+# ==========================================
+
+_alias_cache: Dict[str, str] = {}
+
+
+async def resolve_alias(path: str) -> Optional[str]:
+    """Caminho atual de um arquivo migrado para o armazenamento por conteúdo"""
+    if path in _alias_cache:
+        return _alias_cache[path]
+    alias = await media_aliases_collection.find_one({"path": path}, {"_id": 0, "target": 1})
+    if alias:
+        _alias_cache[path] = alias["target"]
+        return alias["target"]
+    return None
+
+
+class AliasedStaticFiles(StaticFiles):
+    """StaticFiles que redireciona URLs antigas para o caminho no armazenamento por conteúdo"""
+
+    async def get_response(self, path: str, scope):
+        try:
+            return await super().get_response(path, scope)
+        except StarletteHTTPException as exc:
+            if exc.status_code != 404:
+                raise
+            target = await resolve_alias(path)
+            if target is None:
+                raise
+            return RedirectResponse(f"{UPLOAD_URL_PREFIX}{target}", status_code=301)
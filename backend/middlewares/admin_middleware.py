@@ -1,17 +1,8 @@
 from fastapi import HTTPException, status, Depends
-from auth import get_current_user_email
-from database import db
+from current_user import get_token_user
 
-async def verify_admin(email: str = Depends(get_current_user_email)):
+async def verify_admin(user: dict = Depends(get_token_user)):
     """Middleware to verify if user is admin"""
-    user = await db.users.find_one({"email": email})
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
     if user.get('user_type') != 'admin':
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -26,21 +17,13 @@ async def verify_admin(email: str = Depends(get_current_user_email)):
     
     return user
 
-async def get_current_admin(email: str = Depends(get_current_user_email)):
+async def get_current_admin(user: dict = Depends(get_token_user)):
     """Get current admin user"""
-    return await verify_admin(email)
+    return await verify_admin(user)
 
 
-async def verify_admin_senior(email: str = Depends(get_current_user_email)):
+async def verify_admin_senior(user: dict = Depends(get_token_user)):
     """Middleware to verify if user is admin senior or admin master"""
-    user = await db.users.find_one({"email": email})
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
     # Admin Senior ou Admin Master podem acessar
     if user.get('user_type') not in ['admin', 'admin_senior']:
         raise HTTPException(
@@ -56,6 +39,6 @@ async def verify_admin_senior(email: str = Depends(get_current_user_email)):
     
     return user
 
-async def get_current_admin_senior(email: str = Depends(get_current_user_email)):
+async def get_current_admin_senior(user: dict = Depends(get_token_user)):
     """Get current admin senior or admin master user"""
-    return await verify_admin_senior(email)
+    return await verify_admin_senior(user)
@@ -0,0 +1,149 @@
+"""
+Script para migrar as imagens antigas (uploads/<property_id>_<hash>.ext) para o
+armazenamento por conteúdo (uploads/cas/ab/cd/<sha256>.ext)
+
+- Arquivos idênticos passam a ser gravados uma única vez
+- As URLs dos imóveis são atualizadas e as antigas continuam funcionando
+  via 'media_aliases' (redirecionamento 301)
+- Pode ser executado várias vezes (idempotente): as referências ('refs') não são
+  somadas durante a migração, e sim recontadas no final a partir dos imóveis. Uma
+  execução interrompida no meio de um imóvel não deixa contagem em dobro
+- Rode fora do horário de uso: a recontagem sobrescreve 'refs' dos blobs de imóveis
+
+Depois da migração, rode generate_image_variants.py para gerar as variantes
+com os novos nomes.
+"""
+import asyncio
+import hashlib
+from collections import Counter
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from database import client, db, ensure_indexes
+from images import UPLOAD_ROOT, UPLOAD_URL_PREFIX, local_upload_path
+from media_store import blob_sha256, cas_relative_path, media_aliases_collection, media_blobs_collection
+from uploads import CHUNK_SIZE, sniff_image_type, ALLOWED_IMAGE_TYPES
+
+
+def hash_file(path) -> tuple:
+    """SHA-256, tamanho e tipo do arquivo lido em blocos"""
+    digest = hashlib.sha256()
+    size = 0
+    content_type = None
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            if content_type is None:
+                content_type = sniff_image_type(chunk)
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size, content_type
+
+
+async def migrate_image(image_url: str, migrated: dict) -> str:
+    """Migra uma imagem e retorna a nova URL (ou a mesma URL se não for migrável)"""
+    if blob_sha256(image_url):
+        return image_url
+
+    legacy_path = image_url[len(UPLOAD_URL_PREFIX):] if image_url.startswith(UPLOAD_URL_PREFIX) else None
+    if legacy_path is None:
+        return image_url
+
+    # Já migrada (por outro imóvel ou execução anterior)
+    if legacy_path in migrated:
+        target = migrated[legacy_path]
+    else:
+        alias = await media_aliases_collection.find_one({"path": legacy_path})
+        if alias:
+            target = alias["target"]
+        else:
+            source = local_upload_path(image_url)
+            if not source.exists():
+                print(f"   ⚠️  Arquivo não encontrado: {legacy_path}")
+                return image_url
+
+            sha256, size, content_type = hash_file(source)
+            if content_type not in ALLOWED_IMAGE_TYPES:
+                print(f"   ⚠️  Tipo não suportado, mantido: {legacy_path}")
+                return image_url
+
+            target = cas_relative_path(sha256, ALLOWED_IMAGE_TYPES[content_type])
+            final_path = UPLOAD_ROOT / target
+            if final_path.exists():
+                source.unlink()
+            else:
+                final_path.parent.mkdir(parents=True, exist_ok=True)
+                source.replace(final_path)
+
+            await media_blobs_collection.update_one(
+                {"sha256": sha256},
+                {"$setOnInsert": {
+                    "sha256": sha256,
+                    "path": target,
+                    "size": size,
+                    "content_type": content_type,
+                    "refs": 0,
+                    "created_at": datetime.utcnow()
+                }},
+                upsert=True
+            )
+            await media_aliases_collection.update_one(
+                {"path": legacy_path},
+                {"$setOnInsert": {"path": legacy_path, "target": target, "created_at": datetime.utcnow()}},
+                upsert=True
+            )
+        migrated[legacy_path] = target
+
+    return f"{UPLOAD_URL_PREFIX}{target}"
+
+
+async def recount_refs(ref_counts: Counter, migrated_targets: set) -> int:
+    """refs = usos nos imóveis; blobs migrados sem nenhum uso ficam com 0"""
+    operations = [
+        UpdateOne({"sha256": sha256}, {"$set": {"refs": count}})
+        for sha256, count in ref_counts.items()
+    ]
+    for target in migrated_targets:
+        sha256 = blob_sha256(f"{UPLOAD_URL_PREFIX}{target}")
+        if sha256 and sha256 not in ref_counts:
+            operations.append(UpdateOne({"sha256": sha256}, {"$set": {"refs": 0}}))
+    for start in range(0, len(operations), 1000):
+        await media_blobs_collection.bulk_write(operations[start:start + 1000], ordered=False)
+    return len(operations)
+
+
+async def migrate():
+    print("=" * 60)
+    print("📦 MIGRANDO UPLOADS PARA ARMAZENAMENTO POR CONTEÚDO")
+    print("=" * 60)
+
+    await ensure_indexes()
+
+    migrated = {}
+    ref_counts = Counter()
+    updated = 0
+    cursor = db.properties.find({"images.0": {"$exists": True}}, {"_id": 0, "id": 1, "images": 1})
+    async for prop in cursor:
+        new_images = [await migrate_image(url, migrated) for url in prop["images"]]
+        if new_images != prop["images"]:
+            await db.properties.update_one({"id": prop["id"]}, {"$set": {"images": new_images}})
+            updated += 1
+        # Uma referência por uso no documento
+        ref_counts.update(sha256 for sha256 in map(blob_sha256, new_images) if sha256)
+
+    recounted = await recount_refs(ref_counts, set(migrated.values()))
+    print(f"   Referências recontadas: {recounted} blobs")
+
+    blobs = await media_blobs_collection.count_documents({})
+    print("=" * 60)
+    print(f"✅ {updated} imóveis atualizados | {len(migrated)} arquivos migrados | {blobs} blobs únicos")
+    print("=" * 60)
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -15,6 +15,7 @@ class UserStatus(str, Enum):
     active = "active"
     pending = "pending"
     paused = "paused"
+    deleting = "deleting"         # Exclusão em andamento (user_deletion.py)
     deleted = "deleted"
 
 class PlanType(str, Enum):
@@ -190,6 +191,9 @@ class PropertyUpdate(BaseModel):
 class Property(PropertyBase):
     id: str
     owner_id: str
+    neighborhood_id: Optional[str] = None  # Bairro canônico (ver canonical.py)
+    image_variants: Optional[dict] = None  # Variantes por imagem para srcset (ver images.py)
+    image_errors: Optional[List[dict]] = None  # Imagens recusadas no upload (só na resposta, não é salvo)
     created_at: datetime
     updated_at: datetime
     
@@ -200,6 +204,8 @@ class PropertyWithOwner(PropertyBase):
     """Property model with owner information for public listing"""
     id: str
     owner_id: str
+    neighborhood_id: Optional[str] = None
+    image_variants: Optional[dict] = None
     owner_name: Optional[str] = None
     owner_phone: Optional[str] = None
     owner_photo: Optional[str] = None
@@ -218,11 +224,40 @@ class Token(BaseModel):
     access_token: str
     token_type: str
     user: User
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # segundos de validade do access_token
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     email: Optional[str] = None
 
 
+# ==========================================
+# UPLOAD DIRETO DE MÍDIA
+# ==========================================
+
+class DirectUploadCreate(BaseModel):
+    """Pedido de URL pré-assinada: o cliente calcula o SHA-256 antes de enviar"""
+    sha256: str = Field(..., pattern=r"^[0-9a-f]{64}$", description="SHA-256 do arquivo (hex)")
+    content_type: str = Field(..., description="image/jpeg, image/png, image/webp ou image/gif")
+    size: int = Field(..., gt=0, description="Tamanho do arquivo em bytes")
+
+class DirectUploadComplete(BaseModel):
+    sha256: str = Field(..., pattern=r"^[0-9a-f]{64}$")
+    content_type: str
+
+class ResumableUploadCreate(BaseModel):
+    """Sessão de upload retomável (blocos enviados com PATCH)"""
+    size: int = Field(..., gt=0, description="Tamanho total do arquivo em bytes")
+    filename: Optional[str] = Field(None, max_length=255)
+    sha256: Optional[str] = Field(None, pattern=r"^[0-9a-f]{64}$", description="Conferido ao finalizar (opcional)")
+
+class PropertyUploadsAttach(BaseModel):
+    upload_ids: List[str] = Field(..., min_items=1, description="IDs de uploads retomáveis finalizados")
+
+
 
 # ==========================================
 # AGENDAMENTO DE VISITAS
@@ -353,6 +388,7 @@ class Demand(BaseModel):
     estado: Optional[str] = None  # Sigla do estado
     cidade: Optional[str] = None  # Cidade de interesse (opcional para compatibilidade)
     bairros_interesse: List[str]
+    bairros_interesse_ids: List[str] = []  # Bairros canônicos (ver canonical.py)
     valor_minimo: float
     valor_maximo: float
     comissao_parceiro: float
@@ -0,0 +1,31 @@
+"""
+Recalcula o documento de estatísticas do Mural de Oportunidades (board_stats.py)
+a partir das coleções de demandas e propostas.
+
+Rode na primeira implantação (backfill) e sempre que o painel divergir da base:
+scripts de seed e edições manuais não passam pelas rotas que mantêm o documento.
+
+Uso: python rebuild_board_stats.py
+"""
+import asyncio
+import time
+
+from database import client
+from board_stats import board_response, rebuild_board_stats
+
+
+async def main():
+    start = time.perf_counter()
+    stats = board_response(await rebuild_board_stats())
+
+    print("=" * 60)
+    print(f"Demandas: {stats['statistics']['demands']}")
+    print(f"Propostas: {stats['statistics']['proposals']}")
+    print(f"Parcerias: {len(stats['partnerships'])} | Usuários mais ativos: {len(stats['active_users'])}")
+    print(f"Recalculado em {time.perf_counter() - start:.1f}s")
+    print("=" * 60)
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
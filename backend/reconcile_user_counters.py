@@ -0,0 +1,38 @@
+"""
+Reconciliação dos contadores do usuário (user_counters.py)
+Recalcula properties_count, featured_count, active_demands e unread_notifications
+a partir das coleções e corrige os documentos que divergirem (desvios causados
+por scripts de seed, edições manuais ou falhas no meio de uma rota).
+
+Também serve de backfill na primeira implantação dos contadores.
+Escritas concorrentes durante a execução podem deixar um desvio pequeno, corrigido
+na próxima rodada: agende fora do horário de pico (ex.: cron diário).
+
+Uso: python reconcile_user_counters.py [--dry-run]
+"""
+import asyncio
+import sys
+import time
+
+from database import client
+from user_counters import reconcile_counters
+
+
+async def main():
+    dry_run = "--dry-run" in sys.argv
+    start = time.perf_counter()
+    drifts = await reconcile_counters(dry_run=dry_run)
+
+    print("=" * 60)
+    for drift in drifts[:20]:
+        print(f"   {drift['user_id']}: {drift['before']} -> {drift['after']}")
+    if len(drifts) > 20:
+        print(f"   ... e mais {len(drifts) - 20}")
+    action = "encontrado(s)" if dry_run else "corrigido(s)"
+    print(f"{len(drifts)} usuário(s) com contadores divergentes {action} em {time.perf_counter() - start:.1f}s")
+    print("=" * 60)
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
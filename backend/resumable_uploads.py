@@ -0,0 +1,276 @@
+"""
+Uploads retomáveis (protocolo no estilo tus)
+1. Criar a sessão com o tamanho total           -> id, offset 0
+2. Enviar blocos com PATCH + Upload-Offset        -> cada bloco é gravado em disco ao chegar
+3. Consultar o offset (HEAD) após uma queda e reenviar só o que falta
+4. Finalizar: confere o tipo, calcula o SHA-256 e move para o armazenamento por conteúdo
+
+Se a conexão cair no meio de um PATCH, os bytes já recebidos ficam salvos e o
+offset avança até eles.
+
+Cada PATCH/finalize reserva a sessão antes de tocar no arquivo (status `writing` /
+`finalizing` com prazo em lease_until): requisições concorrentes recebem 409 em vez
+de gravar no mesmo arquivo. Um finalize repetido devolve o resultado já gravado.
+
+Os blocos ficam em arquivos parciais em RESUMABLE_UPLOAD_DIR até o finalize, que envia
+o arquivo completo para o armazenamento configurado (storage.py). Com vários nós da API
+esse diretório precisa ser compartilhado entre eles (volume de rede) ou o balanceador
+precisa manter cada sessão no mesmo nó; o upload direto (media_routes.py) não tem
+essa restrição.
+"""
+from fastapi import HTTPException, status
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Optional
+import asyncio
+import hashlib
+import os
+import uuid
+import logging
+
+import aiofiles
+import aiofiles.os
+from starlette.requests import ClientDisconnect
+
+from database import db
+from images import UPLOAD_ROOT
+from media_store import commit_blob, cas_relative_path
+from storage import get_storage
+from uploads import ALLOWED_IMAGE_TYPES, CHUNK_SIZE, MAX_IMAGE_SIZE, sniff_image_type
+
+logger = logging.getLogger(__name__)
+
+upload_sessions_collection = db.upload_sessions
+
+RESUMABLE_DIR = Path(os.environ.get("RESUMABLE_UPLOAD_DIR", UPLOAD_ROOT / ".resumable"))
+# Não pode passar de media_gc.GRACE_PERIOD: o blob finalizado fica sem referências até o anexo
+SESSION_TTL = timedelta(hours=24)
+# Reserva de um PATCH/finalize; vencida (worker caiu), outra requisição pode assumir
+SESSION_LEASE = timedelta(minutes=10)
+
+
+def part_path(upload_id: str) -> Path:
+    return RESUMABLE_DIR / f"{upload_id}.part"
+
+
+def session_response(session: dict) -> dict:
+    return {
+        "id": session["id"],
+        "size": session["size"],
+        "offset": session["offset"],
+        "status": session["status"],
+        "url": session.get("url"),
+        "expires_at": session["expires_at"],
+    }
+
+
+async def create_session(
+    owner_id: str, size: int, filename: Optional[str] = None, sha256: Optional[str] = None
+) -> dict:
+    if size > MAX_IMAGE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Arquivo muito grande. O tamanho máximo é {MAX_IMAGE_SIZE // (1024 * 1024)}MB."
+        )
+
+    now = datetime.utcnow()
+    session = {
+        "id": str(uuid.uuid4()),
+        "owner_id": owner_id,
+        "size": size,
+        "offset": 0,
+        "filename": filename,
+        "expected_sha256": sha256,
+        "status": "pending",
+        "url": None,
+        "created_at": now,
+        "expires_at": now + SESSION_TTL,
+    }
+    await aiofiles.os.makedirs(RESUMABLE_DIR, exist_ok=True)
+    async with aiofiles.open(part_path(session["id"]), "wb"):
+        pass
+    await upload_sessions_collection.insert_one(session)
+    session.pop("_id", None)
+    return session
+
+
+async def get_session(upload_id: str, owner_id: str) -> dict:
+    session = await upload_sessions_collection.find_one({"id": upload_id, "owner_id": owner_id}, {"_id": 0})
+    if not session or session["expires_at"] < datetime.utcnow():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload não encontrado ou expirado"
+        )
+    return session
+
+
+async def _claim(session_id: str, claimed_status: str, query: dict) -> bool:
+    """Reserva a sessão (pending -> claimed_status) se ela ainda casa com `query`"""
+    now = datetime.utcnow()
+    result = await upload_sessions_collection.update_one(
+        {"id": session_id, **query, "$or": [
+            {"status": "pending"},
+            {"status": {"$in": ["writing", "finalizing"]}, "lease_until": {"$lt": now}},
+        ]},
+        {"$set": {"status": claimed_status, "lease_until": now + SESSION_LEASE, "updated_at": now}}
+    )
+    return result.modified_count == 1
+
+
+async def _release(session_id: str, claimed_status: str, fields: dict):
+    """Devolve a sessão reservada (status pending, salvo se `fields` disser outro)"""
+    await upload_sessions_collection.update_one(
+        {"id": session_id, "status": claimed_status},
+        {"$set": {"status": "pending", "updated_at": datetime.utcnow(), **fields}, "$unset": {"lease_until": ""}}
+    )
+
+
+def _busy_error(session: dict) -> HTTPException:
+    if session["status"] == "complete":
+        detail = "Upload já finalizado"
+    elif session["status"] in ("writing", "finalizing"):
+        detail = "Upload em uso por outra requisição. Consulte o offset e tente novamente."
+    else:
+        detail = f"Offset divergente. O servidor está em {session['offset']}."
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail)
+
+
+async def append_chunk(session: dict, offset: int, body: AsyncIterator[bytes]) -> int:
+    """
+    Grava um bloco a partir de `offset` e retorna o novo offset
+    O offset do cliente precisa ser igual ao do servidor (409 caso contrário).
+    """
+    if session["status"] == "complete" or offset != session["offset"]:
+        raise _busy_error(session)
+    # Só um PATCH por vez grava no arquivo: o segundo no mesmo offset recebe 409
+    if not await _claim(session["id"], "writing", {"offset": offset}):
+        raise _busy_error(await upload_sessions_collection.find_one({"id": session["id"]}, {"_id": 0}))
+
+    written = 0
+    disconnected = False
+    try:
+        async with aiofiles.open(part_path(session["id"]), "r+b") as part:
+            await part.seek(offset)
+            try:
+                async for chunk in body:
+                    if offset + written + len(chunk) > session["size"]:
+                        written = 0
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail="O bloco ultrapassa o tamanho declarado do upload."
+                        )
+                    await part.write(chunk)
+                    written += len(chunk)
+            except ClientDisconnect:
+                # Conexão caiu: mantém o que chegou para o cliente retomar daí
+                disconnected = True
+    finally:
+        await _release(session["id"], "writing", {"offset": offset + written})
+
+    new_offset = offset + written
+    if disconnected:
+        logger.info(f"Upload {session['id']} interrupted at {new_offset}/{session['size']}")
+    return new_offset
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def finalize_session(session: dict) -> dict:
+    """
+    Confere o arquivo completo e move para o armazenamento por conteúdo
+    Idempotente: finalizar de novo devolve o resultado gravado na primeira vez.
+    """
+    if session["status"] == "complete":
+        return session
+    if session["offset"] != session["size"]:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload incompleto: {session['offset']} de {session['size']} bytes recebidos."
+        )
+    if not await _claim(session["id"], "finalizing", {"offset": session["size"]}):
+        current = await upload_sessions_collection.find_one({"id": session["id"]}, {"_id": 0})
+        if current and current["status"] == "complete":
+            return current
+        raise _busy_error(current or session)
+
+    try:
+        return await _finalize_claimed(session)
+    except BaseException:
+        # Falhou antes de concluir: a sessão volta a aceitar finalize (ou novos blocos)
+        await _release(session["id"], "finalizing", {})
+        raise
+
+
+async def _finalize_claimed(session: dict) -> dict:
+    path = part_path(session["id"])
+    async with aiofiles.open(path, "rb") as part:
+        content_type = sniff_image_type(await part.read(16))
+    if content_type not in ALLOWED_IMAGE_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="O conteúdo do arquivo não é uma imagem válida."
+        )
+
+    sha256 = await asyncio.to_thread(_hash_file, path)
+    expected = session.get("expected_sha256")
+    if expected and sha256 != expected:
+        # Recomeça do zero: algum bloco chegou corrompido
+        await _release(session["id"], "finalizing", {"offset": 0})
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="SHA-256 do arquivo não confere. Envie o arquivo novamente."
+        )
+
+    key = cas_relative_path(sha256, ALLOWED_IMAGE_TYPES[content_type])
+    # Referências são contadas quando a imagem é anexada a um imóvel
+    await commit_blob(path, key, sha256, session["size"], content_type, refs=0)
+
+    url = get_storage().public_url(key)
+    await upload_sessions_collection.update_one(
+        {"id": session["id"], "status": "finalizing"},
+        {
+            "$set": {"status": "complete", "url": url, "sha256": sha256, "completed_at": datetime.utcnow()},
+            "$unset": {"lease_until": ""},
+        }
+    )
+    return {**session, "status": "complete", "url": url}
+
+
+async def completed_upload_urls(upload_ids: list, owner_id: str) -> list:
+    """
+    URLs dos uploads finalizados do usuário, na ordem pedida
+    Sessões expiradas não valem: o blob foi gravado sem referências e, passada a
+    carência, o coletor pode apagá-lo (SESSION_TTL não passa de media_gc.GRACE_PERIOD).
+    """
+    sessions = await upload_sessions_collection.find(
+        {"id": {"$in": upload_ids}, "owner_id": owner_id, "status": "complete", "expires_at": {"$gt": datetime.utcnow()}},
+        {"_id": 0, "id": 1, "url": 1}
+    ).to_list(length=len(upload_ids))
+    urls = {session["id"]: session["url"] for session in sessions}
+    missing = [upload_id for upload_id in upload_ids if upload_id not in urls]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Uploads não encontrados, não finalizados ou expirados: {', '.join(missing)}"
+        )
+    return [urls[upload_id] for upload_id in upload_ids]
+
+
+async def delete_expired_sessions() -> int:
+    """Remove sessões expiradas e seus arquivos parciais (chamado pelo media_gc.py)"""
+    removed = 0
+    cursor = upload_sessions_collection.find({"expires_at": {"$lt": datetime.utcnow()}}, {"_id": 0, "id": 1})
+    async for session in cursor:
+        try:
+            await aiofiles.os.remove(part_path(session["id"]))
+        except FileNotFoundError:
+            pass
+        await upload_sessions_collection.delete_one({"id": session["id"]})
+        removed += 1
+    return removed
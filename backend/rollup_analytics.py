@@ -0,0 +1,36 @@
+"""
+Atualiza os rollups diários das séries do painel admin (analytics_rollups.py)
+O servidor já faz isso a cada ANALYTICS_ROLLUP_INTERVAL_SECONDS; use este script
+para o backfill inicial ou para recalcular tudo depois de uma importação em massa.
+
+Uso: python rollup_analytics.py [--full]
+"""
+import asyncio
+import sys
+import time
+
+from database import client
+from analytics_rollups import run_rollups
+
+
+async def main():
+    full = "--full" in sys.argv
+    start = time.perf_counter()
+    written = await run_rollups(full=full)
+
+    print("=" * 60)
+    if written is None:
+        print("Outra execução dos rollups está em andamento; tente de novo mais tarde")
+        print("=" * 60)
+        client.close()
+        return
+
+    for metric, buckets in written.items():
+        print(f"   {metric}: {buckets} bucket(s)")
+    print(f"Rollups {'completos' if full else 'incrementais'} em {time.perf_counter() - start:.1f}s")
+    print("=" * 60)
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
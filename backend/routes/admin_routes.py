@@ -1,17 +1,28 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from pydantic import BaseModel, EmailStr
 from middlewares.admin_middleware import get_current_admin, get_current_admin_senior
-from database import db
-from datetime import datetime, timedelta
-from passlib.context import CryptContext
+from auth import get_password_hash_async, password_hash_pool, token_cache
+from current_user import invalidate_user, revoke_user_tokens, user_lookup_stats
+from token_versions import token_versions
+from auth_sessions import revoked_sessions
+from database import db, duplicate_key_field
+from pymongo.errors import DuplicateKeyError
+from media_store import release_images
+from admin_stats import get_dashboard_snapshot
+from user_deletion import DELETING_STATUS, enqueue_user_deletion, get_user_deletion_job
+from board_stats import get_board_stats
+from analytics_rollups import GROUP_BY_FIELDS, MAX_RANGE_DAYS, METRICS, timeseries
+from exports import EXPORTS, CSV_MEDIA_TYPE, XLSX_MEDIA_TYPE, csv_stream, xlsx_stream
+import admin_bulk
+from user_search import SEARCH_MAX_LIMIT, SEARCH_MIN_LENGTH, InvalidCursor, search_fields, search_users
+import user_counters
+from datetime import date, datetime, timedelta
 import uuid
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # Dashboard Stats Model
 class DashboardStats(BaseModel):
     total_properties: int
@@ -23,6 +34,7 @@ class DashboardStats(BaseModel):
     properties_by_purpose: dict
     recent_registrations: List[dict]
     properties_by_city: dict
+    as_of: Optional[datetime] = None
 
 # User Management Models
 class UserCreate(BaseModel):
@@ -63,6 +75,17 @@ class UserFullUpdate(BaseModel):
     bio: Optional[str] = None
     new_password: Optional[str] = None  # Para alterar senha
 
+class BulkUserStatusUpdate(BaseModel):
+    user_ids: List[str]
+    status: str  # 'active', 'pending', 'paused'
+
+class BulkPlanUpdate(BaseModel):
+    user_ids: List[str]
+    plan_type: str  # 'free', 'mensal', 'trimestral', 'anual', 'lifetime'
+
+class BulkPropertyDelete(BaseModel):
+    property_ids: List[str]
+
 class UserResponse(BaseModel):
     id: str
     name: str
@@ -75,82 +98,61 @@ class UserResponse(BaseModel):
     created_at: datetime
     properties_count: int = 0
 
+class UserSearchResponse(BaseModel):
+    results: List[UserResponse]
+    next_cursor: Optional[str] = None
+
 @router.get("/dashboard", response_model=DashboardStats)
-async def get_dashboard_stats(admin = Depends(get_current_admin)):
-    """Get dashboard statistics (Admin only)"""
-    
-    # Total counts
-    total_properties = await db.properties.count_documents({})
-    total_users = await db.users.count_documents({"user_type": {"$ne": "admin"}})
-    total_services = await db.service_providers.count_documents({})
-    pending_users = await db.users.count_documents({"status": "pending"})
-    active_users = await db.users.count_documents({"status": "active", "user_type": {"$ne": "admin"}})
-    paused_users = await db.users.count_documents({"status": "paused"})
-    
-    # Properties by purpose
-    properties_venda = await db.properties.count_documents({"purpose": "VENDA"})
-    properties_aluguel = await db.properties.count_documents({"purpose": "ALUGUEL"})
-    properties_temporada = await db.properties.count_documents({"purpose": "ALUGUEL_TEMPORADA"})
-    
-    properties_by_purpose = {
-        "VENDA": properties_venda,
-        "ALUGUEL": properties_aluguel,
-        "ALUGUEL_TEMPORADA": properties_temporada
+async def get_dashboard_stats(fresh: bool = False, admin = Depends(get_current_admin)):
+    """
+    Get dashboard statistics (Admin only)
+    Snapshot renovado em segundo plano (as_of = momento do cálculo); ?fresh=1 recalcula agora.
+    """
+    return DashboardStats(**await get_dashboard_snapshot(fresh=fresh))
+
+@router.get("/metrics")
+async def get_runtime_metrics(admin = Depends(get_current_admin)):
+    """Métricas do worker atual (pool de bcrypt, consultas de usuário, tokens)"""
+    return {
+        "password_hashing": password_hash_pool.stats(),
+        "user_lookups": user_lookup_stats(),
+        "token_versions": token_versions.stats(),
+        "token_cache": token_cache.stats(),
+        "revoked_sessions": revoked_sessions.stats()
     }
-    
-    # Recent registrations (last 7 days)
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
-    recent_users = await db.users.find(
-        {"created_at": {"$gte": seven_days_ago}, "user_type": {"$ne": "admin"}}
-    ).sort("created_at", -1).limit(5).to_list(5)
-    
-    recent_registrations = [
-        {
-            "name": user['name'],
-            "email": user['email'],
-            "type": user['user_type'],
-            "date": user['created_at'].strftime("%d/%m/%Y")
-        }
-        for user in recent_users
-    ]
-    
-    # Properties by city (top 5)
-    pipeline = [
-        {"$group": {"_id": "$city", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}},
-        {"$limit": 5}
-    ]
-    cities = await db.properties.aggregate(pipeline).to_list(5)
-    properties_by_city = {city['_id']: city['count'] for city in cities}
-    
-    return DashboardStats(
-        total_properties=total_properties,
-        total_users=total_users,
-        total_services=total_services,
-        pending_users=pending_users,
-        active_users=active_users,
-        paused_users=paused_users,
-        properties_by_purpose=properties_by_purpose,
-        recent_registrations=recent_registrations,
-        properties_by_city=properties_by_city
-    )
 
 # =============================================
 # USER MANAGEMENT ROUTES
 # =============================================
 
+DUPLICATE_MESSAGES = {
+    "email": "Email já cadastrado",
+    "cpf": "CPF já cadastrado",
+    "cnpj": "CNPJ já cadastrado",
+}
+
+
+def duplicate_user_error(error: DuplicateKeyError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=DUPLICATE_MESSAGES.get(duplicate_key_field(error), "Usuário já cadastrado")
+    )
+
+
+# Campos copiados para o JWT: se mudarem, os tokens emitidos são revogados
+TOKEN_CLAIM_FIELDS = ("email", "user_type", "status")
+
+
+def claims_changed(user: dict, update_data: dict) -> bool:
+    return any(
+        field in update_data and update_data[field] != user.get(field)
+        for field in TOKEN_CLAIM_FIELDS
+    )
+
 @router.post("/users", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def create_user(user_data: UserCreate, admin = Depends(get_current_admin_senior)):
     """Create a new user (Admin only)"""
     
-    # Check if email already exists
-    existing_user = await db.users.find_one({"email": user_data.email})
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email já cadastrado"
-        )
-    
     # Validate user_type
     if user_data.user_type not in ['particular', 'corretor', 'imobiliaria', 'admin_senior']:
         raise HTTPException(
@@ -183,11 +185,16 @@ async def create_user(user_data: UserCreate, admin = Depends(get_current_admin_s
         'plan_type': user_data.plan_type,
         'plan_expires_at': None if user_data.plan_type == 'lifetime' else None,
         'status': 'active',  # New users created by admin are active by default
-        'hashed_password': pwd_context.hash(user_data.password),
+        'hashed_password': await get_password_hash_async(user_data.password),
         'created_at': datetime.utcnow()
     }
+    new_user.update(search_fields(new_user))
     
-    await db.users.insert_one(new_user)
+    # Email/CPF/CNPJ duplicados caem no índice único
+    try:
+        await db.users.insert_one(new_user)
+    except DuplicateKeyError as e:
+        raise duplicate_user_error(e)
     
     return UserResponse(
         id=user_id,
@@ -218,54 +225,61 @@ async def get_all_users(
     if user_type:
         match_query["user_type"] = user_type
     
-    # Use aggregation pipeline to avoid N+1 queries
-    pipeline = [
-        {"$match": match_query},
-        {"$sort": {"created_at": -1}},
-        {"$skip": skip},
-        {"$limit": limit},
-        {
-            "$lookup": {
-                "from": "properties",
-                "localField": "id",
-                "foreignField": "owner_id",
-                "as": "properties"
-            }
-        },
-        {
-            "$addFields": {
-                "properties_count": {"$size": "$properties"}
-            }
-        },
-        {
-            "$project": {
-                "properties": 0,
-                "hashed_password": 0,
-                "_id": 0
-            }
-        }
-    ]
+    # properties_count é mantido no próprio usuário (user_counters.py)
+    users = await db.users.find(
+        match_query, {"_id": 0, "hashed_password": 0}
+    ).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
     
-    users = await db.users.aggregate(pipeline).to_list(limit)
-    
-    users_response = [
-        UserResponse(
-            id=user['id'],
-            name=user['name'],
-            email=user['email'],
-            phone=user['phone'],
-            city=user['city'],
-            state=user['state'],
-            user_type=user['user_type'],
-            status=user.get('status', 'active'),
-            created_at=user['created_at'],
-            properties_count=user.get('properties_count', 0)
-        )
-        for user in users
-    ]
+    users_response = [user_response(user) for user in users]
     
     return users_response
 
+
+def user_response(user: dict) -> UserResponse:
+    return UserResponse(
+        id=user['id'],
+        name=user['name'],
+        email=user['email'],
+        phone=user['phone'],
+        city=user['city'],
+        state=user['state'],
+        user_type=user['user_type'],
+        status=user.get('status', 'active'),
+        created_at=user['created_at'],
+        properties_count=user_counters.counter(user, 'properties_count')
+    )
+
+
+@router.get("/users/search", response_model=UserSearchResponse)
+async def search_users_admin(
+    q: str,
+    limit: int = Query(20, ge=1, le=SEARCH_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    admin = Depends(get_current_admin_senior)
+):
+    """
+    Busca por nome, email, telefone, CPF/CNPJ ou CRECI (Admin only)
+    Exatos primeiro, depois por prefixo; próxima página com ?cursor=next_cursor.
+    Termos completos respondem pelo índice; prefixos curtos e comuns são mais lentos
+    (ordenados em memória entre todos os usuários que casam).
+    """
+    if len(q.strip()) < SEARCH_MIN_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Informe ao menos {SEARCH_MIN_LENGTH} caracteres"
+        )
+    try:
+        page = await search_users(q, limit=limit, cursor=cursor)
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido"
+        )
+    return UserSearchResponse(
+        results=[user_response(user) for user in page['results']],
+        next_cursor=page['next_cursor']
+    )
+
 @router.put("/users/{user_id}")
 async def update_user_status(
     user_id: str,
@@ -287,6 +301,12 @@ async def update_user_status(
             detail="Cannot modify admin users"
         )
     
+    if user.get('status') == DELETING_STATUS:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Usuário em exclusão"
+        )
+    
     update_data = {}
     if user_update.status:
         update_data['status'] = user_update.status
@@ -294,10 +314,57 @@ async def update_user_status(
         update_data['user_type'] = user_update.user_type
     
     await db.users.update_one({"id": user_id}, {"$set": update_data})
+    if claims_changed(user, update_data):
+        await revoke_user_tokens(user_id, email=user['email'])
+    else:
+        invalidate_user(user_id=user_id)
     
     return {"message": "User updated successfully", "user_id": user_id}
 
 
+def check_bulk_ids(ids: List[str]):
+    if not ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Informe ao menos um id"
+        )
+    if len(ids) > admin_bulk.BULK_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Máximo de {admin_bulk.BULK_MAX_IDS} ids por operação"
+        )
+
+
+@router.post("/users/bulk-status")
+async def bulk_update_user_status(
+    bulk_update: BulkUserStatusUpdate,
+    admin = Depends(get_current_admin_senior)
+):
+    """Ativa/pausa vários usuários de uma vez; resultado por id (Admin only)"""
+    check_bulk_ids(bulk_update.user_ids)
+    if bulk_update.status not in admin_bulk.BULK_USER_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Status inválido"
+        )
+    return await admin_bulk.bulk_set_user_status(bulk_update.user_ids, bulk_update.status)
+
+
+@router.post("/users/bulk-plan")
+async def bulk_update_user_plan(
+    bulk_update: BulkPlanUpdate,
+    admin = Depends(get_current_admin_senior)
+):
+    """Troca o plano de vários usuários de uma vez; resultado por id (Admin only)"""
+    check_bulk_ids(bulk_update.user_ids)
+    if bulk_update.plan_type not in admin_bulk.PLAN_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Plano inválido"
+        )
+    return await admin_bulk.bulk_set_plan(bulk_update.user_ids, bulk_update.plan_type)
+
+
 @router.put("/users/{user_id}/full-edit")
 async def full_edit_user(
     user_id: str,
@@ -319,19 +386,18 @@ async def full_edit_user(
             detail="Cannot modify other admin users"
         )
     
+    if user.get('status') == DELETING_STATUS:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Usuário em exclusão"
+        )
+    
     update_data = {}
     
     # Update basic fields
     if user_update.name:
         update_data['name'] = user_update.name
     if user_update.email:
-        # Check if email is already taken by another user
-        existing = await db.users.find_one({"email": user_update.email, "id": {"$ne": user_id}})
-        if existing:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email já está em uso por outro usuário"
-            )
         update_data['email'] = user_update.email
     if user_update.phone:
         update_data['phone'] = user_update.phone
@@ -378,13 +444,26 @@ async def full_edit_user(
     
     # Update password if provided
     if user_update.new_password:
-        update_data['hashed_password'] = pwd_context.hash(user_update.new_password)
+        update_data['hashed_password'] = await get_password_hash_async(user_update.new_password)
     
     # Add updated_at timestamp
     update_data['updated_at'] = datetime.utcnow()
+    update_data.update(search_fields({**user, **update_data}))
     
-    # Perform update
-    await db.users.update_one({"id": user_id}, {"$set": update_data})
+    # Perform update (email/CPF/CNPJ em uso por outro usuário caem no índice único)
+    try:
+        await db.users.update_one({"id": user_id}, {"$set": update_data})
+    except DuplicateKeyError as e:
+        if duplicate_key_field(e) == "email":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email já está em uso por outro usuário"
+            )
+        raise duplicate_user_error(e)
+    if claims_changed(user, update_data) or 'hashed_password' in update_data:
+        await revoke_user_tokens(user_id, email=user['email'])
+    else:
+        invalidate_user(user_id=user_id)
     
     # Get updated user
     updated_user = await db.users.find_one({"id": user_id})
@@ -419,183 +498,54 @@ async def get_user_details(
             detail="User not found"
         )
     
-    # Count user's properties
-    properties_count = await db.properties.count_documents({"owner_id": user_id})
-    
     # Remove sensitive data
     user_data = {k: v for k, v in user.items() if k not in ['_id', 'hashed_password']}
-    user_data['properties_count'] = properties_count
+    user_data['properties_count'] = user_counters.counter(user, 'properties_count')
     
     return user_data
 
 
+@router.get("/analytics/timeseries")
+async def get_analytics_timeseries(
+    metric: str,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    group_by: Optional[str] = None,
+    admin = Depends(get_current_admin)
+):
+    """
+    Série diária de signups, listings, visits ou leads (padrão: últimos 30 dias)
+    Lida dos rollups diários (ver analytics_rollups.py); group_by: city, user_type ou purpose.
+    """
+    if metric not in METRICS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Métrica inválida. Use: {', '.join(METRICS)}"
+        )
+    if group_by is not None and group_by not in GROUP_BY_FIELDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"group_by inválido. Use: {', '.join(GROUP_BY_FIELDS)}"
+        )
+    
+    to_date = to_date or datetime.utcnow().date()
+    from_date = from_date or to_date - timedelta(days=29)
+    if from_date > to_date or (to_date - from_date).days >= MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Período inválido (máximo de {MAX_RANGE_DAYS} dias)"
+        )
+    
+    return await timeseries(metric, from_date, to_date, group_by)
+
 @router.get("/opportunities-board")
-async def get_opportunities_board(admin = Depends(get_current_admin)):
+async def get_opportunities_board(fresh: bool = False, admin = Depends(get_current_admin)):
     """
     Mural de Oportunidades - Relatório completo de demandas e propostas
     Exibe dados sobre parcerias realizadas e não realizadas
+    Documento materializado mantido pelas rotas do mural; ?fresh=1 recalcula agora.
     """
-    # Estatísticas de Demandas
-    total_demands = await db.demands.count_documents({})
-    active_demands = await db.demands.count_documents({"status": "active"})
-    fulfilled_demands = await db.demands.count_documents({"status": "fulfilled"})
-    cancelled_demands = await db.demands.count_documents({"status": "cancelled"})
-    
-    # Estatísticas de Propostas
-    total_proposals = await db.proposals.count_documents({})
-    pending_proposals = await db.proposals.count_documents({"status": "pending"})
-    accepted_proposals = await db.proposals.count_documents({"status": "accepted"})
-    rejected_proposals = await db.proposals.count_documents({"status": "rejected"})
-    
-    # Taxa de Conversão
-    conversion_rate = (accepted_proposals / total_proposals * 100) if total_proposals > 0 else 0
-    
-    # Demandas mais recentes (últimas 10)
-    recent_demands = await db.demands.find({}).sort("created_at", -1).limit(10).to_list(10)
-    
-    # Propostas mais recentes (últimas 10)
-    recent_proposals = await db.proposals.find({}).sort("created_at", -1).limit(10).to_list(10)
-    
-    # Usuários mais ativos (com mais demandas)
-    active_users_pipeline = [
-        {"$group": {"_id": "$corretor_email", "demand_count": {"$sum": 1}}},
-        {"$sort": {"demand_count": -1}},
-        {"$limit": 5},
-        {
-            "$lookup": {
-                "from": "users",
-                "localField": "_id",
-                "foreignField": "email",
-                "as": "user_info"
-            }
-        },
-        {"$unwind": "$user_info"},
-        {
-            "$project": {
-                "email": "$_id",
-                "name": "$user_info.name",
-                "demand_count": 1,
-                "_id": 0
-            }
-        }
-    ]
-    active_users = await db.demands.aggregate(active_users_pipeline).to_list(5)
-    
-    # Parcerias realizadas (demandas + propostas aceitas)
-    partnerships_pipeline = [
-        {
-            "$match": {"status": "accepted"}
-        },
-        {
-            "$lookup": {
-                "from": "demands",
-                "localField": "demand_id",
-                "foreignField": "id",
-                "as": "demand"
-            }
-        },
-        {"$unwind": "$demand"},
-        {
-            "$lookup": {
-                "from": "users",
-                "localField": "corretor_email",
-                "foreignField": "email",
-                "as": "proposer"
-            }
-        },
-        {"$unwind": "$proposer"},
-        {
-            "$lookup": {
-                "from": "users",
-                "localField": "demand.corretor_email",
-                "foreignField": "email",
-                "as": "demander"
-            }
-        },
-        {"$unwind": "$demander"},
-        {"$sort": {"created_at": -1}},
-        {"$limit": 10},
-        {
-            "$project": {
-                "_id": 0,
-                "proposal_id": "$id",
-                "demand_title": "$demand.titulo",
-                "property_type": "$demand.tipo_imovel",
-                "proposer_name": "$proposer.name",
-                "proposer_email": "$proposer.email",
-                "demander_name": "$demander.name",
-                "demander_email": "$demander.email",
-                "created_at": 1,
-                "message": 1
-            }
-        }
-    ]
-    partnerships = await db.proposals.aggregate(partnerships_pipeline).to_list(10)
-    
-    # Demandas por tipo de imóvel
-    demands_by_type_pipeline = [
-        {"$group": {"_id": "$tipo_imovel", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ]
-    demands_by_type = await db.demands.aggregate(demands_by_type_pipeline).to_list(20)
-    
-    # Demandas por cidade
-    demands_by_city_pipeline = [
-        {"$group": {"_id": "$cidade", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}},
-        {"$limit": 5}
-    ]
-    demands_by_city = await db.demands.aggregate(demands_by_city_pipeline).to_list(5)
-    
-    return {
-        "statistics": {
-            "demands": {
-                "total": total_demands,
-                "active": active_demands,
-                "fulfilled": fulfilled_demands,
-                "cancelled": cancelled_demands
-            },
-            "proposals": {
-                "total": total_proposals,
-                "pending": pending_proposals,
-                "accepted": accepted_proposals,
-                "rejected": rejected_proposals
-            },
-            "conversion_rate": round(conversion_rate, 2)
-        },
-        "recent_demands": [
-            {
-                "id": d.get("id"),
-                "title": d.get("titulo"),
-                "property_type": d.get("tipo_imovel"),
-                "city": d.get("cidade"),
-                "status": d.get("status"),
-                "created_at": d.get("created_at").isoformat() if d.get("created_at") else None,
-                "corretor_email": d.get("corretor_email")
-            }
-            for d in recent_demands
-        ],
-        "recent_proposals": [
-            {
-                "id": p.get("id"),
-                "demand_id": p.get("demand_id"),
-                "status": p.get("status"),
-                "created_at": p.get("created_at").isoformat() if p.get("created_at") else None,
-                "corretor_email": p.get("corretor_email")
-            }
-            for p in recent_proposals
-        ],
-        "active_users": active_users,
-        "partnerships": partnerships,
-        "demands_by_type": [
-            {"type": item["_id"], "count": item["count"]}
-            for item in demands_by_type
-        ],
-        "demands_by_city": [
-            {"city": item["_id"], "count": item["count"]}
-            for item in demands_by_city
-        ]
-    }
+    return await get_board_stats(fresh=fresh)
 
 @router.get("/users/{user_id}/details")
 async def get_user_details(
@@ -611,21 +561,22 @@ async def get_user_details(
             detail="User not found"
         )
     
-    # Count user's properties
-    properties_count = await db.properties.count_documents({"owner_id": user_id})
-    
     # Remove sensitive data
     user_data = {k: v for k, v in user.items() if k not in ['_id', 'hashed_password']}
-    user_data['properties_count'] = properties_count
+    user_data['properties_count'] = user_counters.counter(user, 'properties_count')
     
     return user_data
 
-@router.delete("/users/{user_id}")
+@router.delete("/users/{user_id}", status_code=status.HTTP_202_ACCEPTED)
 async def delete_user(
     user_id: str,
     admin = Depends(get_current_admin_senior)
 ):
-    """Delete user and all their data (Admin only)"""
+    """
+    Delete user and all their data (Admin only)
+    Marca o usuário como `deleting` e enfileira a limpeza (ver user_deletion.py);
+    o progresso fica em GET /users/{user_id}/deletion. Repetir a chamada é seguro.
+    """
     user = await db.users.find_one({"id": user_id})
     
     if not user:
@@ -640,16 +591,27 @@ async def delete_user(
             detail="Cannot delete admin users"
         )
     
-    # Delete user's properties
-    await db.properties.delete_many({"owner_id": user_id})
-    
-    # Delete user's service providers
-    await db.service_providers.delete_many({"owner_id": user_id})
-    
-    # Delete user
-    await db.users.delete_one({"id": user_id})
+    if user.get('status') != DELETING_STATUS:
+        await db.users.update_one({"id": user_id}, {"$set": {"status": DELETING_STATUS}})
+        await revoke_user_tokens(user_id, email=user['email'])
+    job = await enqueue_user_deletion(user, requested_by=admin['email'])
     
-    return {"message": "User and all associated data deleted successfully", "user_id": user_id}
+    return {"message": "User deletion started", "user_id": user_id, "job": job}
+
+
+@router.get("/users/{user_id}/deletion")
+async def get_user_deletion(
+    user_id: str,
+    admin = Depends(get_current_admin_senior)
+):
+    """Progresso da exclusão do usuário (Admin only)"""
+    job = await get_user_deletion_job(user_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deletion job not found"
+        )
+    return job
 
 @router.get("/properties")
 async def get_all_properties(
@@ -687,22 +649,86 @@ async def get_all_properties(
     properties = await db.properties.aggregate(pipeline).to_list(limit)
     return properties
 
+@router.get("/export/{entity}.{file_format}")
+async def export_entity(
+    entity: str,
+    file_format: str,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    user_type: Optional[str] = None,
+    purpose: Optional[str] = None,
+    city: Optional[str] = None,
+    owner_id: Optional[str] = None,
+    admin = Depends(get_current_admin_senior)
+):
+    """
+    Export users, properties, visits or leads as CSV/XLSX (Admin only)
+    Gerado em fluxo a partir do cursor (ver exports.py); aceita os mesmos filtros das listagens.
+    """
+    spec = EXPORTS.get(entity)
+    if not spec or file_format not in ("csv", "xlsx"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Exportação não encontrada. Use {{{', '.join(EXPORTS)}}}.csv ou .xlsx"
+        )
+    
+    filters = {
+        name: value for name, value in {
+            "status": status_filter, "user_type": user_type, "purpose": purpose,
+            "city": city, "owner_id": owner_id,
+        }.items() if value is not None
+    }
+    unsupported = sorted(set(filters) - set(spec.filters))
+    if unsupported:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Filtro não suportado para {entity}: {', '.join(unsupported)}"
+        )
+    
+    filename = f"{entity}-{datetime.utcnow().strftime('%Y%m%d-%H%M')}.{file_format}"
+    if file_format == "csv":
+        body, media_type = csv_stream(spec, filters), CSV_MEDIA_TYPE
+    else:
+        body, media_type = xlsx_stream(spec, filters, sheet_name=entity), XLSX_MEDIA_TYPE
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @router.delete("/properties/{property_id}")
 async def delete_property_admin(
     property_id: str,
     admin = Depends(get_current_admin_senior)
 ):
     """Delete any property (Admin only)"""
-    result = await db.properties.delete_one({"id": property_id})
+    # Imóvel reservado por uma exclusão em massa (admin_bulk.py) é removido por ela
+    deleted = await db.properties.find_one_and_delete(
+        {"id": property_id, "deleting_until": {"$not": {"$gt": datetime.utcnow()}}},
+        {"_id": 0, "images": 1, "owner_id": 1, "is_featured": 1}
+    )
     
-    if result.deleted_count == 0:
+    if deleted is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Property not found"
         )
     
+    await user_counters.increment(
+        deleted.get('owner_id'), properties_count=-1, featured_count=-int(bool(deleted.get('is_featured')))
+    )
+    await release_images(deleted.get('images'))
+    
     return {"message": "Property deleted successfully", "property_id": property_id}
 
+@router.post("/properties/bulk-delete")
+async def bulk_delete_properties_admin(
+    bulk_delete: BulkPropertyDelete,
+    admin = Depends(get_current_admin_senior)
+):
+    """Exclui vários imóveis de uma vez; resultado por id (Admin only)"""
+    check_bulk_ids(bulk_delete.property_ids)
+    return await admin_bulk.bulk_delete_properties(bulk_delete.property_ids)
+
 @router.delete("/services/{service_id}")
 async def delete_service_admin(
     service_id: str,
@@ -1,23 +1,25 @@
-from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File, Form
-from models import UserCreate, UserLogin, User, Token, UserInDB, PlanType
-from auth import get_password_hash, verify_password, create_access_token, get_current_user_email
-from database import users_collection, properties_collection
+from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File, Form, Request
+from models import UserCreate, UserLogin, User, Token, UserInDB, PlanType, RefreshRequest
+from auth import get_password_hash_async, verify_password_async, create_access_token, get_token_claims
+from auth_sessions import ACCESS_TOKEN_EXPIRE_MINUTES, create_session, revoke_session, rotate_session
+from current_user import get_current_user, invalidate_user, revoke_user_tokens
+from token_versions import token_versions
+from user_search import search_fields
+from database import users_collection, duplicate_key_field
+from pymongo.errors import DuplicateKeyError
+import user_counters
 from datetime import datetime
 from pydantic import BaseModel
 from typing import Optional
 import uuid
 import logging
-import os
-import aiofiles
+from media_store import store_image, release_images
+from pymongo import ReturnDocument
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
-# Directory for profile photos
-UPLOAD_DIR = "uploads/profiles"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
 # Pydantic models for profile updates
 class ProfileUpdate(BaseModel):
     name: Optional[str] = None
@@ -35,25 +37,27 @@ class PasswordChange(BaseModel):
     new_password: str
     confirm_password: str
 
+
+DUPLICATE_MESSAGES = {
+    "email": "Email already registered",
+    "cpf": "CPF already registered",
+    "cnpj": "CNPJ already registered",
+}
+
+
+async def issue_tokens(user: dict, request: Request) -> dict:
+    """Abre uma sessão: access token curto + refresh token"""
+    session, refresh_token = await create_session(user['id'], request.headers.get("user-agent"))
+    await token_versions.load(user['id'])
+    return {
+        "access_token": create_access_token(user, session_id=session['id']),
+        "refresh_token": refresh_token,
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
-async def register(user: UserCreate):
+async def register(user: UserCreate, request: Request):
     """Register a new user"""
-    # Check if user already exists
-    existing_user = await users_collection.find_one({"email": user.email})
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
-    # Check if CPF already exists
-    existing_cpf = await users_collection.find_one({"cpf": user.cpf})
-    if existing_cpf:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="CPF already registered"
-        )
-    
     # Validação para Corretor (CRECI obrigatório)
     if user.user_type == "corretor":
         if not user.creci:
@@ -69,48 +73,47 @@ async def register(user: UserCreate):
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="CRECI é obrigatório para Imobiliárias"
             )
-        # Se informar CNPJ, verificar se já existe
-        if user.cnpj:
-            existing_cnpj = await users_collection.find_one({"cnpj": user.cnpj})
-            if existing_cnpj:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="CNPJ already registered"
-                )
     
     # Create user document
     user_dict = user.model_dump(exclude={'password'})
     user_dict['id'] = str(uuid.uuid4())
-    user_dict['hashed_password'] = get_password_hash(user.password)
+    user_dict['hashed_password'] = await get_password_hash_async(user.password)
     user_dict['created_at'] = datetime.utcnow()
+    user_dict.update(search_fields(user_dict))
     
     # Set default plan (free for new users)
     if 'plan_type' not in user_dict or user_dict['plan_type'] is None:
         user_dict['plan_type'] = PlanType.free.value
     
-    # Insert into database
-    await users_collection.insert_one(user_dict)
+    # Insert into database (uma ida ao banco; duplicados caem no índice único)
+    try:
+        await users_collection.insert_one(user_dict)
+    except DuplicateKeyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=DUPLICATE_MESSAGES.get(duplicate_key_field(e), "User already registered")
+        )
     
-    # Create access token
-    access_token = create_access_token(data={"sub": user.email})
+    # Create access and refresh tokens
+    tokens = await issue_tokens(user_dict, request)
     
     # Return user and token
     user_response = User(**{k: v for k, v in user_dict.items() if k != 'hashed_password'})
     
     return Token(
-        access_token=access_token,
         token_type="bearer",
-        user=user_response
+        user=user_response,
+        **tokens
     )
 
 @router.post("/login", response_model=Token)
-async def login(credentials: UserLogin):
+async def login(credentials: UserLogin, request: Request):
     """Login user"""
     logger.info(f"Login attempt for: {credentials.email}")
     
     # Find user by email
     user = await users_collection.find_one({"email": credentials.email})
-    if not user:
+    if not user or user.get('status') == 'deleting':
         logger.warning(f"User not found: {credentials.email}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -136,7 +139,7 @@ async def login(credentials: UserLogin):
         )
     
     # Verify password
-    password_valid = verify_password(credentials.password, user['hashed_password'])
+    password_valid = await verify_password_async(credentials.password, user['hashed_password'])
     logger.info(f"Password verification result: {password_valid}")
     
     if not password_valid:
@@ -145,41 +148,63 @@ async def login(credentials: UserLogin):
             detail="Incorrect email or password"
         )
     
-    # Create access token
-    access_token = create_access_token(data={"sub": credentials.email})
+    # Create access and refresh tokens
+    tokens = await issue_tokens(user, request)
     
     # Return user and token
     user_response = User(**{k: v for k, v in user.items() if k != 'hashed_password' and k != '_id'})
     
     return Token(
-        access_token=access_token,
         token_type="bearer",
-        user=user_response
+        user=user_response,
+        **tokens
     )
 
-@router.get("/me", response_model=User)
-async def get_current_user(email: str = Depends(get_current_user_email)):
-    """Get current user information"""
-    user = await users_collection.find_one({"email": email})
-    if not user:
+
+@router.post("/refresh", response_model=Token)
+async def refresh(data: RefreshRequest):
+    """
+    Renovar o access token com o refresh token (que também é trocado)
+    Conta pausada/pendente ou excluída encerra a sessão.
+    """
+    session, refresh_token = await rotate_session(data.refresh_token)
+    user = await users_collection.find_one({"id": session['user_id']}, {"_id": 0})
+    if not user or user.get('status') in ('paused', 'pending', 'deleting'):
+        await revoke_session(session['id'])
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Sessão expirada. Faça login novamente."
         )
     
+    await token_versions.load(user['id'])
+    return Token(
+        access_token=create_access_token(user, session_id=session['id']),
+        refresh_token=refresh_token,
+        expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        token_type="bearer",
+        user=User(**{k: v for k, v in user.items() if k != 'hashed_password'})
+    )
+
+
+@router.post("/logout")
+async def logout(claims: dict = Depends(get_token_claims)):
+    """Encerrar a sessão atual (o refresh token deixa de valer)"""
+    if claims.get('sid'):
+        await revoke_session(claims['sid'])
+    return {"message": "Sessão encerrada"}
+
+@router.get("/me", response_model=User)
+async def get_me(user: dict = Depends(get_current_user)):
+    """Get current user information"""
+    
     return User(**{k: v for k, v in user.items() if k != 'hashed_password' and k != '_id'})
 
 
 
 @router.put("/profile", response_model=User)
-async def update_profile(profile_data: ProfileUpdate, email: str = Depends(get_current_user_email)):
+async def update_profile(profile_data: ProfileUpdate, user: dict = Depends(get_current_user)):
     """Update user profile information"""
-    user = await users_collection.find_one({"email": email})
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
+    email = user["email"]
     
     # Build update document
     update_fields = {}
@@ -207,10 +232,12 @@ async def update_profile(profile_data: ProfileUpdate, email: str = Depends(get_c
     
     if update_fields:
         update_fields['updated_at'] = datetime.utcnow()
+        update_fields.update(search_fields({**user, **update_fields}))
         await users_collection.update_one(
             {"email": email},
             {"$set": update_fields}
         )
+        invalidate_user(email=email)
     
     # Return updated user
     updated_user = await users_collection.find_one({"email": email})
@@ -220,60 +247,28 @@ async def update_profile(profile_data: ProfileUpdate, email: str = Depends(get_c
 @router.post("/profile/photo", response_model=User)
 async def upload_profile_photo(
     photo: UploadFile = File(...),
-    email: str = Depends(get_current_user_email)
+    user: dict = Depends(get_current_user)
 ):
     """Upload or update profile photo"""
-    user = await users_collection.find_one({"email": email})
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
-    # Validate file type
-    allowed_types = ["image/jpeg", "image/png", "image/webp", "image/gif"]
-    if photo.content_type not in allowed_types:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Tipo de arquivo não permitido. Use JPEG, PNG, WebP ou GIF."
-        )
-    
-    # Validate file size (max 5MB)
-    contents = await photo.read()
-    if len(contents) > 5 * 1024 * 1024:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Arquivo muito grande. O tamanho máximo é 5MB."
-        )
+    email = user["email"]
     
-    # Generate unique filename
-    file_extension = photo.filename.split('.')[-1] if '.' in photo.filename else 'jpg'
-    filename = f"{user['id']}_{uuid.uuid4().hex[:8]}.{file_extension}"
-    filepath = os.path.join(UPLOAD_DIR, filename)
-    
-    # Delete old photo if exists
-    old_photo = user.get('profile_photo')
-    if old_photo:
-        old_path = old_photo.replace('/api/', '')
-        if os.path.exists(old_path):
-            try:
-                os.remove(old_path)
-            except Exception as e:
-                logger.warning(f"Could not delete old profile photo: {e}")
-    
-    # Save new photo
-    async with aiofiles.open(filepath, 'wb') as f:
-        await f.write(contents)
+    # Save new photo in the media storage (storage.py) - streamed in chunks (validates type and size - max 5MB)
+    photo_url = await store_image(photo, max_size=5 * 1024 * 1024)
     
     # Update user with new photo URL
-    photo_url = f"/api/{filepath}"
-    await users_collection.update_one(
+    previous = await users_collection.find_one_and_update(
         {"email": email},
         {"$set": {
             "profile_photo": photo_url,
             "updated_at": datetime.utcnow()
-        }}
+        }},
+        projection={"profile_photo": 1},
+        return_document=ReturnDocument.BEFORE
     )
+    invalidate_user(email=email)
+    
+    # Old photo is released; the collector (media_gc.py) deletes the file once unused
+    await release_images([(previous or {}).get('profile_photo')])
     
     # Return updated user
     updated_user = await users_collection.find_one({"email": email})
@@ -281,33 +276,24 @@ async def upload_profile_photo(
 
 
 @router.delete("/profile/photo", response_model=User)
-async def delete_profile_photo(email: str = Depends(get_current_user_email)):
+async def delete_profile_photo(user: dict = Depends(get_current_user)):
     """Delete profile photo"""
-    user = await users_collection.find_one({"email": email})
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
-    # Delete photo file if exists
-    old_photo = user.get('profile_photo')
-    if old_photo:
-        old_path = old_photo.replace('/api/', '')
-        if os.path.exists(old_path):
-            try:
-                os.remove(old_path)
-            except Exception as e:
-                logger.warning(f"Could not delete profile photo: {e}")
+    email = user["email"]
     
     # Update user to remove photo
-    await users_collection.update_one(
+    previous = await users_collection.find_one_and_update(
         {"email": email},
         {"$set": {
             "profile_photo": None,
             "updated_at": datetime.utcnow()
-        }}
+        }},
+        projection={"profile_photo": 1},
+        return_document=ReturnDocument.BEFORE
     )
+    invalidate_user(email=email)
+    
+    # The collector (media_gc.py) deletes the file once unused
+    await release_images([(previous or {}).get('profile_photo')])
     
     # Return updated user
     updated_user = await users_collection.find_one({"email": email})
@@ -317,18 +303,17 @@ async def delete_profile_photo(email: str = Depends(get_current_user_email)):
 @router.post("/change-password")
 async def change_password(
     password_data: PasswordChange,
-    email: str = Depends(get_current_user_email)
+    request: Request,
+    user: dict = Depends(get_current_user)
 ):
     """Change user password"""
-    user = await users_collection.find_one({"email": email})
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
+    email = user["email"]
+    # O usuário da requisição (cache) não traz o hash da senha
+    stored = await users_collection.find_one({"id": user["id"]}, {"_id": 0, "hashed_password": 1})
+    hashed_password = (stored or {}).get('hashed_password', '')
     
     # Verify current password
-    if not verify_password(password_data.current_password, user['hashed_password']):
+    if not await verify_password_async(password_data.current_password, hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Senha atual incorreta."
@@ -349,14 +334,14 @@ async def change_password(
         )
     
     # Check if new password is different from current
-    if verify_password(password_data.new_password, user['hashed_password']):
+    if await verify_password_async(password_data.new_password, hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="A nova senha deve ser diferente da senha atual."
         )
     
     # Update password
-    new_hashed_password = get_password_hash(password_data.new_password)
+    new_hashed_password = await get_password_hash_async(password_data.new_password)
     await users_collection.update_one(
         {"email": email},
         {"$set": {
@@ -364,10 +349,13 @@ async def change_password(
             "updated_at": datetime.utcnow()
         }}
     )
+    # Encerra todas as sessões; esta recebe uma sessão nova
+    await revoke_user_tokens(user['id'], email=email)
+    tokens = await issue_tokens(user, request)
     
     logger.info(f"Password changed successfully for user: {email}")
     
-    return {"message": "Senha alterada com sucesso!"}
+    return {"message": "Senha alterada com sucesso!", **tokens}
 
 
 
@@ -397,8 +385,8 @@ async def get_public_profile(user_id: str):
             detail="Usuário não encontrado"
         )
     
-    # Contar propriedades do usuário
-    properties_count = await properties_collection.count_documents({"owner_id": user_id})
+    # Contador mantido no usuário (user_counters.py)
+    properties_count = user_counters.counter(user, 'properties_count')
     
     # Retornar apenas dados públicos (sem email, cpf, senha, etc.)
     return PublicProfile(
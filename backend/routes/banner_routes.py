@@ -7,10 +7,9 @@ from typing import List, Optional
 from models import Banner, BannerCreate, BannerUpdate, BannerPosition, BannerStatus
 from middlewares.admin_middleware import get_current_admin
 from database import db
+from media_store import store_image, release_images
 from datetime import datetime
 import uuid
-import os
-from pathlib import Path
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,41 +19,11 @@ router = APIRouter(prefix="/banners", tags=["banners"])
 # Collections
 banners_collection = db.banners
 
-# Upload directory for banner images
-UPLOAD_DIR = Path(__file__).parent.parent / "uploads" / "banners"
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
-
-async def save_banner_image(upload_file: UploadFile, banner_id: str) -> str:
-    """Save a banner image and return its URL path"""
-    # Validate file type
-    allowed_types = ["image/jpeg", "image/png", "image/webp", "image/gif"]
-    if upload_file.content_type not in allowed_types:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Tipo de arquivo não permitido. Use JPEG, PNG, WebP ou GIF."
-        )
-    
-    # Generate unique filename
-    file_extension = Path(upload_file.filename).suffix.lower()
-    unique_filename = f"banner_{banner_id}{file_extension}"
-    file_path = UPLOAD_DIR / unique_filename
-    
-    # Save file
-    with open(file_path, "wb") as buffer:
-        content = await upload_file.read()
-        
-        # Validate file size (max 5MB)
-        if len(content) > 5 * 1024 * 1024:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Arquivo muito grande. O tamanho máximo é 5MB."
-            )
-        
-        buffer.write(content)
-    
-    # Return relative path for the API
-    return f"/api/uploads/banners/{unique_filename}"
+async def save_banner_image(upload_file: UploadFile) -> str:
+    """Save a banner image in the media storage (storage.py) and return its URL"""
+    # Streamed in chunks (validates type and size - max 5MB)
+    return await store_image(upload_file, max_size=5 * 1024 * 1024)
 
 
 # ==========================================
@@ -161,7 +130,7 @@ async def create_banner(
     
     # Save image
     try:
-        image_url = await save_banner_image(image, banner_id)
+        image_url = await save_banner_image(image)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -250,15 +219,11 @@ async def update_banner(
     # Update image if provided
     if image and image.filename:
         try:
-            # Delete old image
-            old_image_path = banner["image_url"].replace("/api/", "")
-            old_file = Path(__file__).parent.parent / old_image_path
-            if old_file.exists():
-                old_file.unlink()
-            
-            # Save new image
-            image_url = await save_banner_image(image, banner_id)
+            # Save new image (the old one is released after the update)
+            image_url = await save_banner_image(image)
             update_data["image_url"] = image_url
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error updating banner image: {e}")
             raise HTTPException(
@@ -273,6 +238,8 @@ async def update_banner(
             {"id": banner_id},
             {"$set": update_data}
         )
+        if "image_url" in update_data:
+            await release_images([banner.get("image_url")])
         
         logger.info(f"Banner updated: {banner_id}")
     
@@ -284,25 +251,16 @@ async def update_banner(
 @router.delete("/admin/{banner_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_banner(banner_id: str, admin=Depends(get_current_admin)):
     """Deletar um banner (Admin only)"""
-    # Get banner to delete image file
-    banner = await banners_collection.find_one({"id": banner_id})
+    # Delete banner from database
+    banner = await banners_collection.find_one_and_delete({"id": banner_id}, {"_id": 0, "image_url": 1})
     if not banner:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Banner não encontrado"
         )
     
-    # Delete image file
-    try:
-        image_path = banner["image_url"].replace("/api/", "")
-        file_path = Path(__file__).parent.parent / image_path
-        if file_path.exists():
-            file_path.unlink()
-    except Exception as e:
-        logger.warning(f"Could not delete banner image: {e}")
-    
-    # Delete banner from database
-    await banners_collection.delete_one({"id": banner_id})
+    # Release image; the collector (media_gc.py) deletes the file once unused
+    await release_images([banner.get("image_url")])
     logger.info(f"Banner deleted: {banner_id}")
     
     return None
@@ -2,7 +2,7 @@
 Routes for Partnership Opportunities Board (Mural de Oportunidades)
 Sistema de networking entre corretores - Demandas e Propostas
 """
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, BackgroundTasks
 from typing import List, Optional
 from models import (
     Demand, DemandCreate, DemandUpdate, DemandStatus,
@@ -10,7 +10,11 @@ from models import (
     PropertyType, NotificationType
 )
 from auth import get_current_user_email
+from current_user import get_current_user, get_token_user
 from database import db
+import user_counters
+import board_stats
+from canonical import canonicalize_neighborhoods, resolve_neighborhood_id
 from datetime import datetime
 import uuid
 import logging
@@ -26,6 +30,9 @@ properties_collection = db.properties
 users_collection = db.users
 notifications_collection = db.notifications
 
+# Teto de proprietários notificados por demanda
+MATCHMAKING_MAX_OWNERS = 100
+
 
 async def create_notification(user_email: str, notification_type: str, title: str, message: str, data: dict = None):
     """Helper function to create notifications"""
@@ -47,12 +54,13 @@ async def create_notification(user_email: str, notification_type: str, title: st
         "created_at": datetime.utcnow()
     }
     await notifications_collection.insert_one(notification)
+    await user_counters.increment(user["id"], unread_notifications=1)
     logger.info(f"Notification created for user {user_email}: {title}")
 
 
-async def find_compatible_properties(demand_dict: dict) -> List[dict]:
+def compatible_properties_query(demand_dict: dict) -> dict:
     """
-    Sistema de Matchmaking: Encontra imóveis compatíveis com a demanda
+    Sistema de Matchmaking: filtro dos imóveis compatíveis com a demanda
     """
     query = {
         "property_type": demand_dict["tipo_imovel"],
@@ -60,9 +68,18 @@ async def find_compatible_properties(demand_dict: dict) -> List[dict]:
             "$gte": demand_dict["valor_minimo"],
             "$lte": demand_dict["valor_maximo"]
         },
-        "neighborhood": {"$in": demand_dict["bairros_interesse"]}
     }
     
+    # Comparar pelo bairro canônico (demandas antigas sem ids usam o nome); imóveis
+    # ainda sem neighborhood_id (antes do canonicalize_existing_data.py) casam pelo nome
+    if demand_dict.get("bairros_interesse_ids"):
+        query["$or"] = [
+            {"neighborhood_id": {"$in": demand_dict["bairros_interesse_ids"]}},
+            {"neighborhood": {"$in": demand_dict["bairros_interesse"]}, "neighborhood_id": None},
+        ]
+    else:
+        query["neighborhood"] = {"$in": demand_dict["bairros_interesse"]}
+    
     # Adicionar filtro de cidade se disponível
     if demand_dict.get("cidade"):
         query["city"] = demand_dict["cidade"]
@@ -77,8 +94,62 @@ async def find_compatible_properties(demand_dict: dict) -> List[dict]:
     if demand_dict.get("area_util_min"):
         query["area"] = {"$gte": demand_dict["area_util_min"]}
     
-    compatible_properties = await properties_collection.find(query).to_list(100)
-    return compatible_properties
+    return query
+
+
+async def find_compatible_owners(demand_dict: dict) -> List[dict]:
+    """Proprietários com imóveis compatíveis (um imóvel por dono), sem carregar os imóveis"""
+    query = compatible_properties_query(demand_dict)
+    query["owner_id"] = {"$nin": [None, demand_dict["corretor_id"]]}
+    pipeline = [
+        {"$match": query},
+        {"$group": {"_id": "$owner_id", "property_id": {"$first": "$id"}, "title": {"$first": "$title"}}},
+        {"$limit": MATCHMAKING_MAX_OWNERS},
+    ]
+    return await properties_collection.aggregate(pipeline).to_list(MATCHMAKING_MAX_OWNERS)
+
+
+async def notify_compatible_owners(demand_dict: dict):
+    """
+    Notifica os proprietários de imóveis compatíveis (executado em background após a
+    criação da demanda): donos numa consulta $in, notificações num insert_many
+    """
+    demand_id = demand_dict["id"]
+    try:
+        matches = await find_compatible_owners(demand_dict)
+        owners = {
+            owner["id"]: owner
+            async for owner in users_collection.find(
+                {"id": {"$in": [match["_id"] for match in matches]}}, {"_id": 0, "id": 1, "email": 1}
+            )
+        }
+        now = datetime.utcnow()
+        notifications = [
+            {
+                "id": str(uuid.uuid4()),
+                "user_id": match["_id"],
+                "user_email": owners[match["_id"]]["email"],
+                "type": NotificationType.opportunity.value,
+                "title": "🎯 Nova Oportunidade de Parceria!",
+                "message": f"Seu imóvel '{match.get('title')}' é compatível com uma nova demanda no Mural de Oportunidades! Comissão oferecida: {demand_dict['comissao_parceiro']}%",
+                "data": {
+                    "demand_id": demand_id,
+                    "property_id": match.get("property_id"),
+                    "comissao": demand_dict["comissao_parceiro"]
+                },
+                "read": False,
+                "created_at": now
+            }
+            for match in matches if match["_id"] in owners
+        ]
+        if notifications:
+            await notifications_collection.insert_many(notifications)
+            await user_counters.increment_many(
+                [notification["user_id"] for notification in notifications], unread_notifications=1
+            )
+        logger.info(f"Notified {len(notifications)} users about new demand {demand_id}")
+    except Exception as e:
+        logger.error(f"Error in matchmaking: {e}")
 
 
 # ==========================================
@@ -88,16 +159,13 @@ async def find_compatible_properties(demand_dict: dict) -> List[dict]:
 @router.post("/", response_model=Demand, status_code=status.HTTP_201_CREATED)
 async def create_demand(
     demand: DemandCreate,
-    current_user_email: str = Depends(get_current_user_email)
+    background_tasks: BackgroundTasks,
+    user: dict = Depends(get_current_user)
 ):
     """
     Criar uma nova demanda no Mural de Oportunidades
     Apenas corretores e imobiliárias podem criar demandas
     """
-    # Get user info
-    user = await users_collection.find_one({"email": current_user_email})
-    if not user:
-        raise HTTPException(status_code=404, detail="Usuário não encontrado")
     
     # Verificar se é corretor ou imobiliária
     if user["user_type"] not in ["corretor", "imobiliaria"]:
@@ -116,6 +184,11 @@ async def create_demand(
     # Create demand document
     demand_id = str(uuid.uuid4())
     demand_dict = demand.dict()
+    
+    # Bairros canônicos
+    bairros = await canonicalize_neighborhoods(demand.bairros_interesse, demand.cidade)
+    demand_dict["bairros_interesse"] = [b["name"] for b in bairros]
+    demand_dict["bairros_interesse_ids"] = [b["id"] for b in bairros]
     demand_dict.update({
         "id": demand_id,
         "corretor_id": user["id"],
@@ -130,37 +203,13 @@ async def create_demand(
     })
     
     await demands_collection.insert_one(demand_dict)
-    logger.info(f"Demand created: {demand_id} by {current_user_email}")
+    await user_counters.increment(user["id"], active_demands=1)
+    await board_stats.demand_created(demand_dict, user)
+    logger.info(f"Demand created: {demand_id} by {user['email']}")
     
-    # MATCHMAKING: Buscar imóveis compatíveis e notificar proprietários
-    try:
-        compatible_properties = await find_compatible_properties(demand_dict)
-        
-        # Notificar proprietários que têm imóveis compatíveis
-        notified_users = set()  # Evitar duplicatas
-        for property_doc in compatible_properties:
-            owner_id = property_doc.get("owner_id")
-            if owner_id and owner_id not in notified_users and owner_id != user["id"]:
-                # Buscar dados do proprietário
-                owner = await users_collection.find_one({"id": owner_id})
-                if owner:
-                    await create_notification(
-                        user_email=owner["email"],
-                        notification_type=NotificationType.opportunity.value,
-                        title="🎯 Nova Oportunidade de Parceria!",
-                        message=f"Seu imóvel '{property_doc['title']}' é compatível com uma nova demanda no Mural de Oportunidades! Comissão oferecida: {demand_dict['comissao_parceiro']}%",
-                        data={
-                            "demand_id": demand_id,
-                            "property_id": property_doc["id"],
-                            "comissao": demand_dict["comissao_parceiro"]
-                        }
-                    )
-                    notified_users.add(owner_id)
-        
-        logger.info(f"Notified {len(notified_users)} users about new demand {demand_id}")
-    except Exception as e:
-        logger.error(f"Error in matchmaking: {e}")
-        # Não falha a criação da demanda se o matchmaking falhar
+    # MATCHMAKING: notificar proprietários de imóveis compatíveis depois da resposta
+    # (falhas são só registradas; a demanda já foi criada)
+    background_tasks.add_task(notify_compatible_owners, demand_dict)
     
     return Demand(**{k: v for k, v in demand_dict.items() if k != '_id'})
 
@@ -176,14 +225,13 @@ async def list_demands(
     status: Optional[str] = "active",
     skip: int = 0,
     limit: int = 50,
-    current_user_email: str = Depends(get_current_user_email)
+    user: dict = Depends(get_token_user)
 ):
     """
     Listar demandas do Mural de Oportunidades com filtros
     Apenas corretores e imobiliárias podem ver
     """
     # Verificar permissão
-    user = await users_collection.find_one({"email": current_user_email})
     if user["user_type"] not in ["corretor", "imobiliaria"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -201,7 +249,11 @@ async def list_demands(
     if tipo_imovel:
         query["tipo_imovel"] = tipo_imovel
     if bairro:
-        query["bairros_interesse"] = bairro
+        # Demandas antigas ainda sem ids (antes do canonicalize_existing_data.py) casam pelo nome
+        query["$or"] = [
+            {"bairros_interesse_ids": resolve_neighborhood_id(bairro, cidade)},
+            {"bairros_interesse": bairro, "bairros_interesse_ids": {"$exists": False}},
+        ]
     if valor_min is not None:
         query["valor_minimo"] = {"$lte": valor_min}
     if valor_max is not None:
@@ -213,11 +265,9 @@ async def list_demands(
 
 @router.get("/my-demands", response_model=List[Demand])
 async def get_my_demands(
-    current_user_email: str = Depends(get_current_user_email)
+    user: dict = Depends(get_token_user)
 ):
     """Listar minhas próprias demandas"""
-    user = await users_collection.find_one({"email": current_user_email})
-    
     demands = await demands_collection.find({"corretor_id": user["id"]}).sort("created_at", -1).to_list(100)
     return [Demand(**{k: v for k, v in demand.items() if k != '_id'}) for demand in demands]
 
@@ -246,7 +296,7 @@ async def get_demand(
 async def update_demand(
     demand_id: str,
     demand_update: DemandUpdate,
-    current_user_email: str = Depends(get_current_user_email)
+    user: dict = Depends(get_token_user)
 ):
     """Atualizar uma demanda (apenas o criador pode atualizar)"""
     demand = await demands_collection.find_one({"id": demand_id})
@@ -254,7 +304,6 @@ async def update_demand(
         raise HTTPException(status_code=404, detail="Demanda não encontrada")
     
     # Verificar se é o criador
-    user = await users_collection.find_one({"email": current_user_email})
     if demand["corretor_id"] != user["id"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -263,13 +312,32 @@ async def update_demand(
     
     # Build update dict
     update_dict = {k: v for k, v in demand_update.dict(exclude_unset=True).items() if v is not None}
+    
+    # Bairros canônicos (a cidade entra na resolução: mudou a cidade, recalcula os ids)
+    city_changed = update_dict.get("cidade") and update_dict["cidade"] != demand.get("cidade")
+    if update_dict.get("bairros_interesse") or city_changed:
+        bairros = await canonicalize_neighborhoods(
+            update_dict.get("bairros_interesse") or demand.get("bairros_interesse") or [],
+            update_dict.get("cidade") or demand.get("cidade")
+        )
+        update_dict["bairros_interesse"] = [b["name"] for b in bairros]
+        update_dict["bairros_interesse_ids"] = [b["id"] for b in bairros]
+    
     if update_dict:
         update_dict["updated_at"] = datetime.utcnow()
         
-        await demands_collection.update_one(
+        # Documento anterior: status/cidade exatos para os contadores
+        previous = await demands_collection.find_one_and_update(
             {"id": demand_id},
-            {"$set": update_dict}
+            {"$set": update_dict},
+            projection={"_id": 0, "status": 1, "cidade": 1}
         )
+        if previous and "status" in update_dict:
+            await user_counters.increment(
+                user["id"], active_demands=user_counters.demand_status_delta(previous["status"], update_dict["status"])
+            )
+        if previous:
+            await board_stats.demand_updated(demand_id, previous, update_dict)
         logger.info(f"Demand updated: {demand_id}")
     
     updated_demand = await demands_collection.find_one({"id": demand_id})
@@ -279,24 +347,32 @@ async def update_demand(
 @router.delete("/{demand_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_demand(
     demand_id: str,
-    current_user_email: str = Depends(get_current_user_email)
+    user: dict = Depends(get_token_user)
 ):
     """Deletar uma demanda (apenas o criador pode deletar)"""
     demand = await demands_collection.find_one({"id": demand_id})
     if not demand:
         raise HTTPException(status_code=404, detail="Demanda não encontrada")
     
-    user = await users_collection.find_one({"email": current_user_email})
     if demand["corretor_id"] != user["id"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Apenas o criador pode deletar a demanda"
         )
     
-    await demands_collection.delete_one({"id": demand_id})
+    deleted = await demands_collection.find_one_and_delete({"id": demand_id}, {"_id": 0})
+    if deleted:
+        await user_counters.increment(
+            user["id"], active_demands=user_counters.demand_status_delta(deleted["status"], None)
+        )
     
     # Deletar também todas as propostas relacionadas
+    proposal_statuses = {}
+    async for proposal in proposals_collection.find({"demand_id": demand_id}, {"_id": 0, "status": 1}):
+        proposal_statuses[proposal["status"]] = proposal_statuses.get(proposal["status"], 0) + 1
     await proposals_collection.delete_many({"demand_id": demand_id})
+    if deleted:
+        await board_stats.demand_deleted(deleted, proposal_statuses)
     
     logger.info(f"Demand deleted: {demand_id}")
     return None
@@ -310,7 +386,7 @@ async def delete_demand(
 async def create_proposal(
     demand_id: str,
     proposal: ProposalCreate,
-    current_user_email: str = Depends(get_current_user_email)
+    user: dict = Depends(get_current_user)
 ):
     """
     Criar uma proposta para uma demanda
@@ -327,11 +403,6 @@ async def create_proposal(
             detail="Esta demanda não está mais ativa"
         )
     
-    # Get ofertante info
-    user = await users_collection.find_one({"email": current_user_email})
-    if not user:
-        raise HTTPException(status_code=404, detail="Usuário não encontrado")
-    
     # Verificar se é corretor/imobiliária
     if user["user_type"] not in ["corretor", "imobiliaria"]:
         raise HTTPException(
@@ -387,6 +458,7 @@ async def create_proposal(
     }
     
     await proposals_collection.insert_one(proposal_dict)
+    await board_stats.proposal_created(proposal_dict, user)
     
     # Incrementar contador de propostas na demanda
     await demands_collection.update_one(
@@ -417,15 +489,13 @@ async def create_proposal(
 @router.get("/{demand_id}/proposals", response_model=List[Proposal])
 async def list_proposals(
     demand_id: str,
-    current_user_email: str = Depends(get_current_user_email)
+    user: dict = Depends(get_token_user)
 ):
     """Listar todas as propostas de uma demanda (apenas o demandante pode ver)"""
     demand = await demands_collection.find_one({"id": demand_id})
     if not demand:
         raise HTTPException(status_code=404, detail="Demanda não encontrada")
     
-    user = await users_collection.find_one({"email": current_user_email})
-    
     # Apenas o criador da demanda pode ver as propostas
     if demand["corretor_id"] != user["id"]:
         raise HTTPException(
@@ -440,7 +510,7 @@ async def list_proposals(
 @router.put("/proposals/{proposal_id}/accept")
 async def accept_proposal(
     proposal_id: str,
-    current_user_email: str = Depends(get_current_user_email)
+    user: dict = Depends(get_current_user)
 ):
     """Aceitar uma proposta (apenas o demandante pode aceitar)"""
     proposal = await proposals_collection.find_one({"id": proposal_id})
@@ -448,7 +518,6 @@ async def accept_proposal(
         raise HTTPException(status_code=404, detail="Proposta não encontrada")
     
     demand = await demands_collection.find_one({"id": proposal["demand_id"]})
-    user = await users_collection.find_one({"email": current_user_email})
     
     if demand["corretor_id"] != user["id"]:
         raise HTTPException(
@@ -457,19 +526,35 @@ async def accept_proposal(
         )
     
     # Atualizar proposta
-    await proposals_collection.update_one(
+    previous_proposal = await proposals_collection.find_one_and_update(
         {"id": proposal_id},
-        {"$set": {"status": ProposalStatus.accepted.value, "updated_at": datetime.utcnow()}}
+        {"$set": {"status": ProposalStatus.accepted.value, "updated_at": datetime.utcnow()}},
+        projection={"_id": 0, "status": 1}
     )
     
     # Atualizar demanda para "em negociação"
-    await demands_collection.update_one(
+    previous = await demands_collection.find_one_and_update(
         {"id": proposal["demand_id"]},
-        {"$set": {"status": DemandStatus.in_negotiation.value, "updated_at": datetime.utcnow()}}
+        {"$set": {"status": DemandStatus.in_negotiation.value, "updated_at": datetime.utcnow()}},
+        projection={"_id": 0, "status": 1}
     )
+    if previous:
+        await user_counters.increment(
+            user["id"],
+            active_demands=user_counters.demand_status_delta(previous["status"], DemandStatus.in_negotiation.value)
+        )
+        await board_stats.demand_updated(
+            proposal["demand_id"], previous, {"status": DemandStatus.in_negotiation.value}
+        )
     
     # Notificar ofertante
     ofertante_user = await users_collection.find_one({"id": proposal["ofertante_id"]})
+    if previous_proposal and previous_proposal["status"] != ProposalStatus.accepted.value:
+        await board_stats.proposal_status_changed(
+            proposal_id, previous_proposal["status"], ProposalStatus.accepted.value
+        )
+        if ofertante_user:
+            await board_stats.partnership_recorded(proposal, demand, ofertante_user, user)
     if ofertante_user:
         await create_notification(
             user_email=ofertante_user["email"],
@@ -488,7 +573,7 @@ async def accept_proposal(
 @router.put("/proposals/{proposal_id}/reject")
 async def reject_proposal(
     proposal_id: str,
-    current_user_email: str = Depends(get_current_user_email)
+    user: dict = Depends(get_token_user)
 ):
     """Rejeitar uma proposta"""
     proposal = await proposals_collection.find_one({"id": proposal_id})
@@ -496,7 +581,6 @@ async def reject_proposal(
         raise HTTPException(status_code=404, detail="Proposta não encontrada")
     
     demand = await demands_collection.find_one({"id": proposal["demand_id"]})
-    user = await users_collection.find_one({"email": current_user_email})
     
     if demand["corretor_id"] != user["id"]:
         raise HTTPException(
@@ -504,10 +588,15 @@ async def reject_proposal(
             detail="Apenas o criador da demanda pode rejeitar propostas"
         )
     
-    await proposals_collection.update_one(
+    previous_proposal = await proposals_collection.find_one_and_update(
         {"id": proposal_id},
-        {"$set": {"status": ProposalStatus.rejected.value, "updated_at": datetime.utcnow()}}
+        {"$set": {"status": ProposalStatus.rejected.value, "updated_at": datetime.utcnow()}},
+        projection={"_id": 0, "status": 1}
     )
+    if previous_proposal:
+        await board_stats.proposal_status_changed(
+            proposal_id, previous_proposal["status"], ProposalStatus.rejected.value
+        )
     
     # Notificar ofertante
     ofertante_user = await users_collection.find_one({"id": proposal["ofertante_id"]})
@@ -528,11 +617,9 @@ async def reject_proposal(
 
 @router.get("/stats/summary")
 async def get_demand_stats(
-    current_user_email: str = Depends(get_current_user_email)
+    user: dict = Depends(get_token_user)
 ):
     """Obter estatísticas do Mural para o corretor"""
-    user = await users_collection.find_one({"email": current_user_email})
-    
     # Minhas demandas
     my_demands_count = await demands_collection.count_documents({"corretor_id": user["id"]})
     my_active_demands = await demands_collection.count_documents({
@@ -0,0 +1,30 @@
+"""
+Routes for offline geographic lookups
+Consulta de CEP sem API externa (autopreenchimento de endereço)
+"""
+from fastapi import APIRouter, HTTPException, status
+from cep_index import get_cep_index, normalize_cep
+
+router = APIRouter(prefix="/geo", tags=["geo"])
+
+
+@router.get("/cep/{cep}")
+async def lookup_cep(cep: str):
+    """
+    Buscar endereço pelo CEP
+    Retorna logradouro, bairro, cidade, estado e coordenadas (centroide)
+    """
+    if normalize_cep(cep) is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="CEP inválido. Informe os 8 dígitos."
+        )
+
+    result = get_cep_index().lookup(cep)
+    if not result:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="CEP não encontrado"
+        )
+
+    return result
@@ -0,0 +1,217 @@
+"""
+Routes for direct media uploads
+Upload direto para o armazenamento (URL pré-assinada), sem os bytes passarem pela API
+
+Fluxo:
+1. POST /media/uploads         -> {exists, url, upload: {url, method, headers}}
+2. PUT  upload.url             (direto no S3/MinIO; no backend local, PUT /media/direct/{token})
+3. POST /media/uploads/complete -> {url} para anexar ao imóvel (images / existing_images)
+
+Uploads retomáveis para conexões instáveis (resumable_uploads.py):
+POST /media/resumable, HEAD/PATCH /media/resumable/{id}, POST /media/resumable/{id}/finalize
+e POST /properties/{id}/uploads para anexar ao imóvel
+"""
+from fastapi import APIRouter, HTTPException, status, Depends, Header, Request, Response
+from models import DirectUploadCreate, DirectUploadComplete, ResumableUploadCreate
+from current_user import get_token_user
+from resumable_uploads import append_chunk, create_session, finalize_session, get_session, session_response
+from media_store import CAS_DIRNAME, INCOMING_DIRNAME, cas_relative_path, media_blobs_collection, register_blob
+from storage import decode_upload_token, get_storage
+from uploads import ALLOWED_IMAGE_TYPES, MAX_IMAGE_SIZE, SNIFF_BYTES, sniff_image_type
+from images import UPLOAD_ROOT
+import hashlib
+import uuid
+import logging
+
+import aiofiles
+import aiofiles.os
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/media", tags=["media"])
+
+
+def _validate_upload(content_type: str, size: int = None):
+    if content_type not in ALLOWED_IMAGE_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Tipo de arquivo não permitido. Use JPEG, PNG, WebP ou GIF."
+        )
+    if size is not None and size > MAX_IMAGE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Arquivo muito grande. O tamanho máximo é {MAX_IMAGE_SIZE // (1024 * 1024)}MB."
+        )
+
+
+@router.post("/uploads")
+async def create_direct_upload(data: DirectUploadCreate, user: dict = Depends(get_token_user)):
+    """
+    Gerar URL pré-assinada para enviar uma imagem direto ao armazenamento
+    Se os mesmos bytes já existem, retorna exists=true e nenhum envio é necessário.
+    """
+    _validate_upload(data.content_type, data.size)
+    storage = get_storage()
+    key = cas_relative_path(data.sha256, ALLOWED_IMAGE_TYPES[data.content_type])
+
+    blob = await media_blobs_collection.find_one({"sha256": data.sha256}, {"_id": 0, "path": 1})
+    if blob:
+        # Renova a carência do blob (o coletor não o apaga antes do anexo) e espera uma
+        # reserva do coletor em andamento; se ele apagou o arquivo, o cliente envia de novo
+        rewrite = await register_blob(blob["path"], data.sha256, data.size, data.content_type, refs=0)
+        if not rewrite and await storage.size(blob["path"]) is not None:
+            return {"exists": True, "url": storage.public_url(blob["path"]), "upload": None}
+
+    upload = await storage.presign_put(key, data.content_type, data.size, data.sha256)
+    return {"exists": False, "url": storage.public_url(key), "upload": upload}
+
+
+@router.put("/direct/{token}")
+async def receive_direct_upload(token: str, request: Request):
+    """
+    Destino do upload direto no backend local (o token assinado substitui o login)
+    Confere tipo, tamanho e SHA-256 declarados antes de gravar.
+    """
+    claims = decode_upload_token(token)
+    if not claims:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Link de upload inválido ou expirado"
+        )
+
+    storage = get_storage()
+    incoming = UPLOAD_ROOT / CAS_DIRNAME / INCOMING_DIRNAME
+    await aiofiles.os.makedirs(incoming, exist_ok=True)
+    temp_path = incoming / f".{uuid.uuid4().hex}.part"
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+
+    def check_type():
+        if sniff_image_type(head) != claims["ct"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="O conteúdo do arquivo não é uma imagem válida."
+            )
+
+    try:
+        async with aiofiles.open(temp_path, "wb") as buffer:
+            async for chunk in request.stream():
+                # O primeiro pedaço do corpo pode ser menor que o cabeçalho da imagem
+                if len(head) < SNIFF_BYTES:
+                    head += chunk[:SNIFF_BYTES - len(head)]
+                    if len(head) == SNIFF_BYTES:
+                        check_type()
+                size += len(chunk)
+                if size > claims["size"]:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail="O arquivo é maior que o tamanho declarado."
+                    )
+                digest.update(chunk)
+                await buffer.write(chunk)
+
+        if len(head) < SNIFF_BYTES:
+            check_type()
+        if size != claims["size"] or digest.hexdigest() != claims["sha256"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="O arquivo recebido não confere com o tamanho/SHA-256 declarado."
+            )
+
+        await storage.put_file(temp_path, claims["key"], claims["ct"])
+    except BaseException:
+        try:
+            await aiofiles.os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    return {"url": storage.public_url(claims["key"])}
+
+
+@router.post("/uploads/complete")
+async def complete_direct_upload(data: DirectUploadComplete, user: dict = Depends(get_token_user)):
+    """
+    Confirmar um upload direto e registrar o blob
+    As referências são contadas quando a URL é anexada a um imóvel.
+    """
+    _validate_upload(data.content_type)
+    storage = get_storage()
+    key = cas_relative_path(data.sha256, ALLOWED_IMAGE_TYPES[data.content_type])
+
+    size = await storage.size(key)
+    if size is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Upload não encontrado. Envie o arquivo antes de concluir."
+        )
+
+    # O coletor pode ter apagado um blob antigo com os mesmos bytes antes do registro
+    if await register_blob(key, data.sha256, size, data.content_type) and await storage.size(key) is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Upload não encontrado. Envie o arquivo antes de concluir."
+        )
+    return {"url": storage.public_url(key), "size": size}
+
+
+# ==========================================
+# UPLOADS RETOMÁVEIS
+# ==========================================
+
+def _offset_headers(session: dict) -> dict:
+    return {
+        "Upload-Offset": str(session["offset"]),
+        "Upload-Length": str(session["size"]),
+        "Cache-Control": "no-store",
+    }
+
+
+@router.post("/resumable", status_code=status.HTTP_201_CREATED)
+async def create_resumable_upload(
+    data: ResumableUploadCreate,
+    response: Response,
+    user: dict = Depends(get_token_user)
+):
+    """Criar uma sessão de upload retomável (uma por foto)"""
+    session = await create_session(user["id"], data.size, data.filename, data.sha256)
+    response.headers.update(_offset_headers(session))
+    response.headers["Location"] = f"/api/media/resumable/{session['id']}"
+    return session_response(session)
+
+
+@router.head("/resumable/{upload_id}")
+async def resumable_upload_offset(upload_id: str, user: dict = Depends(get_token_user)):
+    """Offset atual (Upload-Offset): de onde o cliente deve continuar"""
+    session = await get_session(upload_id, user["id"])
+    return Response(status_code=status.HTTP_200_OK, headers=_offset_headers(session))
+
+
+@router.get("/resumable/{upload_id}")
+async def get_resumable_upload(upload_id: str, user: dict = Depends(get_token_user)):
+    """Estado da sessão de upload"""
+    return session_response(await get_session(upload_id, user["id"]))
+
+
+@router.patch("/resumable/{upload_id}")
+async def patch_resumable_upload(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    user: dict = Depends(get_token_user)
+):
+    """
+    Enviar um bloco a partir de Upload-Offset (corpo binário)
+    Retorna 204 com o novo Upload-Offset; 409 se o offset não confere.
+    """
+    session = await get_session(upload_id, user["id"])
+    session["offset"] = await append_chunk(session, upload_offset, request.stream())
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers=_offset_headers(session))
+
+
+@router.post("/resumable/{upload_id}/finalize")
+async def finalize_resumable_upload(upload_id: str, user: dict = Depends(get_token_user)):
+    """Concluir o upload: valida a imagem e move para o armazenamento definitivo"""
+    session = await get_session(upload_id, user["id"])
+    return session_response(await finalize_session(session))
@@ -1,11 +1,19 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query, UploadFile, File, Form
-from typing import List, Optional
-from models import PropertyCreate, PropertyUpdate, Property, PropertyWithOwner
-from auth import get_current_user_email
-from database import properties_collection, users_collection
+from fastapi import APIRouter, HTTPException, status, Depends, Query, UploadFile, File, Form, BackgroundTasks
+from typing import List, Optional, Tuple
+from models import PropertyCreate, PropertyUpdate, Property, PropertyWithOwner, PropertyUploadsAttach
+from current_user import get_token_user
+from database import properties_collection
+from canonical import canonicalize_neighborhood
+from media_store import store_image, release_images, retain_images
+from images import generate_property_variants
+from resumable_uploads import completed_upload_urls
+import user_counters
+from collections import Counter
 from datetime import datetime
+import json
 import uuid
 import os
+import asyncio
 import shutil
 from pathlib import Path
 import httpx
@@ -93,30 +101,67 @@ async def geocode_endpoint(
 
 async def save_upload_file(upload_file: UploadFile, property_id: str) -> str:
     """Save an uploaded file and return its URL path"""
-    # Generate unique filename
-    file_extension = Path(upload_file.filename).suffix.lower()
-    unique_filename = f"{property_id}_{uuid.uuid4().hex[:8]}{file_extension}"
-    file_path = UPLOAD_DIR / unique_filename
+    # Content-addressed storage: identical bytes are stored once (see media_store.py)
+    return await store_image(upload_file)
+
+# Quantas imagens gravar ao mesmo tempo por requisição
+IMAGE_SAVE_CONCURRENCY = int(os.environ.get("IMAGE_SAVE_CONCURRENCY", 4))
+
+async def save_upload_files(upload_files: List[UploadFile], property_id: str) -> Tuple[List[str], List[dict]]:
+    """
+    Grava as imagens em paralelo (no máximo IMAGE_SAVE_CONCURRENCY por vez)
+    Retorna (URLs na ordem de envio, erros por imagem) - uma imagem inválida não derruba as outras
+    """
+    semaphore = asyncio.Semaphore(IMAGE_SAVE_CONCURRENCY)
+    files = [f for f in upload_files if f.filename]  # Only process if file was actually uploaded
     
-    # Save file
-    with open(file_path, "wb") as buffer:
-        content = await upload_file.read()
-        buffer.write(content)
+    async def save(upload_file: UploadFile):
+        async with semaphore:
+            return await save_upload_file(upload_file, property_id)
     
-    # Return relative path for the API
-    return f"/api/uploads/{unique_filename}"
+    results = await asyncio.gather(*(save(f) for f in files), return_exceptions=True)
+    
+    image_urls = []
+    image_errors = []
+    for upload_file, result in zip(files, results):
+        if isinstance(result, BaseException):
+            detail = result.detail if isinstance(result, HTTPException) else "Erro ao salvar a imagem"
+            logger.warning(f"Error saving image {upload_file.filename} for property {property_id}: {result!r}")
+            image_errors.append({"filename": upload_file.filename, "detail": detail})
+        else:
+            image_urls.append(result)
+    return image_urls, image_errors
+
+def image_changes(old_images: List[str], new_images: List[str]) -> Tuple[List[str], List[str]]:
+    """
+    (adicionadas, removidas) entre duas listas de imagens, contando repetições
+    Cada ocorrência na lista é uma referência (o cadastro conta e a exclusão libera
+    uma por elemento), então a edição também compara as contagens.
+    """
+    old_counts, new_counts = Counter(old_images or []), Counter(new_images or [])
+    return list((new_counts - old_counts).elements()), list((old_counts - new_counts).elements())
 
-@router.post("/", response_model=Property, status_code=status.HTTP_201_CREATED)
-async def create_property(property_data: PropertyCreate, email: str = Depends(get_current_user_email)):
-    """Create a new property (authenticated users only)"""
-    # Get user
-    user = await users_collection.find_one({"email": email})
-    if not user:
+async def retain_attached_images(image_urls: List[str], stored_urls: List[str] = ()):
+    """
+    Conta as referências das imagens de uploads diretos antes de gravar o imóvel
+    Se o coletor está apagando alguma (upload abandonado além da carência), nada é
+    anexado: as imagens gravadas nesta requisição são liberadas e o cliente reenvia.
+    """
+    missing = await retain_images(image_urls)
+    if missing:
+        await release_images(stored_urls)
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Algumas imagens enviadas expiraram. Envie-as novamente."
         )
-    
+
+@router.post("/", response_model=Property, status_code=status.HTTP_201_CREATED)
+async def create_property(
+    property_data: PropertyCreate,
+    background_tasks: BackgroundTasks,
+    user: dict = Depends(get_token_user)
+):
+    """Create a new property (authenticated users only)"""
     # Validação: Usuário "particular" só pode anunciar Aluguel e Aluguel por Temporada
     if user.get('user_type') == 'particular':
         purpose = property_data.purpose.upper() if isinstance(property_data.purpose, str) else property_data.purpose.value
@@ -131,15 +176,31 @@ async def create_property(property_data: PropertyCreate, email: str = Depends(ge
     property_dict['id'] = str(uuid.uuid4())
     property_dict['owner_id'] = user['id']
     property_dict['created_at'] = datetime.utcnow()
+    
+    # Bairro canônico
+    neighborhood = await canonicalize_neighborhood(property_data.neighborhood, property_data.city)
+    if neighborhood:
+        property_dict['neighborhood'] = neighborhood['name']
+        property_dict['neighborhood_id'] = neighborhood['id']
     property_dict['updated_at'] = datetime.utcnow()
     
+    # Imagens enviadas direto ao armazenamento (/media/uploads)
+    await retain_attached_images(property_dict.get('images') or [])
+    
     # Insert into database
     await properties_collection.insert_one(property_dict)
+    await user_counters.increment(
+        user['id'], properties_count=1, featured_count=int(bool(property_dict.get('is_featured')))
+    )
+    
+    if property_dict.get('images'):
+        background_tasks.add_task(generate_property_variants, property_dict['id'], property_dict['images'])
     
     return Property(**{k: v for k, v in property_dict.items() if k != '_id'})
 
 @router.post("/with-images", response_model=Property, status_code=status.HTTP_201_CREATED)
 async def create_property_with_images(
+    background_tasks: BackgroundTasks,
     title: str = Form(...),
     description: str = Form(...),
     property_type: str = Form(...),
@@ -158,17 +219,13 @@ async def create_property_with_images(
     features: Optional[str] = Form(None),
     is_launch: bool = Form(False),
     images: List[UploadFile] = File(default=[]),
-    email: str = Depends(get_current_user_email)
+    uploaded_images: Optional[str] = Form(None),
+    user: dict = Depends(get_token_user)
 ):
-    """Create a new property with image uploads (authenticated users only)"""
-    # Get user
-    user = await users_collection.find_one({"email": email})
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
+    """
+    Create a new property with image uploads (authenticated users only)
+    uploaded_images: lista JSON de URLs de uploads diretos (/media/uploads), na frente dos arquivos
+    """
     # Validação: Usuário "particular" só pode anunciar Aluguel e Aluguel por Temporada
     if user.get('user_type') == 'particular':
         if purpose.upper() == 'VENDA':
@@ -179,24 +236,28 @@ async def create_property_with_images(
     
     property_id = str(uuid.uuid4())
     
-    # Save uploaded images
-    image_urls = []
-    for image in images:
-        if image.filename:  # Only process if file was actually uploaded
-            try:
-                image_url = await save_upload_file(image, property_id)
-                image_urls.append(image_url)
-            except Exception as e:
-                print(f"Error saving image: {e}")
+    # Gravar imagens, geocodificar e canonicalizar o bairro em paralelo
+    (image_urls, image_errors), geo_result, canonical = await asyncio.gather(
+        save_upload_files(images, property_id),
+        geocode_address(neighborhood, city, state),
+        canonicalize_neighborhood(neighborhood, city)
+    )
+    
+    # URLs já enviadas direto para o armazenamento
+    attached_images = []
+    if uploaded_images:
+        try:
+            attached_images = [url for url in json.loads(uploaded_images) if isinstance(url, str)]
+        except (ValueError, TypeError):
+            attached_images = []
+    await retain_attached_images(attached_images, image_urls)
+    image_urls = attached_images + image_urls
     
     # Parse features from comma-separated string
     features_list = []
     if features:
         features_list = [f.strip() for f in features.split(',') if f.strip()]
     
-    # Geocodificar endereço automaticamente
-    geo_result = await geocode_address(neighborhood, city, state)
-    
     # Create property document
     property_dict = {
         'id': property_id,
@@ -206,7 +267,8 @@ async def create_property_with_images(
         'purpose': purpose.upper(),
         'price': price,
         'address': None,  # Pode ser preenchido depois
-        'neighborhood': neighborhood,
+        'neighborhood': canonical['name'] if canonical else neighborhood,
+        'neighborhood_id': canonical['id'] if canonical else None,
         'city': city,
         'state': state.upper(),
         'latitude': geo_result.get('latitude'),
@@ -230,8 +292,13 @@ async def create_property_with_images(
     
     # Insert into database
     await properties_collection.insert_one(property_dict)
+    await user_counters.increment(user['id'], properties_count=1)
     
-    return Property(**{k: v for k, v in property_dict.items() if k != '_id'})
+    # Gerar miniaturas/WebP em background (não bloqueia a resposta)
+    if image_urls:
+        background_tasks.add_task(generate_property_variants, property_id, image_urls)
+    
+    return Property(**{k: v for k, v in property_dict.items() if k != '_id'}, image_errors=image_errors or None)
 
 @router.get("/", response_model=List[PropertyWithOwner])
 async def list_properties(
@@ -343,14 +410,18 @@ async def get_neighborhoods(
     if state:
         match_query['state'] = state.upper()
     
+    # Agrupar pelo bairro canônico (grafias diferentes do mesmo bairro contam uma vez)
     pipeline = [
         {"$match": match_query},
-        {"$group": {"_id": "$neighborhood"}},
-        {"$sort": {"_id": 1}}
+        {"$group": {
+            "_id": {"$ifNull": ["$neighborhood_id", "$neighborhood"]},
+            "name": {"$first": "$neighborhood"}
+        }},
+        {"$sort": {"name": 1}}
     ]
     
     neighborhoods = await properties_collection.aggregate(pipeline).to_list(100)
-    return [n['_id'] for n in neighborhoods if n['_id']]
+    return [n['name'] for n in neighborhoods if n['name']]
 
 @router.get("/{property_id}", response_model=PropertyWithOwner)
 async def get_property(property_id: str):
@@ -399,7 +470,8 @@ async def get_property(property_id: str):
 async def update_property(
     property_id: str,
     property_update: PropertyUpdate,
-    email: str = Depends(get_current_user_email)
+    background_tasks: BackgroundTasks,
+    user: dict = Depends(get_token_user)
 ):
     """Update property (only owner can update)"""
     # Get property
@@ -410,14 +482,6 @@ async def update_property(
             detail="Property not found"
         )
     
-    # Get user
-    user = await users_collection.find_one({"email": email})
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
     # Check ownership
     if property_data['owner_id'] != user['id']:
         raise HTTPException(
@@ -429,10 +493,34 @@ async def update_property(
     update_data = property_update.model_dump(exclude_unset=True)
     update_data['updated_at'] = datetime.utcnow()
     
+    # Bairro canônico
+    if update_data.get('neighborhood'):
+        neighborhood = await canonicalize_neighborhood(
+            update_data['neighborhood'], update_data.get('city') or property_data.get('city')
+        )
+        if neighborhood:
+            update_data['neighborhood'] = neighborhood['name']
+            update_data['neighborhood_id'] = neighborhood['id']
+    
+    # Contagem de referências das imagens adicionadas (antes de gravar) e removidas
+    if 'images' in update_data:
+        added_images, removed_images = image_changes(property_data.get('images'), update_data['images'])
+        await retain_attached_images(added_images)
+    
     await properties_collection.update_one(
         {"id": property_id},
         {"$set": update_data}
     )
+    if 'is_featured' in update_data:
+        await user_counters.increment(
+            user['id'],
+            featured_count=int(bool(update_data['is_featured'])) - int(bool(property_data.get('is_featured')))
+        )
+    
+    if 'images' in update_data:
+        await release_images(removed_images)
+        if added_images:
+            background_tasks.add_task(generate_property_variants, property_id, list(dict.fromkeys(added_images)))
     
     # Get updated property
     updated_property = await properties_collection.find_one({"id": property_id})
@@ -441,6 +529,7 @@ async def update_property(
 @router.put("/{property_id}/with-images", response_model=Property)
 async def update_property_with_images(
     property_id: str,
+    background_tasks: BackgroundTasks,
     title: str = Form(...),
     description: str = Form(...),
     property_type: str = Form(...),
@@ -460,7 +549,7 @@ async def update_property_with_images(
     is_launch: bool = Form(False),
     existing_images: Optional[str] = Form(None),  # JSON array of existing image URLs
     new_images: List[UploadFile] = File(default=[]),
-    email: str = Depends(get_current_user_email)
+    user: dict = Depends(get_token_user)
 ):
     """Update property with new image uploads (only owner can update)"""
     import json
@@ -473,14 +562,6 @@ async def update_property_with_images(
             detail="Property not found"
         )
     
-    # Get user
-    user = await users_collection.find_one({"email": email})
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
     # Check ownership
     if property_data['owner_id'] != user['id']:
         raise HTTPException(
@@ -496,14 +577,17 @@ async def update_property_with_images(
         except:
             image_urls = []
     
-    # Save new uploaded images
-    for image in new_images:
-        if image.filename:
-            try:
-                image_url = await save_upload_file(image, property_id)
-                image_urls.append(image_url)
-            except Exception as e:
-                print(f"Error saving image: {e}")
+    # URLs de uploads diretos (/media/uploads) que ainda não estavam no imóvel e as retiradas;
+    # os arquivos novos já tiveram a referência contada ao serem gravados
+    attached_images, removed_images = image_changes(property_data.get('images'), image_urls)
+    
+    # Gravar novas imagens e canonicalizar o bairro em paralelo
+    (new_image_urls, image_errors), canonical = await asyncio.gather(
+        save_upload_files(new_images, property_id),
+        canonicalize_neighborhood(neighborhood, city)
+    )
+    await retain_attached_images(attached_images, new_image_urls)
+    image_urls.extend(new_image_urls)
     
     # Parse features from comma-separated string
     features_list = []
@@ -517,7 +601,8 @@ async def update_property_with_images(
         'property_type': property_type,
         'purpose': purpose.upper(),
         'price': price,
-        'neighborhood': neighborhood,
+        'neighborhood': canonical['name'] if canonical else neighborhood,
+        'neighborhood_id': canonical['id'] if canonical else None,
         'city': city,
         'state': state.upper(),
         'bedrooms': bedrooms,
@@ -538,13 +623,27 @@ async def update_property_with_images(
         {"$set": update_data}
     )
     
+    # Liberar referências das imagens removidas na edição
+    await release_images(removed_images)
+    
+    # Gerar miniaturas/WebP das novas imagens em background
+    if new_image_urls or attached_images:
+        background_tasks.add_task(
+            generate_property_variants, property_id, list(dict.fromkeys(attached_images + new_image_urls))
+        )
+    
     # Get updated property
     updated_property = await properties_collection.find_one({"id": property_id})
-    return Property(**{k: v for k, v in updated_property.items() if k != '_id'})
+    return Property(**{k: v for k, v in updated_property.items() if k != '_id'}, image_errors=image_errors or None)
 
-@router.delete("/{property_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_property(property_id: str, email: str = Depends(get_current_user_email)):
-    """Delete property (only owner can delete)"""
+@router.post("/{property_id}/uploads", response_model=Property)
+async def attach_uploads_to_property(
+    property_id: str,
+    data: PropertyUploadsAttach,
+    background_tasks: BackgroundTasks,
+    user: dict = Depends(get_token_user)
+):
+    """Anexar uploads retomáveis finalizados (/media/resumable) às imagens do imóvel"""
     # Get property
     property_data = await properties_collection.find_one({"id": property_id})
     if not property_data:
@@ -553,12 +652,40 @@ async def delete_property(property_id: str, email: str = Depends(get_current_use
             detail="Property not found"
         )
     
-    # Get user
-    user = await users_collection.find_one({"email": email})
-    if not user:
+    # Check ownership
+    if property_data['owner_id'] != user['id']:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to update this property"
+        )
+    
+    urls = await completed_upload_urls(data.upload_ids, user['id'])
+    existing = property_data.get('images') or []
+    new_urls = [url for url in dict.fromkeys(urls) if url not in existing]
+    
+    if new_urls:
+        await retain_attached_images(new_urls)
+        await properties_collection.update_one(
+            {"id": property_id},
+            {
+                "$push": {"images": {"$each": new_urls}},
+                "$set": {"updated_at": datetime.utcnow()}
+            }
+        )
+        background_tasks.add_task(generate_property_variants, property_id, new_urls)
+    
+    updated_property = await properties_collection.find_one({"id": property_id})
+    return Property(**{k: v for k, v in updated_property.items() if k != '_id'})
+
+@router.delete("/{property_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_property(property_id: str, user: dict = Depends(get_token_user)):
+    """Delete property (only owner can delete)"""
+    # Get property
+    property_data = await properties_collection.find_one({"id": property_id})
+    if not property_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
+            detail="Property not found"
         )
     
     # Check ownership
@@ -568,8 +695,16 @@ async def delete_property(property_id: str, email: str = Depends(get_current_use
             detail="Not authorized to delete this property"
         )
     
-    # Delete property
-    await properties_collection.delete_one({"id": property_id})
+    # Delete property (um imóvel reservado por uma exclusão em massa do admin é removido por ela)
+    result = await properties_collection.delete_one(
+        {"id": property_id, "deleting_until": {"$not": {"$gt": datetime.utcnow()}}}
+    )
+    # Só quem de fato removeu o imóvel ajusta contadores e solta as imagens
+    if result.deleted_count:
+        await user_counters.increment(
+            user['id'], properties_count=-1, featured_count=-int(bool(property_data.get('is_featured')))
+        )
+        await release_images(property_data.get('images'))
     
     return None
 
@@ -577,17 +712,9 @@ async def delete_property(property_id: str, email: str = Depends(get_current_use
 async def get_my_properties(
     limit: int = 100,
     skip: int = 0,
-    email: str = Depends(get_current_user_email)
+    user: dict = Depends(get_token_user)
 ):
     """Get all properties of current user with pagination"""
-    # Get user
-    user = await users_collection.find_one({"email": email})
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
     # Get user's properties with pagination
     cursor = properties_collection.find({"owner_id": user['id']}).sort("created_at", -1).skip(skip).limit(limit)
     properties = await cursor.to_list(length=limit)
@@ -598,17 +725,9 @@ async def get_my_properties(
 @router.patch("/{property_id}/toggle-featured", response_model=Property)
 async def toggle_featured(
     property_id: str,
-    email: str = Depends(get_current_user_email)
+    user: dict = Depends(get_token_user)
 ):
     """Marcar/desmarcar imóvel como destaque (apenas Corretor e Imobiliária)"""
-    # Get user
-    user = await users_collection.find_one({"email": email})
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
     # Verificar se usuário é corretor ou imobiliária
     if user.get('user_type') not in ['corretor', 'imobiliaria']:
         raise HTTPException(
@@ -635,27 +754,20 @@ async def toggle_featured(
     current_status = property_data.get('is_featured', False)
     new_status = not current_status
     
-    # Se está marcando como destaque (new_status = True), verificar limite
+    # Se está marcando como destaque, ocupar uma vaga (featured_count < limite, atômico)
     if new_status:
-        # Contar quantos destaques o usuário já tem
-        featured_count = await properties_collection.count_documents({
-            "owner_id": user['id'],
-            "is_featured": True
-        })
-        
-        # Determinar limite baseado no tipo de usuário
         user_type = user.get('user_type')
         max_featured = 20 if user_type == 'imobiliaria' else 10
         
-        # Verificar se excedeu o limite
-        if featured_count >= max_featured:
+        if not await user_counters.reserve_featured_slot(user['id'], max_featured):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Limite de destaques atingido! Você pode ter no máximo {max_featured} imóveis em destaque. Remova o destaque de outro imóvel primeiro."
             )
     
-    await properties_collection.update_one(
-        {"id": property_id},
+    # Só troca se ninguém trocou antes (duplo clique / duas abas)
+    result = await properties_collection.update_one(
+        {"id": property_id, "is_featured": {"$ne": True} if new_status else True},
         {
             "$set": {
                 "is_featured": new_status,
@@ -663,6 +775,10 @@ async def toggle_featured(
             }
         }
     )
+    if new_status and not result.modified_count:
+        await user_counters.increment(user['id'], featured_count=-1)  # devolve a vaga
+    elif not new_status and result.modified_count:
+        await user_counters.increment(user['id'], featured_count=-1)
     
     # Return updated property
     updated_property = await properties_collection.find_one({"id": property_id})
@@ -672,17 +788,9 @@ async def toggle_featured(
 @router.patch("/{property_id}/toggle-exclusive-launch", response_model=Property)
 async def toggle_exclusive_launch(
     property_id: str,
-    email: str = Depends(get_current_user_email)
+    user: dict = Depends(get_token_user)
 ):
     """Marcar/desmarcar imóvel como lançamento exclusivo (apenas Imobiliária)"""
-    # Get user
-    user = await users_collection.find_one({"email": email})
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
     # Verificar se usuário é imobiliária
     if user.get('user_type') != 'imobiliaria':
         raise HTTPException(
@@ -727,26 +835,15 @@ async def toggle_exclusive_launch(
 
 @router.get("/user/featured-count")
 async def get_user_featured_count(
-    current_user_email: str = Depends(get_current_user_email)
+    user: dict = Depends(get_token_user)
 ):
     """
     Retorna a contagem de imóveis em destaque do usuário atual e o limite permitido
     Corretor: 10 destaques
     Imobiliária: 20 destaques
     """
-    # Get user
-    user = await users_collection.find_one({"email": current_user_email})
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
-    # Contar quantos imóveis o usuário tem marcados como destaque
-    featured_count = await properties_collection.count_documents({
-        "owner_id": user['id'],
-        "is_featured": True
-    })
+    # Contador mantido no usuário (user_counters.py)
+    featured_count = (await user_counters.read_counters(user['id']))['featured_count']
     
     # Determinar limite baseado no tipo de usuário
     user_type = user.get('user_type', 'particular')
@@ -809,6 +906,11 @@ async def create_property_request(request_data: PropertyRequestCreate):
             detail="Telefone é obrigatório"
         )
     
+    # Bairro canônico
+    neighborhood = None
+    if request_data.neighborhood:
+        neighborhood = await canonicalize_neighborhood(request_data.neighborhood, request_data.city)
+    
     # Criar solicitação
     request_id = str(uuid.uuid4())
     request_dict = {
@@ -819,7 +921,8 @@ async def create_property_request(request_data: PropertyRequestCreate):
         "property_type": request_data.property_type,
         "purpose": request_data.purpose,
         "city": request_data.city,
-        "neighborhood": request_data.neighborhood,
+        "neighborhood": neighborhood['name'] if neighborhood else request_data.neighborhood,
+        "neighborhood_id": neighborhood['id'] if neighborhood else None,
         "min_price": request_data.min_price,
         "max_price": request_data.max_price,
         "bedrooms": request_data.bedrooms,
@@ -837,12 +940,11 @@ async def create_property_request(request_data: PropertyRequestCreate):
 
 @router.get("/requests/list")
 async def list_property_requests(
-    current_user_email: str = Depends(get_current_user_email)
+    user: dict = Depends(get_token_user)
 ):
     """
     Listar solicitações de imóveis (apenas admin)
     """
-    user = await users_collection.find_one({"email": current_user_email})
     if user["user_type"] not in ["admin", "admin_senior"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -8,8 +8,9 @@ from models import (
     VisitScheduleCreate, VisitSchedule, VisitStatus,
     NotificationCreate, Notification, NotificationType
 )
-from auth import get_current_user_email
+from current_user import get_token_user
 from database import db
+import user_counters
 from datetime import datetime
 import uuid
 import logging
@@ -53,6 +54,7 @@ async def create_notification(
     }
     
     await notifications_collection.insert_one(notification)
+    await user_counters.increment(user_id, unread_notifications=1)
     logger.info(f"Notification created for user {user_id}: {title}")
     return notification
 
@@ -263,14 +265,10 @@ async def schedule_visit(
 
 @router.get("/my-visits", response_model=List[VisitSchedule])
 async def get_my_visits(
-    email: str = Depends(get_current_user_email),
+    user: dict = Depends(get_token_user),
     status_filter: Optional[str] = None
 ):
     """Listar visitas agendadas para os imóveis do usuário logado"""
-    user = await users_collection.find_one({"email": email})
-    if not user:
-        raise HTTPException(status_code=404, detail="Usuário não encontrado")
-    
     query = {"owner_id": user['id']}
     if status_filter:
         query["status"] = status_filter
@@ -283,13 +281,9 @@ async def get_my_visits(
 async def update_visit_status(
     visit_id: str,
     new_status: VisitStatus,
-    email: str = Depends(get_current_user_email)
+    user: dict = Depends(get_token_user)
 ):
     """Atualizar status de uma visita (apenas o proprietário)"""
-    user = await users_collection.find_one({"email": email})
-    if not user:
-        raise HTTPException(status_code=404, detail="Usuário não encontrado")
-    
     visit = await visits_collection.find_one({"id": visit_id})
     if not visit:
         raise HTTPException(status_code=404, detail="Visita não encontrada")
@@ -314,15 +308,11 @@ notifications_router = APIRouter(prefix="/notifications", tags=["notifications"]
 
 @notifications_router.get("/", response_model=List[Notification])
 async def get_notifications(
-    email: str = Depends(get_current_user_email),
+    user: dict = Depends(get_token_user),
     unread_only: bool = False,
     limit: int = 50
 ):
     """Listar notificações do usuário logado"""
-    user = await users_collection.find_one({"email": email})
-    if not user:
-        raise HTTPException(status_code=404, detail="Usuário não encontrado")
-    
     query = {"user_id": user['id']}
     if unread_only:
         query["read"] = False
@@ -332,26 +322,19 @@ async def get_notifications(
 
 
 @notifications_router.get("/unread-count")
-async def get_unread_count(email: str = Depends(get_current_user_email)):
+async def get_unread_count(user: dict = Depends(get_token_user)):
     """Retorna a quantidade de notificações não lidas"""
-    user = await users_collection.find_one({"email": email})
-    if not user:
-        raise HTTPException(status_code=404, detail="Usuário não encontrado")
-    
-    count = await notifications_collection.count_documents({"user_id": user['id'], "read": False})
-    return {"unread_count": count}
+    # Contador mantido no usuário (user_counters.py)
+    counters = await user_counters.read_counters(user['id'])
+    return {"unread_count": counters['unread_notifications']}
 
 
 @notifications_router.put("/{notification_id}/read")
 async def mark_as_read(
     notification_id: str,
-    email: str = Depends(get_current_user_email)
+    user: dict = Depends(get_token_user)
 ):
     """Marcar notificação como lida"""
-    user = await users_collection.find_one({"email": email})
-    if not user:
-        raise HTTPException(status_code=404, detail="Usuário não encontrado")
-    
     notification = await notifications_collection.find_one({"id": notification_id})
     if not notification:
         raise HTTPException(status_code=404, detail="Notificação não encontrada")
@@ -359,25 +342,23 @@ async def mark_as_read(
     if notification['user_id'] != user['id']:
         raise HTTPException(status_code=403, detail="Você não tem permissão para acessar esta notificação")
     
-    await notifications_collection.update_one(
-        {"id": notification_id},
+    result = await notifications_collection.update_one(
+        {"id": notification_id, "read": False},
         {"$set": {"read": True}}
     )
+    await user_counters.increment(user['id'], unread_notifications=-result.modified_count)
     
     return {"message": "Notificação marcada como lida"}
 
 
 @notifications_router.put("/mark-all-read")
-async def mark_all_as_read(email: str = Depends(get_current_user_email)):
+async def mark_all_as_read(user: dict = Depends(get_token_user)):
     """Marcar todas as notificações como lidas"""
-    user = await users_collection.find_one({"email": email})
-    if not user:
-        raise HTTPException(status_code=404, detail="Usuário não encontrado")
-    
     result = await notifications_collection.update_many(
         {"user_id": user['id'], "read": False},
         {"$set": {"read": True}}
     )
+    await user_counters.increment(user['id'], unread_notifications=-result.modified_count)
     
     return {"message": f"{result.modified_count} notificações marcadas como lidas"}
 
@@ -385,13 +366,9 @@ async def mark_all_as_read(email: str = Depends(get_current_user_email)):
 @notifications_router.delete("/{notification_id}")
 async def delete_notification(
     notification_id: str,
-    email: str = Depends(get_current_user_email)
+    user: dict = Depends(get_token_user)
 ):
     """Excluir uma notificação"""
-    user = await users_collection.find_one({"email": email})
-    if not user:
-        raise HTTPException(status_code=404, detail="Usuário não encontrado")
-    
     notification = await notifications_collection.find_one({"id": notification_id})
     if not notification:
         raise HTTPException(status_code=404, detail="Notificação não encontrada")
@@ -399,6 +376,8 @@ async def delete_notification(
     if notification['user_id'] != user['id']:
         raise HTTPException(status_code=403, detail="Você não tem permissão para excluir esta notificação")
     
-    await notifications_collection.delete_one({"id": notification_id})
+    result = await notifications_collection.delete_one({"id": notification_id})
+    if result.deleted_count and not notification.get('read'):
+        await user_counters.increment(user['id'], unread_notifications=-1)
     
     return {"message": "Notificação excluída"}
@@ -1,8 +1,8 @@
 from fastapi import FastAPI, APIRouter
-from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
 import os
 import logging
 from pathlib import Path
@@ -14,6 +14,19 @@ from routes.admin_routes import router as admin_router
 from routes.visit_routes import router as visit_router, notifications_router
 from routes.banner_routes import router as banner_router
 from routes.demand_routes import router as demand_router
+from routes.geo_routes import router as geo_router
+from routes.media_routes import router as media_router
+from cep_index import get_cep_index
+from canonical import load_neighborhood_index
+from database import ensure_indexes
+from images import shutdown_pool
+from media_files import MediaStaticFiles
+from current_user import UserLookupMetricsMiddleware
+import admin_stats
+import user_deletion
+import analytics_rollups
+import auth_sessions
+import token_versions
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -43,6 +56,8 @@ api_router.include_router(visit_router)
 api_router.include_router(notifications_router)
 api_router.include_router(banner_router)
 api_router.include_router(demand_router)
+api_router.include_router(geo_router)
+api_router.include_router(media_router)
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -51,8 +66,12 @@ app.include_router(api_router)
 UPLOAD_DIR = ROOT_DIR / "uploads"
 UPLOAD_DIR.mkdir(exist_ok=True)
 
-# Mount static files for uploaded images
-app.mount("/api/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
+# Mount static files for uploaded images (cache immutable, ETag, Range, WebP; URLs antigas redirecionam para o CAS)
+# Com STORAGE_BACKEND=s3 as fotos de imóveis são servidas pelo bucket/CDN; aqui ficam banners e fotos de perfil
+app.mount("/api/uploads", MediaStaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
+
+# Consultas de usuário ao Mongo por requisição (GET /api/admin/metrics)
+app.add_middleware(UserLookupMetricsMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -73,8 +92,31 @@ logger = logging.getLogger(__name__)
 async def startup_event():
     logger.info("Starting ImovLocal API...")
     logger.info(f"Connected to MongoDB: {mongo_url}")
+    # Carregar índice de CEP na memória (evita latência na primeira consulta)
+    get_cep_index()
+    await ensure_indexes()
+    await load_neighborhood_index()
+    # Revogação sem consultar o banco a cada requisição: versões de token e sessões revogadas
+    await token_versions.token_versions.sync()
+    await auth_sessions.revoked_sessions.sync()
+    app.state.revocation_sync = [
+        asyncio.create_task(token_versions.run_sync_loop()),
+        asyncio.create_task(auth_sessions.run_sync_loop()),
+    ]
+    # Snapshot das estatísticas do painel admin
+    app.state.dashboard_stats_refresh = asyncio.create_task(admin_stats.run_refresh_loop())
+    # Exclusões de usuário enfileiradas pelo painel admin
+    app.state.user_deletion_worker = asyncio.create_task(user_deletion.run_worker_loop())
+    # Rollups diários das séries do painel admin
+    app.state.analytics_rollup = asyncio.create_task(analytics_rollups.run_rollup_loop())
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in app.state.revocation_sync:
+        task.cancel()
+    app.state.dashboard_stats_refresh.cancel()
+    app.state.user_deletion_worker.cancel()
+    app.state.analytics_rollup.cancel()
     client.close()
+    shutdown_pool()
     logger.info("Closed MongoDB connection")
\ No newline at end of file
@@ -0,0 +1,326 @@
+"""
+Backends de armazenamento de mídia
+- LocalStorage: disco local (backend/uploads), servido por /api/uploads
+- S3Storage: qualquer serviço compatível com S3 (AWS, MinIO, R2...) via boto3
+
+Ambos oferecem URLs de upload direto (PUT pré-assinado): o cliente envia os bytes
+direto para o armazenamento e a API só registra o blob. Com S3 os nós da API não
+guardam arquivos (imóveis, fotos de perfil, banners e variantes vão para o bucket) e
+podem ser escalados horizontalmente; a exceção são os arquivos parciais dos uploads
+retomáveis (resumable_uploads.py). Arquivos temporários de upload ficam no disco só
+durante a requisição.
+
+Configuração (.env):
+    STORAGE_BACKEND=local|s3
+    S3_BUCKET, S3_REGION, S3_ENDPOINT_URL (MinIO/R2), S3_ACCESS_KEY_ID, S3_SECRET_ACCESS_KEY
+    MEDIA_PUBLIC_URL  URL pública do bucket/CDN (padrão: endpoint/bucket)
+"""
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import AsyncIterator, NamedTuple, Optional
+import asyncio
+import base64
+import mimetypes
+import os
+import shutil
+import tempfile
+import logging
+
+import aiofiles.os
+from jose import JWTError, jwt
+
+from auth import SECRET_KEY, ALGORITHM
+from images import UPLOAD_ROOT, UPLOAD_URL_PREFIX
+
+logger = logging.getLogger(__name__)
+
+PRESIGN_EXPIRES = timedelta(minutes=15)
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Rota da API que recebe os uploads diretos do backend local (routes/media_routes.py)
+LOCAL_DIRECT_UPLOAD_URL = "/api/media/direct/"
+
+
+def guess_content_type(key: str) -> str:
+    return mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+
+class StoredObject(NamedTuple):
+    key: str
+    size: int
+    modified_at: datetime  # UTC, sem fuso (como o resto do banco)
+
+
+class StorageBackend:
+    """Interface comum dos backends (chaves relativas, ex.: 'cas/ab/cd/<sha256>.jpg')"""
+
+    name = "base"
+
+    def public_url(self, key: str) -> str:
+        raise NotImplementedError
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        """Chave de uma URL pública deste backend (None para URLs externas)"""
+        prefix = self.public_url("")
+        if not url or not url.startswith(prefix):
+            return None
+        return url[len(prefix):]
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        """Tamanho e data de modificação do objeto, ou None se não existir"""
+        raise NotImplementedError
+
+    async def size(self, key: str) -> Optional[int]:
+        """Tamanho do objeto em bytes, ou None se não existir"""
+        info = await self.stat(key)
+        return info.size if info else None
+
+    def list_objects(self, prefix: str = "") -> AsyncIterator[StoredObject]:
+        """Todos os objetos cuja chave começa com `prefix` (usado pelo coletor media_gc.py)"""
+        raise NotImplementedError
+
+    async def put_file(self, source: Path, key: str, content_type: Optional[str] = None):
+        """Grava um arquivo local no armazenamento (o arquivo de origem é consumido)"""
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+    def local_copy(self, key: str):
+        """Context manager assíncrono com um caminho local legível para o objeto"""
+        raise NotImplementedError
+
+    async def presign_put(self, key: str, content_type: str, size: int, sha256: str) -> dict:
+        """URL de upload direto: {"url", "method", "headers", "expires_at"}"""
+        raise NotImplementedError
+
+
+class LocalStorage(StorageBackend):
+    """Disco local: o upload direto vai para a própria API com um token assinado"""
+
+    name = "local"
+
+    def __init__(self, root: Path = UPLOAD_ROOT, url_prefix: str = UPLOAD_URL_PREFIX):
+        self.root = root
+        self.url_prefix = url_prefix
+
+    def path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def public_url(self, key: str) -> str:
+        return f"{self.url_prefix}{key}"
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        try:
+            info = await aiofiles.os.stat(self.path(key))
+        except FileNotFoundError:
+            return None
+        return StoredObject(key, info.st_size, datetime.utcfromtimestamp(info.st_mtime))
+
+    def _walk(self, prefix: str) -> list:
+        objects = []
+        # Só desce a partir do diretório do prefixo ('cas/ab/cd/variants/<stem>_')
+        for root, _dirs, files in os.walk(self.path(prefix.rpartition("/")[0]) if "/" in prefix else self.root):
+            for name in files:
+                full = Path(root) / name
+                key = full.relative_to(self.root).as_posix()
+                if not key.startswith(prefix):
+                    continue
+                try:
+                    info = full.stat()
+                except FileNotFoundError:
+                    continue
+                objects.append(StoredObject(key, info.st_size, datetime.utcfromtimestamp(info.st_mtime)))
+        return objects
+
+    async def list_objects(self, prefix: str = "") -> AsyncIterator[StoredObject]:
+        for item in await asyncio.to_thread(self._walk, prefix):
+            yield item
+
+    async def put_file(self, source: Path, key: str, content_type: Optional[str] = None):
+        destination = self.path(key)
+        if Path(source).resolve() == destination:
+            return
+        await aiofiles.os.makedirs(destination.parent, exist_ok=True)
+        # rename quando possível; copia se a origem estiver em outro disco (RESUMABLE_UPLOAD_DIR)
+        await asyncio.to_thread(shutil.move, str(source), str(destination))
+
+    async def delete(self, key: str):
+        try:
+            await aiofiles.os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    @asynccontextmanager
+    async def local_copy(self, key: str) -> AsyncIterator[Path]:
+        yield self.path(key)
+
+    async def presign_put(self, key: str, content_type: str, size: int, sha256: str) -> dict:
+        expires_at = datetime.utcnow() + PRESIGN_EXPIRES
+        token = jwt.encode(
+            {"key": key, "ct": content_type, "size": size, "sha256": sha256, "exp": expires_at, "type": "upload"},
+            SECRET_KEY,
+            algorithm=ALGORITHM
+        )
+        return {
+            "url": f"{LOCAL_DIRECT_UPLOAD_URL}{token}",
+            "method": "PUT",
+            "headers": {"Content-Type": content_type},
+            "expires_at": expires_at,
+        }
+
+
+def decode_upload_token(token: str) -> Optional[dict]:
+    """Claims de um token de upload direto do backend local (None se inválido/expirado)"""
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    return claims if claims.get("type") == "upload" else None
+
+
+class S3Storage(StorageBackend):
+    """Bucket compatível com S3; chamadas do boto3 (síncronas) rodam em threads"""
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        region: Optional[str] = None,
+        endpoint_url: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        public_base_url: Optional[str] = None,
+    ):
+        import boto3
+        from botocore.config import Config
+
+        self.bucket = bucket
+        self.client = boto3.client(
+            "s3",
+            region_name=region,
+            endpoint_url=endpoint_url,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            config=Config(
+                signature_version="s3v4",
+                # MinIO e afins não resolvem buckets por subdomínio
+                s3={"addressing_style": "path" if endpoint_url else "auto"},
+                # Só o checksum que pedimos explicitamente entra na assinatura
+                request_checksum_calculation="when_required",
+                response_checksum_validation="when_required",
+            ),
+        )
+        if public_base_url:
+            self.base_url = public_base_url.rstrip("/")
+        elif endpoint_url:
+            self.base_url = f"{endpoint_url.rstrip('/')}/{bucket}"
+        else:
+            self.base_url = f"https://{bucket}.s3.{region or 'us-east-1'}.amazonaws.com"
+
+    def public_url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+    @staticmethod
+    def _utc(value: datetime) -> datetime:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        from botocore.exceptions import ClientError
+
+        try:
+            head = await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return StoredObject(key, head["ContentLength"], self._utc(head["LastModified"]))
+
+    async def list_objects(self, prefix: str = "") -> AsyncIterator[StoredObject]:
+        # Uma página (até 1000 chaves) por vez, sem carregar o bucket inteiro
+        pages = iter(self.client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=prefix))
+        while True:
+            page = await asyncio.to_thread(next, pages, None)
+            if page is None:
+                return
+            for item in page.get("Contents", []):
+                yield StoredObject(item["Key"], item["Size"], self._utc(item["LastModified"]))
+
+    async def put_file(self, source: Path, key: str, content_type: Optional[str] = None):
+        await asyncio.to_thread(
+            self.client.upload_file,
+            str(source),
+            self.bucket,
+            key,
+            ExtraArgs={"ContentType": content_type or guess_content_type(key), "CacheControl": CACHE_CONTROL},
+        )
+        await aiofiles.os.remove(source)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=key)
+
+    @asynccontextmanager
+    async def local_copy(self, key: str) -> AsyncIterator[Path]:
+        directory = await asyncio.to_thread(tempfile.mkdtemp, prefix="imovlocal-media-")
+        path = Path(directory) / Path(key).name
+        try:
+            await asyncio.to_thread(self.client.download_file, self.bucket, key, str(path))
+            yield path
+        finally:
+            await asyncio.to_thread(shutil.rmtree, directory, True)
+
+    async def presign_put(self, key: str, content_type: str, size: int, sha256: str) -> dict:
+        # Content-Length e checksum assinados: o S3 recusa bytes diferentes dos declarados
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+        expires_in = int(PRESIGN_EXPIRES.total_seconds())
+        url = await asyncio.to_thread(
+            self.client.generate_presigned_url,
+            "put_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": key,
+                "ContentType": content_type,
+                "ContentLength": size,
+                "ChecksumSHA256": checksum,
+                "CacheControl": CACHE_CONTROL,
+            },
+            ExpiresIn=expires_in,
+        )
+        return {
+            "url": url,
+            "method": "PUT",
+            "headers": {
+                "Content-Type": content_type,
+                "x-amz-checksum-sha256": checksum,
+                "Cache-Control": CACHE_CONTROL,
+            },
+            "expires_at": datetime.utcnow() + PRESIGN_EXPIRES,
+        }
+
+
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    """Backend configurado (instância única por processo)"""
+    global _storage
+    if _storage is None:
+        backend = os.environ.get("STORAGE_BACKEND", "local").lower()
+        if backend == "s3":
+            _storage = S3Storage(
+                bucket=os.environ["S3_BUCKET"],
+                region=os.environ.get("S3_REGION"),
+                endpoint_url=os.environ.get("S3_ENDPOINT_URL"),
+                access_key_id=os.environ.get("S3_ACCESS_KEY_ID"),
+                secret_access_key=os.environ.get("S3_SECRET_ACCESS_KEY"),
+                public_base_url=os.environ.get("MEDIA_PUBLIC_URL"),
+            )
+        else:
+            _storage = LocalStorage()
+        logger.info(f"Media storage backend: {_storage.name}")
+    return _storage
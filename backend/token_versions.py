@@ -0,0 +1,114 @@
+"""
+Versões de token por usuário (revogação de JWT sem consultar o Mongo a cada requisição)
+- Cada token carrega `ver`; ele só vale se ver >= versão atual do usuário
+- A versão sobe ao pausar a conta, mudar o tipo/email, trocar a senha ou excluir o usuário
+- Tabela em memória: usuários sem registro estão na versão 0. Cada worker relê as
+  alterações a cada TOKEN_VERSION_SYNC_SECONDS; quem fez a alteração atualiza na hora
+- Na emissão (login/refresh) a versão vem do banco (load): um worker atrasado não
+  assina tokens que os workers já sincronizados recusariam
+"""
+from datetime import datetime, timedelta
+from typing import List
+import asyncio
+import os
+import logging
+
+from pymongo import ReturnDocument, UpdateOne
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+token_versions_collection = db.token_versions
+
+TOKEN_VERSION_SYNC_SECONDS = float(os.environ.get("TOKEN_VERSION_SYNC_SECONDS", 5))
+# Margem para relógios/escritas concorrentes entre workers
+SYNC_OVERLAP = timedelta(seconds=2)
+
+
+class TokenVersionTable:
+    """user_id -> versão atual (só cresce)"""
+
+    def __init__(self):
+        self._versions = {}
+        self.last_sync = None
+        self.synced_total = 0
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def current(self, user_id: str) -> int:
+        return self._versions.get(user_id, 0)
+
+    def is_current(self, user_id: str, version: int) -> bool:
+        return version >= self.current(user_id)
+
+    def apply(self, user_id: str, version: int):
+        if version > self._versions.get(user_id, 0):
+            self._versions[user_id] = version
+
+    async def load(self, user_id: str) -> int:
+        """Versão atual do usuário lida do banco (e aplicada na tabela)"""
+        doc = await token_versions_collection.find_one({"user_id": user_id}, {"_id": 0, "version": 1})
+        if doc:
+            self.apply(user_id, doc["version"])
+        return self.current(user_id)
+
+    async def sync(self):
+        """Carrega as versões alteradas desde a última sincronização (tudo na primeira)"""
+        started = datetime.utcnow()
+        query = {}
+        if self.last_sync is not None:
+            query["updated_at"] = {"$gte": self.last_sync - SYNC_OVERLAP}
+        cursor = token_versions_collection.find(query, {"_id": 0, "user_id": 1, "version": 1})
+        async for doc in cursor:
+            self.apply(doc["user_id"], doc["version"])
+        self.last_sync = started
+        self.synced_total += 1
+
+    async def bump(self, user_id: str) -> int:
+        """Invalida todos os tokens já emitidos para o usuário"""
+        doc = await token_versions_collection.find_one_and_update(
+            {"user_id": user_id},
+            {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+            projection={"_id": 0, "version": 1}
+        )
+        self.apply(user_id, doc["version"])
+        logger.info(f"Token version bumped for user {user_id} -> {doc['version']}")
+        return doc["version"]
+
+    async def bump_many(self, user_ids: List[str]):
+        """bump() para vários usuários num bulk_write (operações em massa do admin)"""
+        if not user_ids:
+            return
+        now = datetime.utcnow()
+        await token_versions_collection.bulk_write([
+            UpdateOne({"user_id": user_id}, {"$inc": {"version": 1}, "$set": {"updated_at": now}}, upsert=True)
+            for user_id in user_ids
+        ], ordered=False)
+        cursor = token_versions_collection.find({"user_id": {"$in": user_ids}}, {"_id": 0, "user_id": 1, "version": 1})
+        async for doc in cursor:
+            self.apply(doc["user_id"], doc["version"])
+        logger.info(f"Token versions bumped for {len(user_ids)} users")
+
+    def stats(self) -> dict:
+        return {
+            "users_with_revocations": len(self._versions),
+            "last_sync": self.last_sync,
+            "sync_interval_seconds": TOKEN_VERSION_SYNC_SECONDS,
+        }
+
+
+token_versions = TokenVersionTable()
+
+
+async def run_sync_loop():
+    """Tarefa de fundo do worker (iniciada no startup do server.py)"""
+    while True:
+        await asyncio.sleep(TOKEN_VERSION_SYNC_SECONDS)
+        try:
+            await token_versions.sync()
+        except Exception as e:
+            logger.warning(f"Token version sync failed: {e}")
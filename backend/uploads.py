@@ -0,0 +1,124 @@
+"""
+Gravação de uploads em streaming
+Lê o arquivo em blocos de tamanho fixo, grava de forma assíncrona em um arquivo
+temporário, calcula o SHA-256 no mesmo passo e valida tamanho/tipo antes de
+renomear atomicamente para o destino final.
+"""
+from fastapi import HTTPException, UploadFile, status
+from pathlib import Path
+from typing import NamedTuple, Optional
+import hashlib
+import uuid
+import logging
+
+import aiofiles
+import aiofiles.os
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024  # 64KB por leitura
+
+ALLOWED_IMAGE_TYPES = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+}
+
+MAX_IMAGE_SIZE = 10 * 1024 * 1024  # 10MB
+# Bytes do início do arquivo que sniff_image_type precisa ver
+SNIFF_BYTES = 12
+
+
+class StoredUpload(NamedTuple):
+    filename: str
+    path: Path
+    size: int
+    sha256: str
+    content_type: str
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Identifica o tipo da imagem pelos primeiros bytes (não confia no Content-Type do cliente)"""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return None
+
+
+async def save_image_upload(
+    upload_file: UploadFile,
+    directory: Path,
+    name_prefix: str,
+    max_size: int = MAX_IMAGE_SIZE,
+    allowed_types: dict = ALLOWED_IMAGE_TYPES,
+) -> StoredUpload:
+    """
+    Salva uma imagem enviada em `directory` como '{name_prefix}{extensão}'
+    A memória usada é limitada a CHUNK_SIZE, independente do tamanho do arquivo.
+    """
+    if upload_file.content_type not in allowed_types:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Tipo de arquivo não permitido. Use JPEG, PNG, WebP ou GIF."
+        )
+
+    directory.mkdir(parents=True, exist_ok=True)
+    temp_path = directory / f".{uuid.uuid4().hex}.part"
+    digest = hashlib.sha256()
+    size = 0
+    content_type = None
+
+    try:
+        async with aiofiles.open(temp_path, "wb") as buffer:
+            while True:
+                chunk = await upload_file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                if content_type is None:
+                    content_type = sniff_image_type(chunk)
+                    if content_type not in allowed_types:
+                        raise HTTPException(
+                            status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="O conteúdo do arquivo não é uma imagem válida."
+                        )
+
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"Arquivo muito grande. O tamanho máximo é {max_size // (1024 * 1024)}MB."
+                    )
+
+                digest.update(chunk)
+                await buffer.write(chunk)
+
+        if size == 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Arquivo vazio."
+            )
+
+        filename = f"{name_prefix}{allowed_types[content_type]}"
+        final_path = directory / filename
+        await aiofiles.os.replace(temp_path, final_path)
+    except BaseException:
+        try:
+            await aiofiles.os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    return StoredUpload(
+        filename=filename,
+        path=final_path,
+        size=size,
+        sha256=digest.hexdigest(),
+        content_type=content_type,
+    )
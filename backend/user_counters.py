@@ -0,0 +1,105 @@
+"""
+Contadores mantidos no documento do usuário
+- properties_count, featured_count, active_demands, unread_notifications
+- Atualizados com $inc pelas rotas que criam/alteram/excluem imóveis, demandas e
+  notificações; as leituras (listagem admin, perfil público, limite de destaques,
+  badge de notificações) viram leitura de campo
+- Escritas feitas fora das rotas (scripts de seed, edições manuais) causam desvio:
+  reconcile_user_counters.py recalcula tudo a partir das coleções
+"""
+from typing import Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from database import db
+
+COUNTER_FIELDS = ("properties_count", "featured_count", "active_demands", "unread_notifications")
+
+ACTIVE_DEMAND_STATUS = "active"
+
+
+def counter(user: Optional[dict], field: str) -> int:
+    """Valor do contador (0 se ausente; nunca negativo)"""
+    return max(0, (user or {}).get(field) or 0)
+
+
+async def increment(user_id: Optional[str], **deltas: int):
+    """$inc nos contadores do usuário (deltas zerados são ignorados)"""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if user_id and deltas:
+        await db.users.update_one({"id": user_id}, {"$inc": deltas})
+
+
+async def increment_many(user_ids: List[str], **deltas: int):
+    """Mesmo $inc para vários usuários numa única escrita"""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if user_ids and deltas:
+        await db.users.update_many({"id": {"$in": user_ids}}, {"$inc": deltas})
+
+
+async def read_counters(user_id: str) -> dict:
+    user = await db.users.find_one({"id": user_id}, {"_id": 0, **{field: 1 for field in COUNTER_FIELDS}})
+    return {field: counter(user, field) for field in COUNTER_FIELDS}
+
+
+async def reserve_featured_slot(user_id: str, max_featured: int) -> bool:
+    """Ocupa uma vaga de destaque se ainda houver (atômico: sem corrida entre requisições)"""
+    result = await db.users.update_one(
+        {"id": user_id, "$or": [
+            {"featured_count": {"$lt": max_featured}},
+            {"featured_count": {"$exists": False}},
+        ]},
+        {"$inc": {"featured_count": 1}}
+    )
+    return result.modified_count == 1
+
+
+def demand_status_delta(old_status: Optional[str], new_status: Optional[str]) -> int:
+    """Variação de active_demands numa troca de status"""
+    return (new_status == ACTIVE_DEMAND_STATUS) - (old_status == ACTIVE_DEMAND_STATUS)
+
+
+# ==========================================
+# RECONCILIAÇÃO
+# ==========================================
+
+async def _grouped_counts(collection, match: dict, key: str) -> Dict[str, int]:
+    pipeline = [{"$match": match}, {"$group": {"_id": f"${key}", "count": {"$sum": 1}}}]
+    return {doc["_id"]: doc["count"] async for doc in collection.aggregate(pipeline)}
+
+
+async def compute_counters() -> Dict[str, Dict[str, int]]:
+    """Valores corretos a partir das coleções: user_id -> {campo: valor}"""
+    sources = {
+        "properties_count": await _grouped_counts(db.properties, {}, "owner_id"),
+        "featured_count": await _grouped_counts(db.properties, {"is_featured": True}, "owner_id"),
+        "active_demands": await _grouped_counts(db.demands, {"status": ACTIVE_DEMAND_STATUS}, "corretor_id"),
+        "unread_notifications": await _grouped_counts(db.notifications, {"read": False}, "user_id"),
+    }
+    expected = {}
+    for field, counts in sources.items():
+        for user_id, count in counts.items():
+            expected.setdefault(user_id, {})[field] = count
+    return expected
+
+
+async def reconcile_counters(dry_run: bool = False, batch_size: int = 500) -> List[dict]:
+    """Corrige os contadores divergentes; retorna as divergências encontradas"""
+    expected = await compute_counters()
+    drifts = []
+    operations = []
+    cursor = db.users.find({}, {"_id": 0, "id": 1, **{field: 1 for field in COUNTER_FIELDS}})
+    async for user in cursor:
+        correct = {field: expected.get(user["id"], {}).get(field, 0) for field in COUNTER_FIELDS}
+        wrong = {field: value for field, value in correct.items() if user.get(field) != value}
+        if not wrong:
+            continue
+        drifts.append({"user_id": user["id"], "before": {f: user.get(f) for f in wrong}, "after": wrong})
+        if not dry_run:
+            operations.append(UpdateOne({"id": user["id"]}, {"$set": wrong}))
+            if len(operations) >= batch_size:
+                await db.users.bulk_write(operations, ordered=False)
+                operations = []
+    if operations:
+        await db.users.bulk_write(operations, ordered=False)
+    return drifts
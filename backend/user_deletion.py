@@ -0,0 +1,300 @@
+"""
+Exclusão de usuários em segundo plano (DELETE /api/admin/users/{id})
+- A rota marca o usuário como `deleting`, revoga os tokens e enfileira um job em
+  `user_deletion_jobs`; a resposta não espera a limpeza
+- O worker (iniciado no startup do server.py) apaga os dados ligados ao usuário em
+  lotes de USER_DELETION_BATCH_SIZE por coleção, libera as imagens e registra o
+  progresso no job
+- Cada etapa consulta o que ainda existe, então repetir é seguro: um job interrompido
+  (queda do worker, lease vencido) é retomado da etapa em que parou
+- Lotes sem efeitos colaterais saem com um delete_many por lote. Efeitos colaterais
+  (imagens liberadas, propostas_count) só valem para os documentos que este worker
+  removeu (find_one_and_delete): repetir um lote ou dois workers no mesmo job não
+  liberam a mesma imagem duas vezes
+- O lease é conferido antes de cada lote (attempts identifica a posse): o worker que
+  perdeu o job para outro para sem marcá-lo como falho
+"""
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional
+import asyncio
+import os
+import uuid
+import logging
+
+import aiofiles.os
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from current_user import revoke_user_tokens
+from database import db
+from media_store import release_images
+from resumable_uploads import part_path
+import board_stats
+
+logger = logging.getLogger(__name__)
+
+user_deletion_jobs_collection = db.user_deletion_jobs
+
+USER_DELETION_BATCH_SIZE = int(os.environ.get("USER_DELETION_BATCH_SIZE", 500))
+USER_DELETION_POLL_SECONDS = float(os.environ.get("USER_DELETION_POLL_SECONDS", 5))
+# Sem renovação nesse prazo, outro worker assume o job
+JOB_LEASE = timedelta(minutes=5)
+
+DELETING_STATUS = "deleting"
+
+
+class JobLeaseLost(Exception):
+    """Outro worker assumiu o job (lease vencido)"""
+
+
+# ==========================================
+# FILA
+# ==========================================
+
+def job_response(job: dict) -> dict:
+    return {k: v for k, v in job.items() if k not in ("_id", "lease_until")}
+
+
+async def enqueue_user_deletion(user: dict, requested_by: Optional[str] = None) -> dict:
+    """Cria o job (ou devolve o existente; um job com falha volta para a fila)"""
+    now = datetime.utcnow()
+    job = {
+        "id": str(uuid.uuid4()),
+        "user_id": user["id"],
+        "user_email": user.get("email"),
+        "user_name": user.get("name"),
+        "requested_by": requested_by,
+        "status": "queued",
+        "step": None,
+        "completed_steps": [],
+        "deleted": {},
+        "error": None,
+        "attempts": 0,
+        "created_at": now,
+        "updated_at": now,
+        "finished_at": None,
+        "lease_until": None,
+    }
+    try:
+        await user_deletion_jobs_collection.insert_one(job)
+        logger.info(f"User deletion queued: {user['id']} (job {job['id']})")
+        return job_response(job)
+    except DuplicateKeyError:
+        existing = await user_deletion_jobs_collection.find_one_and_update(
+            {"user_id": user["id"], "status": "failed"},
+            {"$set": {"status": "queued", "error": None, "updated_at": now}},
+            return_document=ReturnDocument.AFTER
+        )
+        return job_response(existing or await user_deletion_jobs_collection.find_one({"user_id": user["id"]}))
+
+
+async def get_user_deletion_job(user_id: str) -> Optional[dict]:
+    job = await user_deletion_jobs_collection.find_one({"user_id": user_id})
+    return job_response(job) if job else None
+
+
+async def _claim_job() -> Optional[dict]:
+    """Pega o próximo job na fila ou um job cujo worker parou de renovar o lease"""
+    now = datetime.utcnow()
+    return await user_deletion_jobs_collection.find_one_and_update(
+        {"$or": [
+            {"status": "queued"},
+            {"status": "running", "lease_until": {"$lt": now}},
+        ]},
+        {
+            "$set": {"status": "running", "lease_until": now + JOB_LEASE, "updated_at": now},
+            "$min": {"started_at": now},
+            "$inc": {"attempts": 1},
+        },
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def _owned(job: dict) -> dict:
+    """Filtro do job enquanto ele ainda é deste worker (cada claim incrementa attempts)"""
+    return {"id": job["id"], "status": "running", "attempts": job["attempts"]}
+
+
+async def _renew_lease(job: dict):
+    now = datetime.utcnow()
+    result = await user_deletion_jobs_collection.update_one(
+        _owned(job), {"$set": {"lease_until": now + JOB_LEASE, "updated_at": now}}
+    )
+    if result.matched_count == 0:
+        raise JobLeaseLost(job["id"])
+
+
+async def _progress(job: dict, collection_name: str, deleted: int):
+    await user_deletion_jobs_collection.update_one(
+        {"id": job["id"]}, {"$inc": {f"deleted.{collection_name}": deleted}}
+    )
+
+
+# ==========================================
+# LIMPEZA EM LOTES
+# ==========================================
+
+async def _delete_in_batches(
+    job: dict,
+    collection_name: str,
+    query: dict,
+    fields: tuple = (),
+    before_delete: Optional[Callable[[List[dict]], Awaitable[None]]] = None,
+    after_delete: Optional[Callable[[List[dict]], Awaitable[None]]] = None,
+    skip_reserved: bool = False,
+):
+    """
+    Apaga os documentos do filtro em lotes
+    - before_delete: limpeza idempotente de cada lote (pode repetir sem dano)
+    - after_delete: efeitos colaterais, só com os documentos que este worker removeu;
+      sem ele o lote sai em uma ida ao banco (delete_many)
+    - skip_reserved: não remove documentos reservados por uma exclusão em massa do
+      admin (`deleting_until`, admin_bulk.py); ela os remove e ajusta os efeitos
+    """
+    collection = db[collection_name]
+    projection = {"_id": 1, **{field: 1 for field in fields}}
+    while True:
+        await _renew_lease(job)
+        docs = await collection.find(query, projection).limit(USER_DELETION_BATCH_SIZE).to_list(USER_DELETION_BATCH_SIZE)
+        if not docs:
+            return
+        if before_delete:
+            await before_delete(docs)
+        if not after_delete:
+            result = await collection.delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+            await _progress(job, collection_name, result.deleted_count)
+            continue
+        unreserved = {"deleting_until": {"$not": {"$gt": datetime.utcnow()}}} if skip_reserved else {}
+        removed = await asyncio.gather(*(
+            collection.find_one_and_delete({"_id": doc["_id"], **unreserved}, projection) for doc in docs
+        ))
+        removed = [doc for doc in removed if doc is not None]
+        if removed:
+            await after_delete(removed)
+        await _progress(job, collection_name, len(removed))
+        if not removed:
+            # Lote todo reservado por outra exclusão: espera ela terminar
+            await asyncio.sleep(1)
+
+
+async def _delete_properties(job: dict):
+    async def release(docs):
+        for doc in docs:
+            await release_images(doc.get("images"))
+
+    await _delete_in_batches(
+        job, "properties", {"owner_id": job["user_id"]}, ("images",), after_delete=release, skip_reserved=True
+    )
+
+
+async def _delete_demands(job: dict):
+    async def delete_proposals(docs):
+        # Propostas recebidas nas demandas do lote (de outros usuários); sem contadores, pode repetir
+        result = await db.proposals.delete_many({"demand_id": {"$in": [doc["id"] for doc in docs if doc.get("id")]}})
+        await _progress(job, "proposals", result.deleted_count)
+
+    await _delete_in_batches(job, "demands", {"corretor_id": job["user_id"]}, ("id",), before_delete=delete_proposals)
+
+
+async def _delete_sent_proposals(job: dict):
+    async def adjust_counts(docs):
+        # Demandas de outros usuários perdem a proposta enviada
+        per_demand = {}
+        for doc in docs:
+            per_demand[doc.get("demand_id")] = per_demand.get(doc.get("demand_id"), 0) + 1
+        for demand_id, count in per_demand.items():
+            await db.demands.update_one({"id": demand_id}, {"$inc": {"propostas_count": -count}})
+
+    await _delete_in_batches(
+        job, "proposals", {"ofertante_id": job["user_id"]}, ("demand_id",), after_delete=adjust_counts
+    )
+
+
+async def _delete_upload_sessions(job: dict):
+    async def remove_parts(docs):
+        for doc in docs:
+            try:
+                await aiofiles.os.remove(part_path(doc["id"]))
+            except (FileNotFoundError, KeyError):
+                pass
+
+    await _delete_in_batches(job, "upload_sessions", {"owner_id": job["user_id"]}, ("id",), before_delete=remove_parts)
+
+
+async def _delete_user(job: dict):
+    await _renew_lease(job)
+    user = await db.users.find_one_and_delete({"id": job["user_id"]}, {"_id": 0, "email": 1, "profile_photo": 1})
+    if user:
+        await release_images([user.get("profile_photo")])
+        await _progress(job, "users", 1)
+    await revoke_user_tokens(job["user_id"], email=(user or {}).get("email") or job.get("user_email"))
+
+
+def _simple(collection_name: str, field: str):
+    async def step(job: dict):
+        await _delete_in_batches(job, collection_name, {field: job["user_id"]})
+    return step
+
+
+# Ordem importa: o documento do usuário sai por último (até lá ele fica `deleting`)
+STEPS = [
+    ("properties", _delete_properties),
+    ("service_providers", _simple("service_providers", "owner_id")),
+    ("visits", _simple("visits", "owner_id")),
+    ("notifications", _simple("notifications", "user_id")),
+    ("demands", _delete_demands),
+    ("sent_proposals", _delete_sent_proposals),
+    ("upload_sessions", _delete_upload_sessions),
+    ("sessions", _simple("sessions", "user_id")),
+    ("user", _delete_user),
+]
+
+
+async def run_job(job: dict):
+    for step_name, step in STEPS:
+        if step_name in job.get("completed_steps", []):
+            continue
+        await user_deletion_jobs_collection.update_one(_owned(job), {"$set": {"step": step_name}})
+        await step(job)
+        await user_deletion_jobs_collection.update_one(_owned(job), {"$addToSet": {"completed_steps": step_name}})
+
+    # Demandas/propostas apagadas em massa: o documento do Mural é recalculado
+    await board_stats.rebuild_board_stats()
+
+    now = datetime.utcnow()
+    await user_deletion_jobs_collection.update_one(
+        _owned(job),
+        {"$set": {"status": "done", "step": None, "finished_at": now, "updated_at": now, "lease_until": None}}
+    )
+    logger.info(f"User deletion finished: {job['user_id']} (job {job['id']})")
+
+
+async def run_pending_jobs() -> int:
+    """Processa a fila até esvaziar; retorna quantos jobs terminaram"""
+    finished = 0
+    while True:
+        job = await _claim_job()
+        if not job:
+            return finished
+        try:
+            await run_job(job)
+            finished += 1
+        except JobLeaseLost:
+            logger.warning(f"User deletion lease lost: {job['user_id']} (job {job['id']})")
+        except Exception as e:
+            logger.error(f"User deletion failed: {job['user_id']} (job {job['id']}): {e}")
+            await user_deletion_jobs_collection.update_one(
+                _owned(job),
+                {"$set": {"status": "failed", "error": str(e), "updated_at": datetime.utcnow(), "lease_until": None}}
+            )
+
+
+async def run_worker_loop():
+    """Tarefa de fundo do worker (iniciada no startup do server.py)"""
+    while True:
+        try:
+            await run_pending_jobs()
+        except Exception as e:
+            logger.warning(f"User deletion worker failed: {e}")
+        await asyncio.sleep(USER_DELETION_POLL_SECONDS)
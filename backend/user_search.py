@@ -0,0 +1,162 @@
+"""
+Busca de usuários do painel admin (GET /api/admin/users/search?q=)
+- Cada usuário guarda `search_keys`: chaves normalizadas com prefixo de tipo
+  e:<email em minúsculas>, d:<só dígitos de CPF/CNPJ/telefone/CRECI>,
+  n:<tokens sem acento do nome/empresa>; e `search_name` (nome sem acento, para ordenar)
+- A consulta usa prefixo ancorado (^...) sobre o índice multikey
+  (search_keys, search_name, id): só as chaves que casam são lidas. Termo exato
+  usa o índice também para ordenar; com prefixo a ordenação (search_name, id) é
+  feita em memória sobre todos os que casam. Para limitar esse custo, termos com
+  menos de PREFIX_MIN_LENGTH caracteres só casam exatos ("jo", "67" não viram
+  prefixo) e a ordenação lê só (search_name, id); a página é buscada depois por id
+- Ranking em dois níveis: primeiro quem casa exatamente com todos os termos, depois
+  quem casa por prefixo; dentro do nível, ordem por nome e id
+- Paginação por keyset: o cursor guarda (nível, nome, id) do último resultado
+- Usuários gravados antes desta versão: backfill_user_search.py
+"""
+from typing import List, Optional, Tuple
+import base64
+import binascii
+import json
+import re
+
+from canonical import fold
+from database import db
+
+SEARCH_MIN_LENGTH = 2
+SEARCH_MAX_LIMIT = 100
+# Termos mais curtos que isso não viram prefixo: casariam boa parte da base
+PREFIX_MIN_LENGTH = 3
+
+_WORD_RE = re.compile(r"[^\W_]+", re.UNICODE)
+_DIGITS_QUERY_RE = re.compile(r"^[\d\s().\-/+]+$")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _digits(value: Optional[str]) -> str:
+    return re.sub(r"\D", "", value or "")
+
+
+def _phone_keys(phone: Optional[str]) -> List[str]:
+    """Telefone com e sem DDI/DDD: '+55 (67) 99999-8888' casa com 67999998888 e 999998888"""
+    digits = _digits(phone)
+    if len(digits) >= 12 and digits.startswith("55"):
+        digits = digits[2:]
+    keys = [digits]
+    if len(digits) in (10, 11):
+        keys.append(digits[2:])
+    return keys
+
+
+def _name_tokens(*values: Optional[str]) -> List[str]:
+    return [token for value in values for token in _WORD_RE.findall(fold(value or ""))]
+
+
+def search_fields(user: dict) -> dict:
+    """Campos de busca do usuário (gravados junto em todo insert/update de perfil)"""
+    keys = set()
+    if user.get("email"):
+        keys.add("e:" + user["email"].strip().lower())
+    for digits in [_digits(user.get("cpf")), _digits(user.get("cnpj")), _digits(user.get("creci")),
+                   *_phone_keys(user.get("phone"))]:
+        if digits:
+            keys.add("d:" + digits)
+    for token in _name_tokens(user.get("name"), user.get("company"), user.get("razao_social")):
+        keys.add("n:" + token)
+    return {
+        "search_keys": sorted(keys),
+        "search_name": " ".join(_name_tokens(user.get("name"))),
+    }
+
+
+def query_terms(q: str) -> List[List[str]]:
+    """Chaves candidatas por termo: todos os termos precisam casar (qualquer candidata)"""
+    q = (q or "").strip()
+    if "@" in q:
+        return [["e:" + q.lower()]]
+    if _DIGITS_QUERY_RE.match(q):
+        digits = _digits(q)
+        # Chaves de telefone são gravadas sem o DDI
+        if q.startswith("+55"):
+            digits = digits[2:]
+        return [["d:" + digits]] if digits else []
+    # Palavras: nome/empresa, ou início do email ("joao" acha joao.silva@...)
+    return [["n:" + token, "e:" + token] for token in _name_tokens(q)]
+
+
+def _prefixable(key: str) -> bool:
+    """'n:jo' -> False: o valor depois do tipo é curto demais para busca por prefixo"""
+    return len(key.split(":", 1)[1]) >= PREFIX_MIN_LENGTH
+
+
+def _tier_query(terms: List[List[str]], exact: bool) -> dict:
+    if exact:
+        clauses = [{"search_keys": {"$in": keys}} for keys in terms]
+    else:
+        clauses = [
+            {"search_keys": {"$in": [
+                re.compile("^" + re.escape(key)) if _prefixable(key) else key for key in keys
+            ]}}
+            for keys in terms
+        ]
+    return {"$and": clauses}
+
+
+def encode_cursor(tier: int, user: dict) -> str:
+    raw = json.dumps([tier, user.get("search_name") or "", user["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str, str]:
+    try:
+        tier, name, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    # Valores vão direto para o filtro: nada de objetos ({"$gt": ...}) vindos do cliente
+    if tier not in (0, 1) or not isinstance(name, str) or not isinstance(user_id, str):
+        raise InvalidCursor(cursor)
+    return tier, name, user_id
+
+
+async def search_users(q: str, limit: int = 20, cursor: Optional[str] = None) -> dict:
+    """Uma página de resultados e o cursor da próxima (None no fim)"""
+    terms = query_terms(q)
+    if not terms:
+        return {"results": [], "next_cursor": None}
+    position = decode_cursor(cursor) if cursor else None
+
+    exact = _tier_query(terms, exact=True)
+    tiers = [exact]
+    if any(_prefixable(key) for keys in terms for key in keys):
+        # Prefixo, sem repetir quem já apareceu no nível exato
+        tiers.append({"$and": [_tier_query(terms, exact=False), {"$nor": [exact]}]})
+    page: List[Tuple[int, dict]] = []
+    for tier, query in enumerate(tiers):
+        if position and tier < position[0]:
+            continue
+        clauses = [query, {"user_type": {"$ne": "admin"}}]
+        if position and tier == position[0]:
+            _, name, user_id = position
+            clauses.append({"$or": [
+                {"search_name": {"$gt": name}},
+                {"search_name": name, "id": {"$gt": user_id}},
+            ]})
+        remaining = limit - len(page)
+        # Só as chaves de ordenação: a ordenação em memória não carrega os documentos inteiros
+        keys = await db.users.find({"$and": clauses}, {"_id": 0, "search_name": 1, "id": 1}).sort(
+            [("search_name", 1), ("id", 1)]
+        ).limit(remaining).to_list(remaining)
+        page.extend((tier, key) for key in keys)
+        if len(page) >= limit:
+            break
+
+    users = {
+        user["id"]: user
+        async for user in db.users.find({"id": {"$in": [key["id"] for _, key in page]}}, {"_id": 0, "hashed_password": 0})
+    } if page else {}
+    next_cursor = encode_cursor(*page[-1]) if len(page) >= limit else None
+    # Removido entre as duas consultas: fica fora da página (o cursor continua válido)
+    return {"results": [users[key["id"]] for _, key in page if key["id"] in users], "next_cursor": next_cursor}
@@ -16,6 +16,19 @@ const getImageUrl = (imagePath) => {
   return `${BACKEND_URL}${imagePath}`;
 };
 
+// Build srcset strings from the variants generated by the backend (WebP + JPEG)
+const getImageSrcSets = (property) => {
+  const firstImage = property.images && property.images[0];
+  if (!firstImage || !property.image_variants) return null;
+  const key = firstImage.split('/').pop().replace(/\.[^.]+$/, '').replace(/\./g, '_');
+  const variants = property.image_variants[key];
+  if (!variants || variants.length === 0) return null;
+  return {
+    webp: variants.map(v => `${getImageUrl(v.webp)} ${v.width}w`).join(', '),
+    jpeg: variants.map(v => `${getImageUrl(v.jpeg)} ${v.width}w`).join(', ')
+  };
+};
+
 const PropertyCard = ({ property }) => {
   const formatPrice = (price) => {
     return new Intl.NumberFormat('pt-BR', {
@@ -29,17 +42,25 @@ const PropertyCard = ({ property }) => {
   const image = property.images && property.images.length > 0 
     ? getImageUrl(property.images[0])
     : 'https://images.unsplash.com/photo-1560518883-ce09059eeffa?w=400&h=300&fit=crop';
+  const srcSets = getImageSrcSets(property);
+  const imageSizes = '(max-width: 768px) 100vw, (max-width: 1280px) 50vw, 33vw';
 
   return (
     <div className="bg-white rounded-lg shadow-md overflow-hidden hover:shadow-xl transition-all duration-300 transform hover:-translate-y-1">
       {/* Property Image - Clickable */}
       <Link to={`/imovel/${property.id}`}>
         <div className="relative h-48 overflow-hidden">
-          <img 
-            src={image} 
-            alt={property.title}
-            className="w-full h-full object-cover transition-transform duration-300 hover:scale-110"
-          />
+          <picture>
+            {srcSets && <source type="image/webp" srcSet={srcSets.webp} sizes={imageSizes} />}
+            <img 
+              src={image} 
+              srcSet={srcSets ? srcSets.jpeg : undefined}
+              sizes={srcSets ? imageSizes : undefined}
+              loading="lazy"
+              alt={property.title}
+              className="w-full h-full object-cover transition-transform duration-300 hover:scale-110"
+            />
+          </picture>
           {/* Purpose Badge */}
           <div className={`absolute top-3 left-3 px-3 py-1 rounded-md font-bold text-sm ${
             property.purpose === 'VENDA' 
@@ -45,6 +45,11 @@ export const AuthProvider = ({ children }) => {
   };
 
   const logout = () => {
+    // Encerra a sessão no servidor sem bloquear a saída
+    const storedData = JSON.parse(localStorage.getItem('imovlocal_user') || 'null');
+    if (storedData?.access_token) {
+      authAPI.logout(storedData.access_token).catch(() => {});
+    }
     localStorage.removeItem('imovlocal_user');
     setUser(null);
   };
@@ -66,6 +71,20 @@ export const AuthProvider = ({ children }) => {
     }
   };
 
+  // Substituir os tokens (ex.: após trocar a senha, as sessões antigas são revogadas)
+  const updateToken = ({ access_token, refresh_token, expires_in }) => {
+    const storedData = localStorage.getItem('imovlocal_user');
+    if (storedData) {
+      try {
+        const parsedData = JSON.parse(storedData);
+        Object.assign(parsedData, { access_token, refresh_token, expires_in });
+        localStorage.setItem('imovlocal_user', JSON.stringify(parsedData));
+      } catch (error) {
+        console.error('Error updating stored token:', error);
+      }
+    }
+  };
+
   const isAuthenticated = () => {
     return user !== null;
   };
@@ -77,6 +96,7 @@ export const AuthProvider = ({ children }) => {
     register,
     logout,
     updateUser,
+    updateToken,
     isAuthenticated
   };
 
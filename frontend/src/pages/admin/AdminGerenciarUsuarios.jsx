@@ -4,7 +4,7 @@ import { useAuth } from '../../context/AuthContext';
 import Header from '../../components/Header';
 import Footer from '../../components/Footer';
 import { Button } from '../../components/ui/button';
-import { ArrowLeft, UserCheck, UserX, Pause, Trash2, Filter, UserPlus, X, RefreshCw, Edit } from 'lucide-react';
+import { ArrowLeft, UserCheck, UserX, Pause, Trash2, Filter, UserPlus, X, RefreshCw, Edit, Download } from 'lucide-react';
 import { adminAPIService } from '../../services/adminAPI';
 import { toast } from 'sonner';
 
@@ -138,7 +138,7 @@ const AdminGerenciarUsuarios = () => {
 
     try {
       await adminAPIService.deleteUser(userToDelete.id);
-      toast.success('Usuário excluído com sucesso!');
+      toast.success('Exclusão iniciada! Os dados do usuário são removidos em segundo plano.');
       setShowDeleteModal(false);
       setUserToDelete(null);
       fetchUsers();
@@ -148,6 +148,15 @@ const AdminGerenciarUsuarios = () => {
     }
   };
 
+  const handleExport = async (format) => {
+    try {
+      await adminAPIService.exportData('users', format, { status: filter.status, user_type: filter.userType });
+    } catch (error) {
+      console.error('Error exporting users:', error);
+      toast.error('Erro ao exportar usuários');
+    }
+  };
+
   const handleCreateUser = async (e) => {
     e.preventDefault();
     
@@ -314,8 +323,16 @@ const AdminGerenciarUsuarios = () => {
 
         {/* Users Table */}
         <div className="bg-white rounded-lg shadow-lg overflow-hidden">
-          <div className="p-4 bg-gray-50 border-b">
+          <div className="p-4 bg-gray-50 border-b flex justify-between items-center">
             <h2 className="font-bold text-lg">Usuários Cadastrados ({users.length})</h2>
+            <div className="flex gap-2">
+              {['csv', 'xlsx'].map((format) => (
+                <Button key={format} size="sm" variant="outline" onClick={() => handleExport(format)}>
+                  <Download size={14} className="mr-1" />
+                  {format.toUpperCase()}
+                </Button>
+              ))}
+            </div>
           </div>
 
           {loading ? (
@@ -360,14 +377,16 @@ const AdminGerenciarUsuarios = () => {
                         <span className={`px-2 py-1 rounded text-xs font-semibold ${
                           u.status === 'active' ? 'bg-green-100 text-green-700' :
                           u.status === 'pending' ? 'bg-orange-100 text-orange-700' :
+                          u.status === 'deleting' ? 'bg-gray-100 text-gray-600' :
                           'bg-red-100 text-red-700'
                         }`}>
-                          {u.status === 'active' ? 'Ativo' : u.status === 'pending' ? 'Pendente' : 'Pausado'}
+                          {u.status === 'active' ? 'Ativo' : u.status === 'pending' ? 'Pendente' : u.status === 'deleting' ? 'Excluindo...' : 'Pausado'}
                         </span>
                       </td>
                       <td className="px-4 py-3 text-sm text-gray-700">{u.properties_count}</td>
                       <td className="px-4 py-3 text-sm text-gray-700">{u.city} - {u.state}</td>
                       <td className="px-4 py-3">
+                        {u.status !== 'deleting' && (
                         <div className="flex items-center justify-center gap-2">
                           <button
                             onClick={() => handleOpenEditModal(u.id)}
@@ -402,6 +421,7 @@ const AdminGerenciarUsuarios = () => {
                             <Trash2 size={16} />
                           </button>
                         </div>
+                        )}
                       </td>
                     </tr>
                   ))}
@@ -28,9 +28,9 @@ const AdminMasterDashboard = () => {
     fetchDashboard();
   }, [user, navigate]);
 
-  const fetchDashboard = async () => {
+  const fetchDashboard = async (fresh = false) => {
     try {
-      const data = await adminAPIService.getDashboard();
+      const data = await adminAPIService.getDashboard(fresh);
       setStats(data);
     } catch (error) {
       console.error('Error fetching dashboard:', error);
@@ -93,6 +93,18 @@ const AdminMasterDashboard = () => {
       </div>
 
       <div className="container mx-auto px-4 py-8">
+        {/* Momento do snapshot das estatísticas (UTC vindo da API) */}
+        {stats?.as_of && (
+          <div className="flex items-center justify-end gap-2 text-sm text-gray-500 mb-2">
+            <span>
+              Atualizado às {new Date(stats.as_of.endsWith('Z') ? stats.as_of : `${stats.as_of}Z`).toLocaleTimeString('pt-BR')}
+            </span>
+            <button onClick={() => fetchDashboard(true)} className="text-red-600 hover:underline">
+              Atualizar
+            </button>
+          </div>
+        )}
+
         {/* Stats Cards */}
         <div className="grid grid-cols-1 md:grid-cols-3 gap-6 mb-8">
           <div className="bg-white rounded-lg shadow-lg p-6 border-l-4 border-blue-600">
@@ -185,9 +185,12 @@ const EditarImovel = () => {
       };
 
       // Use the new API with image upload
-      await propertiesAPI.updateWithImages(id, propertyData, existingImages, newImageFiles);
+      const updated = await propertiesAPI.updateWithImages(id, propertyData, existingImages, newImageFiles);
 
       toast.success('Imóvel atualizado com sucesso!');
+      (updated.image_errors || []).forEach((err) => {
+        toast.error(`Imagem não enviada: ${err.filename}`, { description: err.detail });
+      });
 
       setTimeout(() => {
         navigate('/admin/imoveis');
@@ -5,7 +5,7 @@ import Header from '../../components/Header';
 import Footer from '../../components/Footer';
 import { Button } from '../../components/ui/button';
 import { ArrowLeft, Save, Upload, X } from 'lucide-react';
-import { propertiesAPI } from '../../services/api';
+import { propertiesAPI, geoAPI } from '../../services/api';
 import { toast } from 'sonner';
 import { propertyTypes } from '../../data/mock';
 
@@ -61,6 +61,7 @@ const NovoImovel = () => {
     property_type: 'Apartamento',
     purpose: getInitialPurpose(),
     price: '',
+    cep: '',
     neighborhood: '',
     city: '',
     state: 'MS',
@@ -83,6 +84,24 @@ const NovoImovel = () => {
     }));
   };
 
+  // Autopreencher cidade/estado/bairro a partir do CEP
+  const handleCepBlur = async () => {
+    const cep = formData.cep.replace(/\D/g, '');
+    if (cep.length !== 8) return;
+
+    try {
+      const address = await geoAPI.lookupCep(cep);
+      setFormData(prev => ({
+        ...prev,
+        state: address.state || prev.state,
+        city: address.city || prev.city,
+        neighborhood: address.neighborhood || prev.neighborhood
+      }));
+    } catch (error) {
+      toast.error('CEP não encontrado. Preencha o endereço manualmente.');
+    }
+  };
+
   const handleImageUpload = (e) => {
     const files = Array.from(e.target.files);
     
@@ -133,11 +152,14 @@ const NovoImovel = () => {
       };
 
       // Use the new API with image upload
-      await propertiesAPI.createWithImages(propertyData, imageFiles);
+      const created = await propertiesAPI.createWithImages(propertyData, imageFiles);
 
       toast.success('Imóvel cadastrado com sucesso!', {
         description: 'Seu imóvel já está disponível no site.',
       });
+      (created.image_errors || []).forEach((err) => {
+        toast.error(`Imagem não enviada: ${err.filename}`, { description: err.detail });
+      });
 
       setTimeout(() => {
         navigate('/admin/imoveis');
@@ -264,6 +286,20 @@ const NovoImovel = () => {
             <div>
               <h2 className="text-xl font-bold text-gray-800 mb-4">Localização</h2>
               <div className="grid grid-cols-1 md:grid-cols-2 gap-4">
+                <div className="md:col-span-2">
+                  <label className="block text-sm font-medium text-gray-700 mb-2">CEP</label>
+                  <input
+                    type="text"
+                    name="cep"
+                    value={formData.cep}
+                    onChange={handleChange}
+                    onBlur={handleCepBlur}
+                    maxLength={9}
+                    className="w-full px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent"
+                    placeholder="Ex: 79002-000"
+                  />
+                </div>
+
                 <div>
                   <label className="block text-sm font-medium text-gray-700 mb-2">Estado *</label>
                   <select
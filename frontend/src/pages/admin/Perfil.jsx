@@ -15,7 +15,7 @@ const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 
 const Perfil = () => {
   const navigate = useNavigate();
-  const { user, updateUser, logout } = useAuth();
+  const { user, updateUser, updateToken, logout } = useAuth();
   const fileInputRef = useRef(null);
   
   const [editing, setEditing] = useState(false);
@@ -174,7 +174,10 @@ const Perfil = () => {
     }
 
     try {
-      await authAPI.changePassword(passwordData);
+      const response = await authAPI.changePassword(passwordData);
+      if (response.access_token) {
+        updateToken(response);
+      }
       
       toast.success('Senha alterada com sucesso!', {
         description: 'Use a nova senha no próximo login.',
@@ -1,4 +1,5 @@
 import axios from 'axios';
+import { retryWithRefresh } from './api';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API_URL = `${BACKEND_URL}/api`;
@@ -28,11 +29,14 @@ adminAPI.interceptors.request.use(
   }
 );
 
+adminAPI.interceptors.response.use((response) => response, retryWithRefresh(adminAPI));
+
 // Admin API
 export const adminAPIService = {
   // Dashboard
-  getDashboard: async () => {
-    const response = await adminAPI.get('/dashboard');
+  // fresh=true recalcula na hora em vez de usar o snapshot (as_of)
+  getDashboard: async (fresh = false) => {
+    const response = await adminAPI.get('/dashboard', { params: fresh ? { fresh: 1 } : {} });
     return response.data;
   },
 
@@ -46,6 +50,14 @@ export const adminAPIService = {
     return response.data;
   },
 
+  // Busca por nome, email, telefone, CPF/CNPJ ou CRECI ({ results, next_cursor })
+  searchUsers: async (q, cursor = null, limit = 20) => {
+    const params = { q, limit };
+    if (cursor) params.cursor = cursor;
+    const response = await adminAPI.get('/users/search', { params });
+    return response.data;
+  },
+
   createUser: async (userData) => {
     const response = await adminAPI.post('/users', userData);
     return response.data;
@@ -71,6 +83,17 @@ export const adminAPIService = {
     return response.data;
   },
 
+  // Operações em massa (resultado por id em `results`)
+  bulkUpdateUserStatus: async (userIds, status) => {
+    const response = await adminAPI.post('/users/bulk-status', { user_ids: userIds, status });
+    return response.data;
+  },
+
+  bulkUpdateUserPlan: async (userIds, planType) => {
+    const response = await adminAPI.post('/users/bulk-plan', { user_ids: userIds, plan_type: planType });
+    return response.data;
+  },
+
   // Property Management
   getAllProperties: async () => {
     const response = await adminAPI.get('/properties');
@@ -82,6 +105,24 @@ export const adminAPIService = {
     return response.data;
   },
 
+  bulkDeleteProperties: async (propertyIds) => {
+    const response = await adminAPI.post('/properties/bulk-delete', { property_ids: propertyIds });
+    return response.data;
+  },
+
+  // Export (entity: users | properties | visits | leads; format: csv | xlsx)
+  exportData: async (entity, format = 'csv', filters = {}) => {
+    const params = Object.fromEntries(Object.entries(filters).filter(([, value]) => value));
+    const response = await adminAPI.get(`/export/${entity}.${format}`, { params, responseType: 'blob' });
+    const match = /filename="([^"]+)"/.exec(response.headers['content-disposition'] || '');
+    const url = URL.createObjectURL(response.data);
+    const link = document.createElement('a');
+    link.href = url;
+    link.download = match ? match[1] : `${entity}.${format}`;
+    link.click();
+    URL.revokeObjectURL(url);
+  },
+
   // Opportunities Board
   getOpportunitiesBoard: async () => {
     const response = await adminAPI.get('/opportunities-board');
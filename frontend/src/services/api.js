@@ -28,6 +28,72 @@ api.interceptors.request.use(
   }
 );
 
+// Access tokens duram poucos minutos: em 401, renova com o refresh token e repete a requisição
+let refreshPromise = null;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// 409 no refresh: outra aba trocou o mesmo refresh token instantes antes e grava os
+// tokens novos no localStorage (compartilhado entre abas); espera por eles
+const awaitOtherTabRefresh = async (usedRefreshToken) => {
+  for (let attempt = 0; attempt < 10; attempt += 1) {
+    const current = JSON.parse(localStorage.getItem('imovlocal_user') || 'null');
+    if (current?.refresh_token && current.refresh_token !== usedRefreshToken) {
+      return current.access_token;
+    }
+    await sleep(200);
+  }
+  throw Object.assign(new Error('Sessão expirada'), { expired: true });
+};
+
+export const refreshAccessToken = () => {
+  if (!refreshPromise) {
+    const stored = JSON.parse(localStorage.getItem('imovlocal_user') || 'null');
+    if (!stored?.refresh_token) {
+      return Promise.reject(Object.assign(new Error('Sessão expirada'), { expired: true }));
+    }
+    // Uma renovação por vez, compartilhada entre as requisições que falharam juntas
+    refreshPromise = axios
+      .post(`${API_URL}/auth/refresh`, { refresh_token: stored.refresh_token })
+      .then(({ data }) => {
+        localStorage.setItem('imovlocal_user', JSON.stringify({ ...stored, ...data }));
+        return data.access_token;
+      })
+      .catch((refreshError) => {
+        if (refreshError.response?.status === 409) {
+          return awaitOtherTabRefresh(stored.refresh_token);
+        }
+        throw refreshError;
+      })
+      .finally(() => {
+        refreshPromise = null;
+      });
+  }
+  return refreshPromise;
+};
+
+export const retryWithRefresh = (instance) => async (error) => {
+  const original = error.config;
+  const isAuthCall = ['/auth/login', '/auth/register', '/auth/refresh'].some((path) => original?.url?.includes(path));
+  if (error.response?.status !== 401 || !original || original._retried || isAuthCall) {
+    return Promise.reject(error);
+  }
+  original._retried = true;
+  try {
+    const accessToken = await refreshAccessToken();
+    original.headers.Authorization = `Bearer ${accessToken}`;
+    return instance(original);
+  } catch (refreshError) {
+    if (refreshError.expired || refreshError.response?.status === 401) {
+      localStorage.removeItem('imovlocal_user');
+      window.location.href = '/login';
+    }
+    return Promise.reject(error);
+  }
+};
+
+api.interceptors.response.use((response) => response, retryWithRefresh(api));
+
 // Auth API
 export const authAPI = {
   register: async (userData) => {
@@ -75,6 +141,14 @@ export const authAPI = {
     const response = await api.post('/auth/change-password', passwordData);
     return response.data;
   },
+
+  // Encerrar a sessão no servidor (invalida o refresh token); sem renovação automática
+  logout: async (accessToken) => {
+    const response = await axios.post(`${API_URL}/auth/logout`, null, {
+      headers: { Authorization: `Bearer ${accessToken}` },
+    });
+    return response.data;
+  },
 };
 
 // Properties API
@@ -145,11 +219,16 @@ export const propertiesAPI = {
     if (propertyData.features) formData.append('features', propertyData.features);
     formData.append('is_launch', propertyData.is_launch || false);
     
-    // Add image files
+    // Imagens vão direto para o armazenamento; a API recebe só as URLs
     if (imageFiles && imageFiles.length > 0) {
-      imageFiles.forEach(file => {
-        formData.append('images', file);
-      });
+      if (mediaAPI.canUploadDirect()) {
+        const imageUrls = await Promise.all(imageFiles.map((file) => mediaAPI.uploadImage(file)));
+        formData.append('uploaded_images', JSON.stringify(imageUrls));
+      } else {
+        imageFiles.forEach(file => {
+          formData.append('images', file);
+        });
+      }
     }
     
     const response = await api.post('/properties/with-images', formData, {
@@ -188,18 +267,24 @@ export const propertiesAPI = {
     if (propertyData.features) formData.append('features', propertyData.features);
     formData.append('is_launch', propertyData.is_launch || false);
     
-    // Add existing images as JSON
-    if (existingImages && existingImages.length > 0) {
-      formData.append('existing_images', JSON.stringify(existingImages));
+    // Novas imagens vão direto para o armazenamento e entram na lista como URLs
+    let images = existingImages || [];
+    let files = newImageFiles || [];
+    if (files.length > 0 && mediaAPI.canUploadDirect()) {
+      images = [...images, ...(await Promise.all(files.map((file) => mediaAPI.uploadImage(file))))];
+      files = [];
     }
     
-    // Add new image files
-    if (newImageFiles && newImageFiles.length > 0) {
-      newImageFiles.forEach(file => {
-        formData.append('new_images', file);
-      });
+    // Add existing images as JSON
+    if (images.length > 0) {
+      formData.append('existing_images', JSON.stringify(images));
     }
     
+    // Add new image files (navegadores sem crypto.subtle)
+    files.forEach(file => {
+      formData.append('new_images', file);
+    });
+    
     const response = await api.put(`/properties/${id}/with-images`, formData, {
       headers: {
         'Content-Type': 'multipart/form-data',
@@ -466,4 +551,41 @@ export const demandsAPI = {
   },
 };
 
+// Geo API (consulta de CEP offline)
+export const geoAPI = {
+  lookupCep: async (cep) => {
+    const response = await api.get(`/geo/cep/${cep.replace(/\D/g, '')}`);
+    return response.data;
+  },
+};
+
+// Upload direto para o armazenamento (URL pré-assinada); retorna a URL pública da imagem
+export const mediaAPI = {
+  // O SHA-256 do arquivo precisa de crypto.subtle (HTTPS ou localhost)
+  canUploadDirect: () => typeof crypto !== 'undefined' && Boolean(crypto.subtle),
+
+  uploadImage: async (file) => {
+    const digest = await crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+    const sha256 = Array.from(new Uint8Array(digest))
+      .map((b) => b.toString(16).padStart(2, '0'))
+      .join('');
+
+    const { data } = await api.post('/media/uploads', {
+      sha256,
+      content_type: file.type,
+      size: file.size,
+    });
+    if (data.exists) {
+      return data.url;
+    }
+
+    // URLs relativas (backend local) apontam para a própria API
+    const uploadUrl = data.upload.url.startsWith('/') ? `${BACKEND_URL}${data.upload.url}` : data.upload.url;
+    await axios.put(uploadUrl, file, { headers: data.upload.headers });
+
+    const complete = await api.post('/media/uploads/complete', { sha256, content_type: file.type });
+    return complete.data.url;
+  },
+};
+
 export default api;
@@ -0,0 +1,61 @@
+"""
+Testes das sessões revogadas em memória (backend/auth_sessions.py)
+
+Uso: python -m pytest tests/test_auth_sessions.py
+"""
+from pathlib import Path
+import sys
+import unittest
+import uuid
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from auth_sessions import BloomFilter, RevokedSessions  # noqa: E402
+
+
+class BloomFilterTest(unittest.TestCase):
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000)
+        items = [uuid.uuid4().hex for _ in range(1000)]
+        for item in items:
+            bloom.add(item)
+        self.assertTrue(all(item in bloom for item in items))
+
+    def test_false_positive_rate_near_target(self):
+        bloom = BloomFilter(1000, error_rate=0.01)
+        for _ in range(1000):
+            bloom.add(uuid.uuid4().hex)
+        false_positives = sum(uuid.uuid4().hex in bloom for _ in range(10000))
+        self.assertLess(false_positives / 10000, 0.03)
+
+    def test_sizing(self):
+        bloom = BloomFilter(10000, error_rate=0.01)
+        # ~9,6 bits por item e 7 hashes para 1%
+        self.assertAlmostEqual(bloom.size / 10000, 9.6, delta=0.1)
+        self.assertEqual(bloom.hashes, 7)
+
+
+class RevokedSessionsTest(unittest.TestCase):
+    def test_add_and_check(self):
+        revoked = RevokedSessions(100)
+        revoked.add("sid-1")
+        self.assertTrue(revoked.is_revoked("sid-1"))
+        self.assertFalse(revoked.is_revoked("sid-2"))
+        self.assertEqual(len(revoked), 1)
+
+    def test_bloom_false_positive_is_checked_against_the_exact_set(self):
+        revoked = RevokedSessions(100)
+        # Posição marcada só no filtro (como um falso positivo)
+        revoked._bloom.add("sid-ghost")
+        self.assertFalse(revoked.is_revoked("sid-ghost"))
+
+    def test_stats(self):
+        revoked = RevokedSessions(100)
+        revoked.add("sid-1")
+        stats = revoked.stats()
+        self.assertEqual(stats["revoked_in_memory"], 1)
+        self.assertIsNone(stats["last_sync"])
+
+
+if __name__ == "__main__":
+    unittest.main()
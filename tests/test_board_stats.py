@@ -0,0 +1,58 @@
+"""
+Testes das chaves e contagens do documento do Mural (backend/board_stats.py)
+
+Uso: python -m pytest tests/test_board_stats.py
+"""
+from enum import Enum
+from pathlib import Path
+import sys
+import unittest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from board_stats import NONE_KEY, _counts, _demand_entry, _key, _unkey  # noqa: E402
+
+
+class Status(str, Enum):
+    ACTIVE = "active"
+
+
+class KeyTest(unittest.TestCase):
+    def test_empty_values(self):
+        self.assertEqual(_key(None), NONE_KEY)
+        self.assertEqual(_key(""), NONE_KEY)
+        self.assertIsNone(_unkey(NONE_KEY))
+
+    def test_enum_uses_its_value(self):
+        self.assertEqual(_key(Status.ACTIVE), "active")
+
+    def test_field_path_characters_are_replaced(self):
+        for value in ("Sta. Fé", "$where", "a.b.$c", "Campo Grande"):
+            key = _key(value)
+            self.assertNotIn(".", key)
+            self.assertFalse(key.startswith("$"))
+            self.assertEqual(_unkey(key), value)
+
+
+class CountsTest(unittest.TestCase):
+    def test_only_positive_counts(self):
+        doc = {"demands_by_city": {_key("Sta. Fé"): 2, _key(None): 1, "Dourados": 0, "Corumbá": -1}}
+        self.assertEqual(_counts(doc, "demands_by_city"), {"Sta. Fé": 2, None: 1})
+
+    def test_missing_field(self):
+        self.assertEqual(_counts({}, "demands_by_type"), {})
+
+
+class EntryTest(unittest.TestCase):
+    def test_demand_entry(self):
+        entry = _demand_entry(
+            {"id": "d1", "titulo": "Casa", "tipo_imovel": "Casa-Térrea", "cidade": "CG", "status": "active", "x": 1},
+            "a@b.c"
+        )
+        self.assertEqual(entry["title"], "Casa")
+        self.assertEqual(entry["corretor_email"], "a@b.c")
+        self.assertNotIn("x", entry)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+Testes da formatação e do fluxo das exportações CSV/XLSX (backend/exports.py)
+
+Uso: python -m pytest tests/test_exports.py
+"""
+from datetime import date, datetime
+from pathlib import Path
+from unittest import mock
+from xml.etree import ElementTree
+import csv
+import io
+import sys
+import unittest
+import zipfile
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import exports  # noqa: E402
+from exports import EXPORTS, ExportSpec, _csv_value, _xlsx_cell  # noqa: E402
+
+SHEET_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+SPEC = ExportSpec(collection="test", columns=[("Nome", "name"), ("Valor", "value")])
+ROWS = [
+    ["João", 1500.5],
+    ["=HYPERLINK(\"http://x\")", True],
+    ["linha\x01inválida <&>", None],
+]
+
+
+def fake_rows(rows):
+    async def iter_rows(spec, filters):
+        for row in rows:
+            yield list(row)
+    return iter_rows
+
+
+async def collect(stream) -> bytes:
+    return b"".join([chunk async for chunk in stream])
+
+
+class CsvValueTest(unittest.TestCase):
+    def test_plain_values(self):
+        self.assertEqual(_csv_value(None), "")
+        self.assertEqual(_csv_value(True), "Sim")
+        self.assertEqual(_csv_value(False), "Não")
+        self.assertEqual(_csv_value(42), "42")
+        self.assertEqual(_csv_value(datetime(2024, 5, 1, 12, 30)), "2024-05-01T12:30:00")
+        self.assertEqual(_csv_value(date(2024, 5, 1)), "2024-05-01")
+        self.assertEqual(_csv_value(["Piscina", "Churrasqueira"]), "Piscina, Churrasqueira")
+
+    def test_formulas_become_text(self):
+        for value in ("=1+1", "+SUM(A1)", "-2+3*cmd", "@import", "\tx", "\rx"):
+            self.assertEqual(_csv_value(value), "'" + value, value)
+
+    def test_signed_numbers_are_kept(self):
+        for value in ("-150", "+55 (67) 99999-8888", "-1.234,56"):
+            self.assertEqual(_csv_value(value), value)
+        self.assertEqual(_csv_value(-150), "-150")
+
+
+class XlsxCellTest(unittest.TestCase):
+    def test_types(self):
+        self.assertEqual(_xlsx_cell(None), "<c/>")
+        self.assertEqual(_xlsx_cell(True), '<c t="b"><v>1</v></c>')
+        self.assertEqual(_xlsx_cell(3.5), "<c><v>3.5</v></c>")
+        self.assertIn("2024-05-01", _xlsx_cell(date(2024, 5, 1)))
+
+    def test_text_is_escaped_and_cleaned(self):
+        cell = _xlsx_cell("a\x01<b>&")
+        self.assertIn("a&lt;b&gt;&amp;", cell)
+        self.assertNotIn("\x01", cell)
+
+
+class ExportSpecTest(unittest.TestCase):
+    def test_only_declared_filters_reach_the_query(self):
+        spec = EXPORTS["users"]
+        query = spec.query({"status": "active", "user_type": "corretor", "hashed_password": "x"})
+        self.assertEqual(query, {"user_type": "corretor", "status": "active"})
+        self.assertEqual(spec.query({}), {"user_type": {"$ne": "admin"}})
+
+    def test_projection_has_only_the_columns(self):
+        projection = EXPORTS["users"].projection()
+        self.assertEqual(projection["_id"], 0)
+        self.assertNotIn("hashed_password", projection)
+        self.assertEqual(len(projection) - 1, len(EXPORTS["users"].columns))
+
+
+class StreamTest(unittest.IsolatedAsyncioTestCase):
+    async def test_csv(self):
+        with mock.patch.object(exports, "iter_rows", fake_rows(ROWS)):
+            data = await collect(exports.csv_stream(SPEC, {}))
+        text = data.decode("utf-8")
+        self.assertTrue(text.startswith("\ufeff"))
+        rows = list(csv.reader(io.StringIO(text[1:])))
+        self.assertEqual(rows[0], ["Nome", "Valor"])
+        self.assertEqual(rows[1], ["João", "1500.5"])
+        self.assertEqual(rows[2], ["'=HYPERLINK(\"http://x\")", "Sim"])
+        self.assertEqual(len(rows), 4)
+
+    async def test_xlsx_opens_as_a_workbook(self):
+        with mock.patch.object(exports, "iter_rows", fake_rows(ROWS)):
+            data = await collect(exports.xlsx_stream(SPEC, {}, sheet_name="teste"))
+        with zipfile.ZipFile(io.BytesIO(data)) as workbook:
+            self.assertIsNone(workbook.testzip())
+            self.assertIn('name="teste"', workbook.read("xl/workbook.xml").decode())
+            sheet = ElementTree.fromstring(workbook.read("xl/worksheets/sheet1.xml"))
+        rows = sheet.findall(f"{SHEET_NS}sheetData/{SHEET_NS}row")
+        self.assertEqual(len(rows), 4)
+        self.assertEqual("".join(rows[1].itertext()), "João1500.5")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+"""
+Testes do servidor de mídia (backend/media_files.py) e do WebP na resolução original (backend/images.py)
+
+Uso: python -m pytest tests/test_media_files.py
+"""
+from pathlib import Path
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from starlette.applications import Starlette  # noqa: E402
+from starlette.routing import Mount  # noqa: E402
+from starlette.testclient import TestClient  # noqa: E402
+
+from images import VARIANTS_DIRNAME, full_webp_name, process_image  # noqa: E402
+from media_files import MediaStaticFiles, parse_range  # noqa: E402
+
+SHA = "ab" * 32
+
+
+class ParseRangeTest(unittest.TestCase):
+    def test_closed_range(self):
+        self.assertEqual(parse_range("bytes=0-99", 1000), (0, 99))
+
+    def test_end_past_size_is_clamped(self):
+        self.assertEqual(parse_range("bytes=900-5000", 1000), (900, 999))
+
+    def test_open_range(self):
+        self.assertEqual(parse_range("bytes=100-", 1000), (100, 999))
+
+    def test_suffix_range(self):
+        self.assertEqual(parse_range("bytes=-100", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=-5000", 1000), (0, 999))
+
+    def test_unsupported_or_invalid_means_full_response(self):
+        for header in ("bytes=5-3", "bytes=-", "items=0-1", "bytes=0-1,5-6", "bytes=a-b"):
+            self.assertIsNone(parse_range(header, 1000), header)
+
+    def test_unsatisfiable(self):
+        with self.assertRaises(ValueError):
+            parse_range("bytes=1000-", 1000)
+        with self.assertRaises(ValueError):
+            parse_range("bytes=-0", 1000)
+
+
+class WebpCandidatesTest(unittest.TestCase):
+    def test_original_in_cas(self):
+        path = os.path.join("uploads", "cas", "ab", "ab", f"{SHA}.jpg")
+        self.assertEqual(list(MediaStaticFiles._webp_candidates(path)), [
+            os.path.join("uploads", "cas", "ab", "ab", f"{SHA}.webp"),
+            os.path.join("uploads", "cas", "ab", "ab", VARIANTS_DIRNAME, full_webp_name(SHA)),
+        ])
+
+    def test_never_a_smaller_variant(self):
+        path = os.path.join("uploads", "cas", "ab", "ab", f"{SHA}.png")
+        for candidate in MediaStaticFiles._webp_candidates(path):
+            self.assertNotRegex(os.path.basename(candidate), r"_\d+\.webp$")
+
+    def test_variant_only_has_its_sibling(self):
+        path = os.path.join("uploads", "cas", "ab", "ab", VARIANTS_DIRNAME, f"{SHA}_640.jpg")
+        self.assertEqual(list(MediaStaticFiles._webp_candidates(path)), [
+            os.path.join("uploads", "cas", "ab", "ab", VARIANTS_DIRNAME, f"{SHA}_640.webp"),
+        ])
+
+
+class MediaResponseTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.cas = self.root / "cas" / "ab" / "ab"
+        (self.cas / VARIANTS_DIRNAME).mkdir(parents=True)
+        self.original = self.cas / f"{SHA}.jpg"
+        self.original.write_bytes(b"\xff\xd8\xff" + b"\x00" * 997)
+        app = Starlette(routes=[Mount("/media", MediaStaticFiles(directory=str(self.root)))])
+        self.client = TestClient(app)
+        self.url = f"/media/cas/ab/ab/{SHA}.jpg"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_range_and_416(self):
+        response = self.client.get(self.url, headers={"Range": "bytes=0-9"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.headers["content-range"], "bytes 0-9/1000")
+        self.assertEqual(len(response.content), 10)
+
+        response = self.client.get(self.url, headers={"Range": "bytes=5000-"})
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response.headers["content-range"], "bytes */1000")
+
+    def test_immutable_with_sha_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("immutable", response.headers["cache-control"])
+        self.assertEqual(response.headers["etag"], f'"{SHA}"')
+        self.assertEqual(self.client.get(self.url, headers={"If-None-Match": f'"{SHA}"'}).status_code, 304)
+
+    def test_smaller_variant_is_not_negotiated(self):
+        (self.cas / VARIANTS_DIRNAME / f"{SHA}_640.webp").write_bytes(b"RIFF0000WEBP")
+        response = self.client.get(self.url, headers={"Accept": "image/webp,*/*"})
+        self.assertEqual(response.headers["content-type"], "image/jpeg")
+        self.assertEqual(len(response.content), 1000)
+        self.assertNotIn("vary", response.headers)
+
+    def test_full_size_webp_is_negotiated(self):
+        (self.cas / VARIANTS_DIRNAME / full_webp_name(SHA)).write_bytes(b"RIFF0000WEBP")
+        response = self.client.get(self.url, headers={"Accept": "image/webp,*/*"})
+        self.assertEqual(response.headers["content-type"], "image/webp")
+        self.assertEqual(response.headers["vary"], "Accept")
+        self.assertNotEqual(response.headers["etag"], f'"{SHA}"')
+
+        response = self.client.get(self.url, headers={"Accept": "image/jpeg"})
+        self.assertEqual(response.headers["content-type"], "image/jpeg")
+        self.assertEqual(response.headers["vary"], "Accept")
+
+
+class FullSizeWebpTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _process(self, name: str, size: tuple, mode: str = "RGB", fmt: str = "JPEG") -> Path:
+        from PIL import Image
+
+        source = self.root / f"{name}.{fmt.lower()}"
+        Image.new(mode, size).save(source, fmt)
+        process_image(str(source), str(self.root / VARIANTS_DIRNAME))
+        return self.root / VARIANTS_DIRNAME / full_webp_name(name)
+
+    def test_generated_at_the_original_size(self):
+        from PIL import Image
+
+        for name, size in (("small", (800, 600)), ("wide", (1500, 900))):
+            full = self._process(name, size, fmt="PNG")
+            with Image.open(full) as image:
+                self.assertEqual(image.size, size)
+
+    def test_skipped_when_decoded_downscaled(self):
+        # JPEG grande é decodificado reduzido (draft): sem WebP do mesmo tamanho
+        self.assertFalse(self._process("huge", (4000, 3000)).exists())
+
+    def test_skipped_for_transparent_images(self):
+        self.assertFalse(self._process("alpha", (500, 500), mode="RGBA", fmt="PNG").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
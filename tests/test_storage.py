@@ -0,0 +1,168 @@
+"""
+Testes dos backends de armazenamento de mídia (backend/storage.py)
+
+Uso: python -m pytest tests/test_storage.py
+
+O LocalStorage roda sempre (diretório temporário). O S3Storage roda contra um MinIO
+(ou outro serviço compatível) quando S3_TEST_ENDPOINT_URL está definido:
+
+    docker run -p 9000:9000 minio/minio server /data
+    S3_TEST_ENDPOINT_URL=http://localhost:9000 python -m pytest tests/test_storage.py
+
+Credenciais: S3_TEST_ACCESS_KEY_ID / S3_TEST_SECRET_ACCESS_KEY (padrão minioadmin);
+bucket: S3_TEST_BUCKET (padrão imovlocal-test, criado se não existir).
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+import hashlib
+import os
+import sys
+import tempfile
+import unittest
+import urllib.error
+import urllib.request
+import uuid
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from storage import LocalStorage, S3Storage, decode_upload_token  # noqa: E402
+
+S3_TEST_ENDPOINT_URL = os.environ.get("S3_TEST_ENDPOINT_URL")
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"\x00" * 56
+
+
+class StorageContract:
+    """Comportamento comum que todo backend precisa ter"""
+
+    storage = None
+
+    def write_temp(self, data: bytes) -> Path:
+        handle, path = tempfile.mkstemp(dir=self.scratch)
+        with os.fdopen(handle, "wb") as f:
+            f.write(data)
+        return Path(path)
+
+    def key(self, name: str) -> str:
+        return f"{self.prefix}/{name}"
+
+    async def test_put_stat_delete(self):
+        key = self.key("a.png")
+        source = self.write_temp(PNG_BYTES)
+
+        await self.storage.put_file(source, key, "image/png")
+        self.assertFalse(source.exists(), "put_file consome o arquivo de origem")
+
+        info = await self.storage.stat(key)
+        self.assertEqual(info.key, key)
+        self.assertEqual(info.size, len(PNG_BYTES))
+        self.assertLess(abs(info.modified_at - datetime.utcnow()), timedelta(minutes=5))
+        self.assertEqual(await self.storage.size(key), len(PNG_BYTES))
+
+        async with self.storage.local_copy(key) as path:
+            self.assertEqual(Path(path).read_bytes(), PNG_BYTES)
+
+        await self.storage.delete(key)
+        self.assertIsNone(await self.storage.stat(key))
+        self.assertIsNone(await self.storage.size(key))
+        # Apagar de novo não é erro
+        await self.storage.delete(key)
+
+    async def test_list_objects_by_prefix(self):
+        keys = [self.key("cas/ab/cd/one.png"), self.key("cas/ab/cd/variants/one_320.webp"), self.key("other.png")]
+        for key in keys:
+            await self.storage.put_file(self.write_temp(PNG_BYTES), key)
+
+        listed = sorted([item.key async for item in self.storage.list_objects(self.key("cas/"))])
+        self.assertEqual(listed, sorted(keys[:2]))
+
+        variants = [item.key async for item in self.storage.list_objects(self.key("cas/ab/cd/variants/one_"))]
+        self.assertEqual(variants, [keys[1]])
+
+        everything = {item.key async for item in self.storage.list_objects()}
+        self.assertTrue(set(keys) <= everything)
+
+    async def test_public_url_round_trip(self):
+        key = self.key("cas/ab/cd/x.png")
+        self.assertEqual(self.storage.key_for_url(self.storage.public_url(key)), key)
+        self.assertIsNone(self.storage.key_for_url("https://example.com/x.png"))
+        self.assertIsNone(self.storage.key_for_url(None))
+
+
+class LocalStorageTest(StorageContract, unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.scratch = Path(self.tmp.name) / "scratch"
+        self.scratch.mkdir()
+        self.storage = LocalStorage(root=Path(self.tmp.name) / "uploads", url_prefix="/api/uploads/")
+        self.prefix = "t"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    async def test_rejects_keys_outside_root(self):
+        with self.assertRaises(ValueError):
+            await self.storage.stat("../escape.png")
+
+    async def test_presign_put_token(self):
+        sha256 = hashlib.sha256(PNG_BYTES).hexdigest()
+        upload = await self.storage.presign_put(self.key("a.png"), "image/png", len(PNG_BYTES), sha256)
+        claims = decode_upload_token(upload["url"].rsplit("/", 1)[1])
+        self.assertEqual(
+            (claims["key"], claims["ct"], claims["size"], claims["sha256"]),
+            (self.key("a.png"), "image/png", len(PNG_BYTES), sha256),
+        )
+
+
+@unittest.skipUnless(S3_TEST_ENDPOINT_URL, "S3_TEST_ENDPOINT_URL não definido (MinIO local)")
+class S3StorageTest(StorageContract, unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.scratch = Path(self.tmp.name)
+        self.storage = S3Storage(
+            bucket=os.environ.get("S3_TEST_BUCKET", "imovlocal-test"),
+            region=os.environ.get("S3_TEST_REGION", "us-east-1"),
+            endpoint_url=S3_TEST_ENDPOINT_URL,
+            access_key_id=os.environ.get("S3_TEST_ACCESS_KEY_ID", "minioadmin"),
+            secret_access_key=os.environ.get("S3_TEST_SECRET_ACCESS_KEY", "minioadmin"),
+        )
+        try:
+            self.storage.client.head_bucket(Bucket=self.storage.bucket)
+        except self.storage.client.exceptions.ClientError:
+            self.storage.client.create_bucket(Bucket=self.storage.bucket)
+        # Prefixo próprio por teste: execuções simultâneas não se misturam
+        self.prefix = f"test-{uuid.uuid4().hex}"
+
+    async def asyncTearDown(self):
+        async for item in self.storage.list_objects(self.prefix):
+            await self.storage.delete(item.key)
+        self.tmp.cleanup()
+
+    async def _put(self, upload: dict, data: bytes) -> int:
+        request = urllib.request.Request(upload["url"], data=data, method="PUT", headers=upload["headers"])
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    async def test_presigned_put(self):
+        key = self.key("cas/ab/cd/direct.png")
+        sha256 = hashlib.sha256(PNG_BYTES).hexdigest()
+        upload = await self.storage.presign_put(key, "image/png", len(PNG_BYTES), sha256)
+
+        self.assertEqual(await self._put(upload, PNG_BYTES), 200)
+        self.assertEqual(await self.storage.size(key), len(PNG_BYTES))
+
+    async def test_presigned_put_rejects_other_bytes(self):
+        key = self.key("cas/ab/cd/tampered.png")
+        sha256 = hashlib.sha256(PNG_BYTES).hexdigest()
+        upload = await self.storage.presign_put(key, "image/png", len(PNG_BYTES), sha256)
+
+        tampered = PNG_BYTES[:-1] + b"\x01"
+        self.assertGreaterEqual(await self._put(upload, tampered), 400)
+        self.assertIsNone(await self.storage.size(key))
+
+
+if __name__ == "__main__":
+    unittest.main()
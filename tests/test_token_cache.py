@@ -0,0 +1,66 @@
+"""
+Testes do cache de tokens verificados (backend/auth.py)
+
+Uso: python -m pytest tests/test_token_cache.py
+"""
+from pathlib import Path
+from unittest import mock
+import sys
+import time
+import unittest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from auth import VerifiedTokenCache  # noqa: E402
+
+
+def payload(seconds: float = 60, sub: str = "a@b.c") -> dict:
+    return {"sub": sub, "exp": time.time() + seconds}
+
+
+class VerifiedTokenCacheTest(unittest.TestCase):
+    def test_hit_and_miss(self):
+        cache = VerifiedTokenCache(10)
+        self.assertIsNone(cache.get(b"k"))
+        cache.put(b"k", payload())
+        self.assertEqual(cache.get(b"k")["sub"], "a@b.c")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(cache.stats()["hit_rate"], 0.5)
+
+    def test_entry_expires_with_the_token(self):
+        cache = VerifiedTokenCache(10)
+        entry = payload(seconds=30)
+        cache.put(b"k", entry)
+        with mock.patch("auth.time.time", return_value=entry["exp"]):
+            self.assertIsNone(cache.get(b"k"))
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = VerifiedTokenCache(2)
+        cache.put(b"a", payload(sub="a"))
+        cache.put(b"b", payload(sub="b"))
+        cache.get(b"a")
+        cache.put(b"c", payload(sub="c"))
+        self.assertIsNone(cache.get(b"b"))
+        self.assertEqual(cache.get(b"a")["sub"], "a")
+        self.assertEqual(cache.get(b"c")["sub"], "c")
+
+    def test_tokens_without_exp_are_not_cached(self):
+        cache = VerifiedTokenCache(10)
+        cache.put(b"k", {"sub": "a@b.c"})
+        self.assertIsNone(cache.get(b"k"))
+
+    def test_disabled(self):
+        cache = VerifiedTokenCache(0)
+        cache.put(b"k", payload())
+        self.assertIsNone(cache.get(b"k"))
+
+    def test_clear(self):
+        cache = VerifiedTokenCache(10)
+        cache.put(b"k", payload())
+        cache.clear()
+        self.assertIsNone(cache.get(b"k"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Testes das chaves, termos e cursor da busca de usuários (backend/user_search.py)
+
+Uso: python -m pytest tests/test_user_search.py
+"""
+from pathlib import Path
+import base64
+import json
+import re
+import sys
+import unittest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from user_search import (  # noqa: E402
+    InvalidCursor, _tier_query, decode_cursor, encode_cursor, query_terms, search_fields
+)
+
+
+class SearchFieldsTest(unittest.TestCase):
+    def test_keys_by_type(self):
+        fields = search_fields({
+            "email": " Joao.Silva@X.com ",
+            "name": "João da Silva",
+            "company": "Silva Imóveis",
+            "cpf": "123.456.789-00",
+            "phone": "+55 (67) 99999-8888",
+        })
+        self.assertEqual(fields["search_name"], "joao da silva")
+        self.assertIn("e:joao.silva@x.com", fields["search_keys"])
+        self.assertIn("d:12345678900", fields["search_keys"])
+        self.assertIn("n:imoveis", fields["search_keys"])
+        # Telefone com e sem DDD, sempre sem o DDI
+        self.assertIn("d:67999998888", fields["search_keys"])
+        self.assertIn("d:999998888", fields["search_keys"])
+        self.assertEqual(fields["search_keys"], sorted(set(fields["search_keys"])))
+
+    def test_empty_user(self):
+        self.assertEqual(search_fields({}), {"search_keys": [], "search_name": ""})
+
+
+class QueryTermsTest(unittest.TestCase):
+    def test_email(self):
+        self.assertEqual(query_terms(" Contato@Silva.com "), [["e:contato@silva.com"]])
+
+    def test_digits(self):
+        self.assertEqual(query_terms("123.456.789-00"), [["d:12345678900"]])
+        self.assertEqual(query_terms("(67) 99999-8888"), [["d:67999998888"]])
+        self.assertEqual(query_terms("+55 67 99999"), [["d:6799999"]])
+
+    def test_words_match_name_or_email_start(self):
+        self.assertEqual(query_terms("SÍLV joão"), [["n:silv", "e:silv"], ["n:joao", "e:joao"]])
+
+    def test_nothing_searchable(self):
+        self.assertEqual(query_terms(""), [])
+        self.assertEqual(query_terms("---"), [])
+
+
+class TierQueryTest(unittest.TestCase):
+    def test_exact(self):
+        self.assertEqual(
+            _tier_query([["n:jo", "e:jo"]], exact=True),
+            {"$and": [{"search_keys": {"$in": ["n:jo", "e:jo"]}}]},
+        )
+
+    def test_short_terms_are_not_prefixes(self):
+        keys = _tier_query([["n:silva", "e:silva"], ["n:jo", "e:jo"]], exact=False)["$and"]
+        long_term, short_term = [clause["search_keys"]["$in"] for clause in keys]
+        self.assertTrue(all(isinstance(key, re.Pattern) for key in long_term))
+        self.assertEqual(long_term[0].pattern, "^n:silva")
+        self.assertEqual(short_term, ["n:jo", "e:jo"])
+
+    def test_prefix_is_escaped(self):
+        pattern = _tier_query([["e:a.b+c"]], exact=False)["$and"][0]["search_keys"]["$in"][0]
+        self.assertTrue(pattern.match("e:a.b+cd"))
+        self.assertFalse(pattern.match("e:axb+cd"))
+
+
+class CursorTest(unittest.TestCase):
+    def test_round_trip(self):
+        cursor = encode_cursor(1, {"search_name": "joao da silva", "id": "u-1"})
+        self.assertEqual(decode_cursor(cursor), (1, "joao da silva", "u-1"))
+
+    def test_missing_name(self):
+        self.assertEqual(decode_cursor(encode_cursor(0, {"id": "u-1"})), (0, "", "u-1"))
+
+    def test_invalid(self):
+        def raw(value) -> str:
+            return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+        for cursor in (
+            "zzz",
+            raw([2, "a", "b"]),
+            raw([0, {"$gt": ""}, "b"]),
+            raw([0, "a", {"$ne": None}]),
+            raw([0, "a"]),
+            raw({"tier": 0}),
+        ):
+            with self.assertRaises(InvalidCursor, msg=cursor):
+                decode_cursor(cursor)
+
+
+if __name__ == "__main__":
+    unittest.main()